@@ -1,15 +1,31 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 import os
 
 from fastapi import FastAPI
 
-from services.database import create_db_and_tables
+from services.asset_download_service import ASSET_DOWNLOAD_SERVICE
+from services.database import async_session_maker, create_db_and_tables
+from services.docling_service import DOCLING_SERVICE
+from services.image_asset_service import IMAGE_ASSET_SERVICE
+from services.image_variant_service import IMAGE_VARIANT_SERVICE
+from services.libreoffice_service import LIBREOFFICE_SERVICE
+from services.pdf_rasterizer_service import PDF_RASTERIZER_SERVICE
+from services.stock_image_service import STOCK_IMAGE_SERVICE
 from utils.get_env import get_app_data_directory_env
 from utils.model_availability import (
     check_llm_and_image_provider_api_or_model_availability,
 )
 
 
+async def backfill_image_hashes():
+    try:
+        async with async_session_maker() as sql_session:
+            await IMAGE_ASSET_SERVICE.backfill_hashes(sql_session)
+    except Exception as e:
+        print(f"Failed to hash image assets: {e}")
+
+
 @asynccontextmanager
 async def app_lifespan(_: FastAPI):
     """
@@ -20,4 +36,15 @@ async def app_lifespan(_: FastAPI):
     os.makedirs(get_app_data_directory_env(), exist_ok=True)
     await create_db_and_tables()
     await check_llm_and_image_provider_api_or_model_availability()
+    # Hashing every legacy image can take long, so it does not hold up startup
+    backfill_task = asyncio.create_task(backfill_image_hashes())
     yield
+    backfill_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await backfill_task
+    await ASSET_DOWNLOAD_SERVICE.close()
+    await LIBREOFFICE_SERVICE.close()
+    await STOCK_IMAGE_SERVICE.close()
+    DOCLING_SERVICE.close()
+    PDF_RASTERIZER_SERVICE.close()
+    IMAGE_VARIANT_SERVICE.close()
@@ -3,11 +3,12 @@ import os
 from typing import Annotated, List, Optional
 from fastapi import APIRouter, Body, File, UploadFile
 
-from constants.documents import UPLOAD_ACCEPTED_FILE_TYPES
+from constants.documents import MAX_UPLOAD_SIZE_MB, UPLOAD_ACCEPTED_FILE_TYPES
 from models.decomposed_file_info import DecomposedFileInfo
 from services.temp_file_service import TEMP_FILE_SERVICE
 from services.documents_loader import DocumentsLoader
 import uuid
+from utils.upload_utils import save_upload_file
 from utils.validators import validate_files
 
 FILES_ROUTER = APIRouter(prefix="/files", tags=["Files"])
@@ -20,7 +21,7 @@ async def upload_files(files: Optional[List[UploadFile]]):
 
     temp_dir = TEMP_FILE_SERVICE.create_temp_dir(str(uuid.uuid4()))
 
-    validate_files(files, True, True, 100, UPLOAD_ACCEPTED_FILE_TYPES)
+    validate_files(files, True, True, MAX_UPLOAD_SIZE_MB, UPLOAD_ACCEPTED_FILE_TYPES)
 
     temp_files: List[str] = []
     if files:
@@ -28,10 +29,7 @@ async def upload_files(files: Optional[List[UploadFile]]):
             temp_path = TEMP_FILE_SERVICE.create_temp_file_path(
                 each_file.filename, temp_dir
             )
-            with open(temp_path, "wb") as f:
-                content = await each_file.read()
-                f.write(content)
-
+            await save_upload_file(each_file, temp_path)
             temp_files.append(temp_path)
 
     return temp_files
@@ -50,7 +48,11 @@ async def decompose_files(file_paths: Annotated[List[str], Body(embed=True)]):
             other_files.append(file_path)
 
     documents_loader = DocumentsLoader(file_paths=other_files)
-    await documents_loader.load_documents(temp_dir)
+    async for loaded_document in documents_loader.load_documents_iter(temp_dir):
+        print(
+            f"Decomposed {os.path.basename(loaded_document.file_path)}"
+            + (f" with error: {loaded_document.error}" if loaded_document.error else "")
+        )
     parsed_documents = documents_loader.documents
 
     response = []
@@ -63,7 +65,9 @@ async def decompose_files(file_paths: Annotated[List[str], Body(embed=True)]):
             text_file.write(parsed_doc)
         response.append(
             DecomposedFileInfo(
-                name=os.path.basename(other_files[index]), file_path=file_path
+                name=os.path.basename(other_files[index]),
+                file_path=file_path,
+                error=documents_loader.errors[index],
             )
         )
 
@@ -81,7 +85,6 @@ async def update_files(
     file_path: Annotated[str, Body()],
     file: Annotated[UploadFile, File()],
 ):
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
+    await save_upload_file(file, file_path)
 
     return {"message": "File updated successfully"}
@@ -1,10 +1,32 @@
-from typing import List
-from fastapi import APIRouter
+from typing import Annotated, List
+from fastapi import APIRouter, Body, HTTPException
+from models.icon_search_cache_stats import IconSearchCacheStats
 from services.icon_finder_service import ICON_FINDER_SERVICE
 
 ICONS_ROUTER = APIRouter(prefix="/icons", tags=["Icons"])
 
+MAX_BATCH_QUERIES = 100
+MAX_BATCH_LIMIT = 100
+
 
 @ICONS_ROUTER.get("/search", response_model=List[str])
 async def search_icons(query: str, limit: int = 20):
     return await ICON_FINDER_SERVICE.search_icons(query, limit)
+
+
+@ICONS_ROUTER.post("/search/batch", response_model=List[List[str]])
+async def search_icons_batch(
+    queries: Annotated[List[str], Body()],
+    limit: Annotated[int, Body(ge=1, le=MAX_BATCH_LIMIT)] = 20,
+):
+    """Returns the ranked icons for every query, searched together."""
+    if len(queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(
+            400, detail=f"At most {MAX_BATCH_QUERIES} queries can be searched at once"
+        )
+    return await ICON_FINDER_SERVICE.search_icons_batch(queries, limit)
+
+
+@ICONS_ROUTER.get("/cache-stats", response_model=IconSearchCacheStats)
+async def get_icon_search_cache_stats():
+    return ICON_FINDER_SERVICE.get_cache_stats()
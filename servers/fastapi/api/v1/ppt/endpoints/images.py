@@ -1,16 +1,23 @@
-from typing import List
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, File, Header, Query, UploadFile, HTTPException
+from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
+from constants.assets import DEFAULT_SIMILAR_IMAGE_MAX_DISTANCE, MAX_SIMILAR_IMAGES
 from models.image_prompt import ImagePrompt
+from models.image_provider_queue_stats import ImageProviderQueueStats
 from models.sql.image_asset import ImageAsset
 from services.database import get_async_session
+from services.image_asset_service import IMAGE_ASSET_SERVICE
+from services.image_generation_queue_service import IMAGE_GENERATION_QUEUE_SERVICE
 from services.image_generation_service import ImageGenerationService
+from services.image_variant_service import IMAGE_VARIANT_SERVICE
 from utils.asset_directory_utils import get_images_directory
 import os
 import uuid
 from utils.file_utils import get_file_name_with_random_uuid
+from utils.upload_utils import save_upload_file
 
 IMAGES_ROUTER = APIRouter(prefix="/images", tags=["Images"])
 
@@ -33,6 +40,11 @@ async def generate_image(
     return image.path
 
 
+@IMAGES_ROUTER.get("/provider-stats", response_model=List[ImageProviderQueueStats])
+async def get_image_provider_stats():
+    return IMAGE_GENERATION_QUEUE_SERVICE.get_stats()
+
+
 @IMAGES_ROUTER.get("/generated", response_model=List[ImageAsset])
 async def get_generated_images(sql_session: AsyncSession = Depends(get_async_session)):
     try:
@@ -58,15 +70,23 @@ async def upload_image(
             get_images_directory(), os.path.basename(new_filename)
         )
 
-        with open(image_path, "wb") as f:
-            f.write(await file.read())
-
-        image_asset = ImageAsset(path=image_path, is_uploaded=True)
+        saved_upload = await save_upload_file(file, image_path)
+        image_asset = await IMAGE_ASSET_SERVICE.deduplicate(
+            sql_session,
+            ImageAsset(path=image_path, is_uploaded=True),
+            saved_upload.sha256,
+        )
+        # The same image was uploaded before, its asset is returned instead
+        if image_asset.path != image_path:
+            return image_asset
 
+        IMAGE_VARIANT_SERVICE.schedule(image_path)
         sql_session.add(image_asset)
         await sql_session.commit()
 
         return image_asset
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to upload image: {str(e)}")
 
@@ -86,6 +106,51 @@ async def get_uploaded_images(sql_session: AsyncSession = Depends(get_async_sess
         )
 
 
+@IMAGES_ROUTER.get("/variant")
+async def get_image_variant(
+    path: str,
+    width: Optional[int] = Query(None, gt=0),
+    accept: str = Header(""),
+):
+    """
+    Serves the smallest stored variant of an image that is at least width
+    pixels wide, in the best format the client accepts. Falls back to the
+    image itself while its variants do not exist yet.
+    """
+    images_directory = os.path.realpath(get_images_directory())
+    image_path = os.path.realpath(path)
+    if os.path.commonpath([images_directory, image_path]) != images_directory:
+        raise HTTPException(status_code=400, detail="Image is not in images directory")
+    if not os.path.isfile(image_path):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    variant_path = IMAGE_VARIANT_SERVICE.get_best_variant(image_path, width, accept)
+    return FileResponse(
+        variant_path or image_path,
+        headers={"Cache-Control": "public, max-age=86400", "Vary": "Accept"},
+    )
+
+
+@IMAGES_ROUTER.get("/{id}/similar", response_model=List[ImageAsset])
+async def get_similar_images(
+    id: uuid.UUID,
+    max_distance: int = Query(DEFAULT_SIMILAR_IMAGE_MAX_DISTANCE, ge=0, le=64),
+    limit: int = Query(MAX_SIMILAR_IMAGES, gt=0, le=100),
+    sql_session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Returns the images that look like the given one, most similar first.
+    max_distance is the number of bits their perceptual hashes may differ in.
+    """
+    image = await sql_session.get(ImageAsset, id)
+    if not image:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    return await IMAGE_ASSET_SERVICE.find_similar(
+        sql_session, image, max_distance, limit
+    )
+
+
 @IMAGES_ROUTER.delete("/{id}", status_code=204)
 async def delete_uploaded_image_by_id(
     id: uuid.UUID, sql_session: AsyncSession = Depends(get_async_session)
@@ -96,7 +161,10 @@ async def delete_uploaded_image_by_id(
         if not image:
             raise HTTPException(status_code=404, detail="Image not found")
 
-        os.remove(image.path)
+        # Stock images chosen twice share one file
+        if not await IMAGE_ASSET_SERVICE.is_path_shared(sql_session, image):
+            os.remove(image.path)
+            IMAGE_VARIANT_SERVICE.delete_variants(image.path)
 
         await sql_session.delete(image)
         await sql_session.commit()
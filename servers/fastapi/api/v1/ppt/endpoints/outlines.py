@@ -1,6 +1,7 @@
 import asyncio
 import json
 import math
+import os
 import traceback
 import uuid
 import dirtyjson
@@ -19,6 +20,7 @@ from models.sse_response import (
 )
 from services.temp_file_service import TEMP_FILE_SERVICE
 from services.database import get_async_session
+from services.document_retrieval_service import DOCUMENT_RETRIEVAL_SERVICE
 from services.documents_loader import DocumentsLoader
 from utils.llm_calls.generate_presentation_outlines import generate_ppt_outline
 from utils.ppt_utils import get_presentation_title_from_outlines
@@ -72,10 +74,25 @@ async def stream_outlines(
                 yield SSEStatusResponse(status="Loading documents...").to_string()
 
                 documents_loader = DocumentsLoader(file_paths=presentation.file_paths)
-                await documents_loader.load_documents(temp_dir)
-                documents = documents_loader.documents
+                loaded_count = 0
+                async for loaded_document in documents_loader.load_documents_iter(
+                    temp_dir
+                ):
+                    loaded_count += 1
+                    file_name = os.path.basename(loaded_document.file_path)
+                    if loaded_document.error:
+                        status = f"Could not load {file_name}: {loaded_document.error}"
+                    else:
+                        status = f"Loaded {file_name} ({loaded_count}/{len(presentation.file_paths)})"
+                    yield SSEStatusResponse(status=status).to_string()
+
+                documents = [each for each in documents_loader.documents if each]
                 if documents:
-                    additional_context = "\n\n".join(documents)
+                    additional_context = (
+                        await DOCUMENT_RETRIEVAL_SERVICE.get_outline_context(
+                            documents, presentation.content
+                        )
+                    )
 
                 debug_log("✅ Documents loaded", count=len(documents))
                 yield SSEStatusResponse(status=f"Loaded {len(documents)} document(s)").to_string()
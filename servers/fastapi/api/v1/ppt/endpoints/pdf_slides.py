@@ -1,15 +1,23 @@
 import os
-import shutil
 import tempfile
-import subprocess
-from typing import List, Optional
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from typing import List
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.responses import FileResponse
 from pydantic import BaseModel
 
-from services.documents_loader import DocumentsLoader
-from utils.asset_directory_utils import get_images_directory
+from services.pdf_rasterizer_service import (
+    PDF_RASTERIZER_SERVICE,
+    get_page_image_path,
+)
+from utils.slide_screenshot_utils import (
+    SLIDE_SCREENSHOT_PREFIX,
+    SLIDE_SCREENSHOTS_SOURCE_PDF,
+    create_slide_screenshots,
+    get_slide_screenshots_directory,
+)
+from utils.upload_utils import save_upload_file
 import uuid
-from constants.documents import PDF_MIME_TYPES
+from constants.documents import MAX_UPLOAD_SIZE_MB, PDF_MIME_TYPES
 
 
 PDF_SLIDES_ROUTER = APIRouter(prefix="/pdf-slides", tags=["PDF Slides"])
@@ -28,14 +36,17 @@ class PdfSlidesResponse(BaseModel):
 
 @PDF_SLIDES_ROUTER.post("/process", response_model=PdfSlidesResponse)
 async def process_pdf_slides(
-    pdf_file: UploadFile = File(..., description="PDF file to process")
+    pdf_file: UploadFile = File(..., description="PDF file to process"),
+    lazy: bool = Query(
+        False, description="Render each screenshot on its first request"
+    ),
 ):
     """
     Process a PDF file to extract slide screenshots.
 
     This endpoint:
     1. Validates the uploaded PDF file
-    2. Uses ImageMagick to convert PDF pages to PNG images
+    2. Renders PDF pages to images in parallel, or on demand when lazy
     3. Returns screenshot URLs for each slide/page
 
     Note: Font installation is not needed since PDFs already have fonts embedded.
@@ -47,15 +58,15 @@ async def process_pdf_slides(
             status_code=400,
             detail=f"Invalid file type. Expected PDF file, got {pdf_file.content_type}",
         )
-    # Enforce 100MB size limit
+    # Enforce size limit
     if (
         hasattr(pdf_file, "size")
         and pdf_file.size
-        and pdf_file.size > (100 * 1024 * 1024)
+        and pdf_file.size > (MAX_UPLOAD_SIZE_MB * 1024 * 1024)
     ):
         raise HTTPException(
             status_code=400,
-            detail="PDF file exceeded max upload size of 100 MB",
+            detail=f"PDF file exceeded max upload size of {MAX_UPLOAD_SIZE_MB} MB",
         )
 
     # Create temporary directory for processing
@@ -63,54 +74,51 @@ async def process_pdf_slides(
         try:
             # Save uploaded PDF file
             pdf_path = os.path.join(temp_dir, "presentation.pdf")
-            with open(pdf_path, "wb") as f:
-                pdf_content = await pdf_file.read()
-                f.write(pdf_content)
+            await save_upload_file(pdf_file, pdf_path)
 
-            # Generate screenshots from PDF using ImageMagick
-            screenshot_paths = await DocumentsLoader.get_page_images_from_pdf_async(
-                pdf_path, temp_dir
-            )
-            print(f"Generated {len(screenshot_paths)} PDF screenshots")
-
-            # Move screenshots to images directory and generate URLs
-            images_dir = get_images_directory()
-            presentation_id = uuid.uuid4()
-            presentation_images_dir = os.path.join(images_dir, str(presentation_id))
-            os.makedirs(presentation_images_dir, exist_ok=True)
-
-            slides_data = []
-
-            for i, screenshot_path in enumerate(screenshot_paths, 1):
-                # Move screenshot to permanent location
-                screenshot_filename = f"slide_{i}.png"
-                permanent_screenshot_path = os.path.join(
-                    presentation_images_dir, screenshot_filename
-                )
-
-                if (
-                    os.path.exists(screenshot_path)
-                    and os.path.getsize(screenshot_path) > 0
-                ):
-                    # Use shutil.copy2 instead of os.rename to handle cross-device moves
-                    shutil.copy2(screenshot_path, permanent_screenshot_path)
-                    screenshot_url = (
-                        f"/app_data/images/{presentation_id}/{screenshot_filename}"
-                    )
-                else:
-                    # Fallback if screenshot generation failed or file is empty placeholder
-                    screenshot_url = "/static/images/placeholder.jpg"
-
-                slides_data.append(
-                    PdfSlideData(slide_number=i, screenshot_url=screenshot_url)
-                )
+            # Generate screenshots from PDF pages
+            screenshot_urls = await create_slide_screenshots(pdf_path, lazy)
+
+            slides_data = [
+                PdfSlideData(slide_number=i, screenshot_url=screenshot_url)
+                for i, screenshot_url in enumerate(screenshot_urls, 1)
+            ]
 
             return PdfSlidesResponse(
                 success=True, slides=slides_data, total_slides=len(slides_data)
             )
 
+        except HTTPException:
+            raise
         except Exception as e:
             print(f"Error processing PDF slides: {str(e)}")
             raise HTTPException(
                 status_code=500, detail=f"Failed to process PDF: {str(e)}"
             )
+
+
+@PDF_SLIDES_ROUTER.get("/{presentation_id}/screenshots/{slide_number}")
+async def get_pdf_slide_screenshot(presentation_id: uuid.UUID, slide_number: int):
+    """Serves a lazily rendered slide screenshot, rendering it on first request."""
+    screenshots_dir = get_slide_screenshots_directory(presentation_id)
+    pdf_path = os.path.join(screenshots_dir, SLIDE_SCREENSHOTS_SOURCE_PDF)
+    if not os.path.exists(pdf_path):
+        raise HTTPException(status_code=404, detail="Slides not found")
+
+    screenshot_path = get_page_image_path(
+        screenshots_dir,
+        slide_number,
+        PDF_RASTERIZER_SERVICE.image_format,
+        SLIDE_SCREENSHOT_PREFIX,
+    )
+    if os.path.exists(screenshot_path):
+        return FileResponse(screenshot_path)
+
+    page_count = await PDF_RASTERIZER_SERVICE.get_page_count(pdf_path)
+    if not 1 <= slide_number <= page_count:
+        raise HTTPException(status_code=404, detail="Slide not found")
+
+    screenshot_path = await PDF_RASTERIZER_SERVICE.get_page_image(
+        pdf_path, screenshots_dir, slide_number, prefix=SLIDE_SCREENSHOT_PREFIX
+    )
+    return FileResponse(screenshot_path)
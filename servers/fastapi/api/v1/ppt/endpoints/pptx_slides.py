@@ -1,21 +1,21 @@
 import os
-import shutil
 import zipfile
 import tempfile
 import subprocess
 import uuid
 from typing import List, Optional, Dict
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
 from pydantic import BaseModel
 import aiohttp
 import asyncio
 import xml.etree.ElementTree as ET
 import re
 
-from services.documents_loader import DocumentsLoader
-from utils.asset_directory_utils import get_images_directory
+from services.libreoffice_service import LIBREOFFICE_SERVICE
+from utils.slide_screenshot_utils import create_slide_screenshots
+from utils.upload_utils import save_upload_file
 import uuid
-from constants.documents import POWERPOINT_TYPES
+from constants.documents import MAX_UPLOAD_SIZE_MB, POWERPOINT_TYPES
 
 
 PPTX_SLIDES_ROUTER = APIRouter(prefix="/pptx-slides", tags=["PPTX Slides"])
@@ -290,6 +290,9 @@ async def analyze_fonts_in_all_slides(slide_xmls: List[str]) -> FontAnalysisResu
 async def process_pptx_slides(
     pptx_file: UploadFile = File(..., description="PPTX file to process"),
     fonts: Optional[List[UploadFile]] = File(None, description="Optional font files"),
+    lazy: bool = Query(
+        False, description="Render each screenshot on its first request"
+    ),
 ):
     """
     Process a PPTX file to extract slide screenshots and XML content.
@@ -308,15 +311,15 @@ async def process_pptx_slides(
             status_code=400,
             detail=f"Invalid file type. Expected PPTX file, got {pptx_file.content_type}",
         )
-    # Enforce 100MB size limit
+    # Enforce size limit
     if (
         hasattr(pptx_file, "size")
         and pptx_file.size
-        and pptx_file.size > (100 * 1024 * 1024)
+        and pptx_file.size > (MAX_UPLOAD_SIZE_MB * 1024 * 1024)
     ):
         raise HTTPException(
             status_code=400,
-            detail="PPTX file exceeded max upload size of 100 MB",
+            detail=f"PPTX file exceeded max upload size of {MAX_UPLOAD_SIZE_MB} MB",
         )
 
     # Create temporary directory for processing
@@ -324,9 +327,7 @@ async def process_pptx_slides(
         if True:
             # Save uploaded PPTX file
             pptx_path = os.path.join(temp_dir, "presentation.pptx")
-            with open(pptx_path, "wb") as f:
-                pptx_content = await pptx_file.read()
-                f.write(pptx_content)
+            await save_upload_file(pptx_file, pptx_path)
 
             # Install fonts if provided
             if fonts:
@@ -338,11 +339,8 @@ async def process_pptx_slides(
             # Convert PPTX to PDF
             pdf_path = await _convert_pptx_to_pdf(pptx_path, temp_dir)
 
-            # Generate screenshots using LibreOffice
-            screenshot_paths = await DocumentsLoader.get_page_images_from_pdf_async(
-                pdf_path, temp_dir
-            )
-            print(f"Screenshot paths: {screenshot_paths}")
+            # Generate screenshots from the converted PDF
+            screenshot_urls = await create_slide_screenshots(pdf_path, lazy)
 
             # Analyze fonts across all slides
             font_analysis = await analyze_fonts_in_all_slides(slide_xmls)
@@ -350,36 +348,11 @@ async def process_pptx_slides(
                 f"Font analysis completed: {len(font_analysis.internally_supported_fonts)} supported, {len(font_analysis.not_supported_fonts)} not supported"
             )
 
-            # Move screenshots to images directory and generate URLs
-            images_dir = get_images_directory()
-            presentation_id = uuid.uuid4()
-            presentation_images_dir = os.path.join(images_dir, str(presentation_id))
-            os.makedirs(presentation_images_dir, exist_ok=True)
-
             slides_data = []
 
-            for i, (xml_content, screenshot_path) in enumerate(
-                zip(slide_xmls, screenshot_paths), 1
+            for i, (xml_content, screenshot_url) in enumerate(
+                zip(slide_xmls, screenshot_urls), 1
             ):
-                # Move screenshot to permanent location
-                screenshot_filename = f"slide_{i}.png"
-                permanent_screenshot_path = os.path.join(
-                    presentation_images_dir, screenshot_filename
-                )
-
-                if (
-                    os.path.exists(screenshot_path)
-                    and os.path.getsize(screenshot_path) > 0
-                ):
-                    # Use shutil.copy2 instead of os.rename to handle cross-device moves
-                    shutil.copy2(screenshot_path, permanent_screenshot_path)
-                    screenshot_url = (
-                        f"/app_data/images/{presentation_id}/{screenshot_filename}"
-                    )
-                else:
-                    # Fallback if screenshot generation failed or file is empty placeholder
-                    screenshot_url = "/static/images/placeholder.jpg"
-
                 # Compute normalized fonts for this slide
                 raw_slide_fonts = extract_fonts_from_oxml(xml_content)
                 normalized_fonts = sorted(
@@ -424,9 +397,7 @@ async def process_pptx_fonts(
     with tempfile.TemporaryDirectory() as temp_dir:
         # Save uploaded PPTX file
         pptx_path = os.path.join(temp_dir, "presentation.pptx")
-        with open(pptx_path, "wb") as f:
-            pptx_content = await pptx_file.read()
-            f.write(pptx_content)
+        await save_upload_file(pptx_file, pptx_path)
 
         # Extract slide XMLs from PPTX
         slide_xmls = _extract_slide_xmls(pptx_path, temp_dir)
@@ -440,42 +411,14 @@ async def process_pptx_fonts(
         )
 
 
-def _create_font_alias_config(raw_fonts: List[str]) -> str:
-    """Create a temporary fontconfig configuration that aliases variant family names to normalized root families.
-    Returns the path to the config file.
-    """
-    # Build mapping from raw -> normalized where different
+def _get_font_aliases(raw_fonts: List[str]) -> Dict[str, str]:
+    """Map variant family names to normalized root families where they differ."""
     mappings: Dict[str, str] = {}
     for f in raw_fonts:
         normalized = normalize_font_family_name(f)
         if normalized and normalized != f:
             mappings[f] = normalized
-    # Create config only if we have mappings
-    fd, fonts_conf_path = tempfile.mkstemp(prefix="fonts_alias_", suffix=".conf")
-    os.close(fd)
-    with open(fonts_conf_path, "w", encoding="utf-8") as cfg:
-        cfg.write(
-            """<?xml version='1.0'?>
-<!DOCTYPE fontconfig SYSTEM "urn:fontconfig:fonts.dtd">
-<fontconfig>
-  <include>/etc/fonts/fonts.conf</include>
-"""
-        )
-        for src, dst in mappings.items():
-            cfg.write(
-                f"""
-  <match target="pattern">
-    <test name="family" compare="eq">
-      <string>{src}</string>
-    </test>
-    <edit name="family" mode="assign" binding="strong">
-      <string>{dst}</string>
-    </edit>
-  </match>
-"""
-            )
-        cfg.write("\n</fontconfig>\n")
-    return fonts_conf_path
+    return mappings
 
 
 async def _install_fonts(fonts: List[UploadFile], temp_dir: str) -> None:
@@ -486,9 +429,7 @@ async def _install_fonts(fonts: List[UploadFile], temp_dir: str) -> None:
     for font_file in fonts:
         # Save font file
         font_path = os.path.join(fonts_dir, font_file.filename)
-        with open(font_path, "wb") as f:
-            font_content = await font_file.read()
-            f.write(font_content)
+        await save_upload_file(font_file, font_path)
 
         # Install font (copy to system fonts directory)
         try:
@@ -506,6 +447,9 @@ async def _install_fonts(fonts: List[UploadFile], temp_dir: str) -> None:
     except subprocess.CalledProcessError as e:
         print(f"Warning: Failed to refresh font cache: {e}")
 
+    # Running LibreOffice workers only see fonts installed before they started
+    LIBREOFFICE_SERVICE.recycle_workers()
+
 
 def _extract_slide_xmls(pptx_path: str, temp_dir: str) -> List[str]:
     """Extract slide XML content from PPTX file."""
@@ -553,55 +497,21 @@ async def _convert_pptx_to_pdf(pptx_path: str, temp_dir: str) -> str:
         slide_xmls = _extract_slide_xmls(pptx_path, temp_dir)
         slide_count = len(slide_xmls)
 
-        # Build font alias config to force variant families to resolve to normalized root families
+        # Alias variant families to normalized root families while converting
         raw_fonts: List[str] = []
         for xml in slide_xmls:
             raw_fonts.extend(extract_fonts_from_oxml(xml))
         raw_fonts = list({f for f in raw_fonts if f})
-        fonts_conf_path = _create_font_alias_config(raw_fonts)
-        env = os.environ.copy()
-        env["FONTCONFIG_FILE"] = fonts_conf_path
 
         print(f"Found {slide_count} slides in presentation")
 
-        # Step 1: Convert PPTX to PDF using LibreOffice
+        # Convert PPTX to PDF using a pooled LibreOffice worker
         print("Starting LibreOffice PDF conversion...")
-        pdf_filename = "temp_presentation.pdf"
-        pdf_path = os.path.join(screenshots_dir, pdf_filename)
-
-        try:
-            result = subprocess.run(
-                [
-                    "libreoffice",
-                    "--headless",
-                    "--convert-to",
-                    "pdf",
-                    "--outdir",
-                    screenshots_dir,
-                    pptx_path,
-                ],
-                check=True,
-                capture_output=True,
-                text=True,
-                timeout=500,
-                env=env,
-            )
-
-            print(f"LibreOffice PDF conversion output: {result.stdout}")
-            if result.stderr:
-                print(f"LibreOffice PDF conversion warnings: {result.stderr}")
-        except subprocess.TimeoutExpired:
-            raise Exception("LibreOffice PDF conversion timed out after 120 seconds")
-        except subprocess.CalledProcessError as e:
-            error_msg = e.stderr if e.stderr else str(e)
-            raise Exception(f"LibreOffice PDF conversion failed: {error_msg}")
-
-        # Find the generated PDF file (LibreOffice uses original filename)
-        pdf_files = [f for f in os.listdir(screenshots_dir) if f.endswith(".pdf")]
-        if not pdf_files:
-            raise Exception("LibreOffice failed to generate PDF file")
-
-        actual_pdf_path = os.path.join(screenshots_dir, pdf_files[0])
+        actual_pdf_path = await LIBREOFFICE_SERVICE.convert_to_pdf(
+            pptx_path,
+            screenshots_dir,
+            font_aliases=_get_font_aliases(raw_fonts),
+        )
         print(f"Generated PDF: {actual_pdf_path}")
         return actual_pdf_path
 
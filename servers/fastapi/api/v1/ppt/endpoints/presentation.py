@@ -7,7 +7,16 @@ import random
 import traceback
 from typing import Annotated, List, Literal, Optional, Tuple
 import dirtyjson
-from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException, Path
+from pathvalidate import sanitize_filename
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Body,
+    Depends,
+    HTTPException,
+    Path,
+    Query,
+)
 from fastapi.responses import StreamingResponse
 from sqlalchemy import delete
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -32,21 +41,27 @@ from models.presentation_with_slides import (
 )
 from models.sql.template import TemplateModel
 
-from services.documents_loader import DocumentsLoader
+from services.document_retrieval_service import DOCUMENT_RETRIEVAL_SERVICE
+from services.image_asset_service import IMAGE_ASSET_SERVICE
+from services.documents_loader import load_documents_text
 from services.webhook_service import WebhookService
 from utils.get_layout_by_name import get_layout_by_name
+from services.deck_asset_planner import DeckAssetPlanner
 from services.image_generation_service import ImageGenerationService
 from utils.dict_utils import deep_update
-from utils.export_utils import export_presentation
+from utils.export_utils import (
+    create_pptx_bytes,
+    export_presentation,
+    export_presentation_as_response,
+    get_pptx_response,
+)
 from utils.llm_calls.generate_presentation_outlines import generate_ppt_outline
 from models.sql.slide import SlideModel
 from models.sse_response import SSECompleteResponse, SSEErrorResponse, SSEResponse
 
 from services.database import get_async_session
-from services.temp_file_service import TEMP_FILE_SERVICE
 from services.concurrent_service import CONCURRENT_SERVICE
 from models.sql.presentation import PresentationModel
-from services.pptx_presentation_creator import PptxPresentationCreator
 from models.sql.async_presentation_generation_status import (
     AsyncPresentationGenerationTaskModel,
 )
@@ -62,8 +77,8 @@ from utils.ppt_utils import (
     select_toc_or_list_slide_layout_index,
 )
 from utils.process_slides import (
+    get_slide_with_image_previews,
     process_slide_add_placeholder_assets,
-    process_slide_and_fetch_assets,
 )
 import uuid
 
@@ -89,7 +104,7 @@ async def get_all_presentations(sql_session: AsyncSession = Depends(get_async_se
     presentations_with_slides = [
         PresentationWithSlides(
             **presentation.model_dump(),
-            slides=[first_slide],
+            slides=[get_slide_with_image_previews(first_slide)],
         )
         for presentation, first_slide in rows
     ]
@@ -280,62 +295,83 @@ async def stream_presentation(
         layout = presentation.get_layout()
         outline = presentation.get_presentation_outline()
 
-        # These tasks will be gathered and awaited after all slides are generated
-        async_assets_generation_tasks = []
+        # Assets of all slides are fetched together after the slides are generated
+        asset_planner = DeckAssetPlanner(image_generation_service)
+        asset_planner.prefetch_from_outlines(outline.slides)
+        try:
+            slide_contexts = [None] * len(structure.slides)
+            if presentation.file_paths:
+                try:
+                    documents = await load_documents_text(presentation.file_paths)
+                    if documents:
+                        slide_contexts = (
+                            await DOCUMENT_RETRIEVAL_SERVICE.get_slide_contexts(
+                                documents,
+                                [
+                                    outline.slides[i].content
+                                    for i in range(len(structure.slides))
+                                ],
+                            )
+                        )
+                except Exception as e:
+                    print(f"Could not load source documents for slides: {e}")
 
-        slides: List[SlideModel] = []
-        yield SSEResponse(
-            event="response",
-            data=json.dumps({"type": "chunk", "chunk": '{ "slides": [ '}),
-        ).to_string()
-        for i, slide_layout_index in enumerate(structure.slides):
-            slide_layout = layout.slides[slide_layout_index]
+            slides: List[SlideModel] = []
+            yield SSEResponse(
+                event="response",
+                data=json.dumps({"type": "chunk", "chunk": '{ "slides": [ '}),
+            ).to_string()
+            for i, slide_layout_index in enumerate(structure.slides):
+                slide_layout = layout.slides[slide_layout_index]
+
+                try:
+                    slide_content = await get_slide_content_from_type_and_outline(
+                        slide_layout,
+                        outline.slides[i],
+                        presentation.language,
+                        presentation.tone,
+                        presentation.verbosity,
+                        presentation.instructions,
+                        slide_contexts[i],
+                    )
+                except HTTPException as e:
+                    yield SSEErrorResponse(detail=e.detail).to_string()
+                    return
 
-            try:
-                slide_content = await get_slide_content_from_type_and_outline(
-                    slide_layout,
-                    outline.slides[i],
-                    presentation.language,
-                    presentation.tone,
-                    presentation.verbosity,
-                    presentation.instructions,
+                slide = SlideModel(
+                    presentation=id,
+                    layout_group=layout.name,
+                    layout=slide_layout.id,
+                    index=i,
+                    speaker_note=slide_content.get("__speaker_note__", ""),
+                    content=slide_content,
                 )
-            except HTTPException as e:
-                yield SSEErrorResponse(detail=e.detail).to_string()
-                return
-
-            slide = SlideModel(
-                presentation=id,
-                layout_group=layout.name,
-                layout=slide_layout.id,
-                index=i,
-                speaker_note=slide_content.get("__speaker_note__", ""),
-                content=slide_content,
-            )
-            slides.append(slide)
+                slides.append(slide)
 
-            # This will mutate slide and add placeholder assets
-            process_slide_add_placeholder_assets(slide)
+                # This will mutate slide and add placeholder assets
+                process_slide_add_placeholder_assets(slide)
 
-            # This will mutate slide
-            async_assets_generation_tasks.append(
-                process_slide_and_fetch_assets(image_generation_service, slide)
-            )
+                # Assets are fetched after all slides, this will mutate slide then
+                asset_planner.add_slide(slide)
+
+                yield SSEResponse(
+                    event="response",
+                    data=json.dumps(
+                        {"type": "chunk", "chunk": slide.model_dump_json()}
+                    ),
+                ).to_string()
 
             yield SSEResponse(
                 event="response",
-                data=json.dumps({"type": "chunk", "chunk": slide.model_dump_json()}),
+                data=json.dumps({"type": "chunk", "chunk": " ] }"}),
             ).to_string()
 
-        yield SSEResponse(
-            event="response",
-            data=json.dumps({"type": "chunk", "chunk": " ] }"}),
-        ).to_string()
-
-        generated_assets_lists = await asyncio.gather(*async_assets_generation_tasks)
-        generated_assets = []
-        for assets_list in generated_assets_lists:
-            generated_assets.extend(assets_list)
+            generated_assets = IMAGE_ASSET_SERVICE.get_unique(
+                await asset_planner.fetch_assets()
+            )
+        finally:
+            # Stops the prefetch of a deck that failed before fetching assets
+            await asset_planner.close()
 
         # Moved this here to make sure new slides are generated before deleting the old ones
         await sql_session.execute(
@@ -404,17 +440,19 @@ async def update_presentation(
 @PRESENTATION_ROUTER.post("/export/pptx", response_model=str)
 async def export_presentation_as_pptx(
     pptx_model: Annotated[PptxPresentationModel, Body()],
+    stream: Annotated[
+        bool, Query(description="Return the PPTX file in the response body")
+    ] = False,
 ):
-    temp_dir = TEMP_FILE_SERVICE.create_temp_dir()
-
-    pptx_creator = PptxPresentationCreator(pptx_model, temp_dir)
-    await pptx_creator.create_ppt()
+    pptx_bytes = await create_pptx_bytes(pptx_model)
+    title = sanitize_filename(pptx_model.name or str(uuid.uuid4()))
+    if stream:
+        return get_pptx_response(pptx_bytes, title)
 
     export_directory = get_exports_directory()
-    pptx_path = os.path.join(
-        export_directory, f"{pptx_model.name or uuid.uuid4()}.pptx"
-    )
-    pptx_creator.save(pptx_path)
+    pptx_path = os.path.join(export_directory, f"{title}.pptx")
+    with open(pptx_path, "wb") as f:
+        f.write(pptx_bytes)
 
     return pptx_path
 
@@ -425,6 +463,9 @@ async def export_presentation_as_pptx_or_pdf(
     export_as: Annotated[
         Literal["pptx", "pdf"], Body(description="Format to export the presentation as")
     ] = "pptx",
+    stream: Annotated[
+        bool, Body(description="Return the exported file in the response body")
+    ] = False,
     sql_session: AsyncSession = Depends(get_async_session),
 ):
     presentation = await sql_session.get(PresentationModel, id)
@@ -432,6 +473,13 @@ async def export_presentation_as_pptx_or_pdf(
     if not presentation:
         raise HTTPException(status_code=404, detail="Presentation not found")
 
+    if stream:
+        return await export_presentation_as_response(
+            id,
+            presentation.title or str(uuid.uuid4()),
+            export_as,
+        )
+
     presentation_and_path = await export_presentation(
         id,
         presentation.title or str(uuid.uuid4()),
@@ -495,6 +543,7 @@ async def generate_presentation_handler(
 ):
     try:
         using_slides_markdown = False
+        documents: List[str] = []
 
         if request.slides_markdown:
             using_slides_markdown = True
@@ -511,11 +560,13 @@ async def generate_presentation_handler(
                 await sql_session.commit()
 
             if request.files:
-                documents_loader = DocumentsLoader(file_paths=request.files)
-                await documents_loader.load_documents()
-                documents = documents_loader.documents
+                documents = await load_documents_text(request.files)
                 if documents:
-                    additional_context = "\n\n".join(documents)
+                    additional_context = (
+                        await DOCUMENT_RETRIEVAL_SERVICE.get_outline_context(
+                            documents, request.content
+                        )
+                    )
 
             # Finding number of slides to generate by considering table of contents
             n_slides_to_generate = request.n_slides
@@ -671,69 +722,76 @@ async def generate_presentation_handler(
             await sql_session.commit()
 
         image_generation_service = ImageGenerationService(get_images_directory())
-        async_assets_generation_tasks = []
-
-        # 7. Generate slide content concurrently (batched), then build slides and fetch assets
-        slides: List[SlideModel] = []
-
-        slide_layout_indices = presentation_structure.slides
-        slide_layouts = [layout_model.slides[idx] for idx in slide_layout_indices]
-
-        # Schedule slide content generation and asset fetching in batches of 10
-        batch_size = 10
-        for start in range(0, len(slide_layouts), batch_size):
-            end = min(start + batch_size, len(slide_layouts))
-
-            print(f"Generating slides from {start} to {end}")
-
-            # Generate contents for this batch concurrently
-            content_tasks = [
-                get_slide_content_from_type_and_outline(
-                    slide_layouts[i],
-                    presentation_outlines.slides[i],
-                    request.language,
-                    request.tone.value,
-                    request.verbosity.value,
-                    request.instructions,
-                )
-                for i in range(start, end)
-            ]
-            batch_contents: List[dict] = await asyncio.gather(*content_tasks)
-
-            # Build slides for this batch
-            batch_slides: List[SlideModel] = []
-            for offset, slide_content in enumerate(batch_contents):
-                i = start + offset
-                slide_layout = slide_layouts[i]
-                slide = SlideModel(
-                    presentation=presentation_id,
-                    layout_group=layout_model.name,
-                    layout=slide_layout.id,
-                    index=i,
-                    speaker_note=slide_content.get("__speaker_note__"),
-                    content=slide_content,
+        asset_planner = DeckAssetPlanner(image_generation_service)
+        asset_planner.prefetch_from_outlines(presentation_outlines.slides)
+        try:
+            # 7. Generate slide content concurrently (batched), then build slides and fetch assets
+            slides: List[SlideModel] = []
+
+            slide_layout_indices = presentation_structure.slides
+            slide_layouts = [layout_model.slides[idx] for idx in slide_layout_indices]
+
+            # Only the source passages relevant to each slide go into its prompt
+            slide_contexts = [None] * len(slide_layouts)
+            if documents:
+                slide_contexts = await DOCUMENT_RETRIEVAL_SERVICE.get_slide_contexts(
+                    documents,
+                    [
+                        presentation_outlines.slides[i].content
+                        for i in range(len(slide_layouts))
+                    ],
                 )
-                slides.append(slide)
-                batch_slides.append(slide)
 
-            # Start asset fetch tasks for just-generated slides so they run while next batch is processed
-            asset_tasks = [
-                process_slide_and_fetch_assets(image_generation_service, slide)
-                for slide in batch_slides
-            ]
-            async_assets_generation_tasks.extend(asset_tasks)
+            # Schedule slide content generation and asset fetching in batches of 10
+            batch_size = 10
+            for start in range(0, len(slide_layouts), batch_size):
+                end = min(start + batch_size, len(slide_layouts))
+
+                print(f"Generating slides from {start} to {end}")
+
+                # Generate contents for this batch concurrently
+                content_tasks = [
+                    get_slide_content_from_type_and_outline(
+                        slide_layouts[i],
+                        presentation_outlines.slides[i],
+                        request.language,
+                        request.tone.value,
+                        request.verbosity.value,
+                        request.instructions,
+                        slide_contexts[i],
+                    )
+                    for i in range(start, end)
+                ]
+                batch_contents: List[dict] = await asyncio.gather(*content_tasks)
+
+                # Build slides for this batch
+                for offset, slide_content in enumerate(batch_contents):
+                    i = start + offset
+                    slide_layout = slide_layouts[i]
+                    slide = SlideModel(
+                        presentation=presentation_id,
+                        layout_group=layout_model.name,
+                        layout=slide_layout.id,
+                        index=i,
+                        speaker_note=slide_content.get("__speaker_note__"),
+                        content=slide_content,
+                    )
+                    slides.append(slide)
+                    asset_planner.add_slide(slide)
 
-        if async_status:
-            async_status.message = "Fetching assets for slides"
-            async_status.updated_at = datetime.now()
-            sql_session.add(async_status)
-            await sql_session.commit()
+            if async_status:
+                async_status.message = "Fetching assets for slides"
+                async_status.updated_at = datetime.now()
+                sql_session.add(async_status)
+                await sql_session.commit()
 
-        # Run all asset tasks concurrently while batches may still be generating content
-        generated_assets_list = await asyncio.gather(*async_assets_generation_tasks)
-        generated_assets = []
-        for assets_list in generated_assets_list:
-            generated_assets.extend(assets_list)
+            # Fetch the assets of all slides together, so repeated prompts are fetched once
+            generated_assets = IMAGE_ASSET_SERVICE.get_unique(
+                await asset_planner.fetch_assets()
+            )
+        finally:
+            # Stops the prefetch of a deck that failed before fetching assets
+            await asset_planner.close()
 
         # 8. Save PresentationModel and Slides
         sql_session.add(presentation)
@@ -0,0 +1,37 @@
+"""
+Builds the icon embedding artifact loaded by the icon search.
+
+Run from servers/fastapi at build time:
+    python build_icon_embeddings.py
+
+If the embedding model cannot be loaded, nothing is written and the icons
+are embedded on the first search.
+"""
+
+from constants.assets import ICON_EMBEDDINGS_DIRECTORY
+from services.embedding_service import EMBEDDING_SERVICE
+from services.icon_finder_service import (
+    get_icon_documents,
+    get_icon_documents_hash,
+    save_icon_embeddings,
+)
+
+
+def main():
+    ids, documents = get_icon_documents()
+    print(f"Embedding {len(documents)} icons...")
+    try:
+        embeddings = EMBEDDING_SERVICE.embed(documents)
+    except Exception as e:
+        # The build should not fail without the model, the API embeds the
+        # icons on the first search instead
+        print(f"Could not embed icons, they will be embedded at runtime: {e}")
+        return
+    save_icon_embeddings(
+        ICON_EMBEDDINGS_DIRECTORY, ids, embeddings, get_icon_documents_hash(documents)
+    )
+    print(f"Icon embeddings written to {ICON_EMBEDDINGS_DIRECTORY}")
+
+
+if __name__ == "__main__":
+    main()
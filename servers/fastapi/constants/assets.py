@@ -0,0 +1,69 @@
+# Shared HTTP downloader
+DEFAULT_DOWNLOAD_MAX_CONNECTIONS = 32
+DEFAULT_DOWNLOAD_MAX_CONNECTIONS_PER_HOST = 6
+DEFAULT_DOWNLOAD_TIMEOUT = 60
+DEFAULT_DOWNLOAD_RETRIES = 3
+
+# Downloaded assets are reused without revalidation for this many seconds
+DEFAULT_ASSET_CACHE_TTL = 24 * 60 * 60
+# Least recently used blobs are removed once the cache grows past this size
+DEFAULT_ASSET_CACHE_SIZE_MB = 1024
+
+# Icon search
+ICONS_METADATA_PATH = "assets/icons.json"
+# Built with build_icon_embeddings.py, bump the version when the model changes
+ICON_EMBEDDINGS_DIRECTORY = "assets/icon_embeddings"
+ICON_EMBEDDINGS_VERSION = 1
+ICON_SEARCH_BACKENDS = ["numpy", "chroma"]
+DEFAULT_ICON_SEARCH_BACKEND = "numpy"
+DEFAULT_ICON_SEARCH_CACHE_SIZE = 2048
+
+# Stock image search
+DEFAULT_STOCK_IMAGE_CACHE_TTL = 60 * 60
+DEFAULT_STOCK_IMAGE_CACHE_SIZE = 1024
+STOCK_IMAGE_RESULTS_PER_QUERY = 10
+# Longest a search waits for the provider quota before giving up
+STOCK_IMAGE_MAX_RATE_LIMIT_WAIT = 30
+PEXELS_MAX_CONCURRENCY = 4
+# Pexels allows 200 requests per hour by default
+PEXELS_RATE_LIMIT = 200
+PEXELS_RATE_LIMIT_WINDOW = 60 * 60
+PIXABAY_MAX_CONCURRENCY = 4
+# Pixabay allows 100 requests per 60 seconds
+PIXABAY_RATE_LIMIT = 100
+PIXABAY_RATE_LIMIT_WINDOW = 60
+
+# Deck asset planning
+DEFAULT_ASSET_GENERATION_CONCURRENCY = 4
+# Generated image prompts at least this similar share one image
+IMAGE_PROMPT_SIMILARITY_THRESHOLD = 0.92
+# Image prompts at least this similar to a prefetched outline query use its results
+IMAGE_PREFETCH_MATCH_THRESHOLD = 0.75
+IMAGE_PREFETCH_QUERY_MAX_WORDS = 8
+
+# Stock images copied into the images directory at generation time
+DEFAULT_IMAGE_MIRROR_CONCURRENCY = 8
+
+# Smaller copies of images served to thumbnails
+IMAGE_VARIANT_WIDTHS = [320, 640, 1280]
+# Width asked for by the slide previews of the presentation list
+IMAGE_PREVIEW_WIDTH = 320
+# Best first, formats the installed Pillow cannot write are skipped
+IMAGE_VARIANT_FORMATS = ["avif", "webp"]
+IMAGE_VARIANT_QUALITY = 75
+DEFAULT_IMAGE_VARIANT_POOL_SIZE = 2
+
+# Image assets whose perceptual hashes differ in at most this many bits look alike
+DEFAULT_SIMILAR_IMAGE_MAX_DISTANCE = 10
+MAX_SIMILAR_IMAGES = 20
+# Assets hashed by the startup backfill before each commit
+IMAGE_HASH_BACKFILL_BATCH_SIZE = 50
+
+# Image generation queue of each provider
+DEFAULT_IMAGE_GENERATION_MAX_IN_FLIGHT = 4
+DEFAULT_IMAGE_GENERATION_TIMEOUT = 90
+DEFAULT_IMAGE_GENERATION_RETRIES = 1
+IMAGE_GENERATION_RETRY_BACKOFF = 0.5
+# Failed generations in a row that open the circuit, and how long it stays open
+DEFAULT_IMAGE_GENERATION_CIRCUIT_FAILURES = 3
+DEFAULT_IMAGE_GENERATION_CIRCUIT_COOLDOWN = 60
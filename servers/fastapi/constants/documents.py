@@ -18,3 +18,48 @@ WEBP_MIME_TYPES = ["image/webp"]
 UPLOAD_ACCEPTED_FILE_TYPES = (
     PDF_MIME_TYPES + TEXT_MIME_TYPES + POWERPOINT_TYPES + WORD_TYPES
 )
+
+# Uploads are written to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_SIZE_MB = 100
+
+
+# LibreOffice conversion workers
+LIBREOFFICE_BINARY = "libreoffice"
+DEFAULT_LIBREOFFICE_POOL_SIZE = 2
+DEFAULT_LIBREOFFICE_WORKER_MAX_JOBS = 50
+DEFAULT_LIBREOFFICE_JOB_TIMEOUT = 300
+
+
+# Docling conversion workers
+DEFAULT_DOCLING_POOL_SIZE = 1
+DEFAULT_DOCLING_TIMEOUT = 600
+
+# Number of files parsed at the same time when loading documents
+DEFAULT_DOCUMENTS_LOAD_CONCURRENCY = 4
+
+# Size budget of the parsed documents cache in megabytes, 0 disables the cache
+DEFAULT_DOCUMENT_CACHE_SIZE_MB = 1024
+
+# PDF page rasterization
+DEFAULT_PDF_RASTER_POOL_SIZE = 4
+DEFAULT_PDF_RASTER_DPI = 150
+DEFAULT_PDF_RASTER_FORMAT = "png"
+DEFAULT_PDF_RASTER_QUALITY = 85
+PDF_RASTER_FORMATS = ["png", "webp", "jpeg"]
+
+# Retrieval of document passages for outline and slide prompts
+DEFAULT_DOCUMENT_CONTEXT_MAX_TOKENS = 8000
+DEFAULT_SLIDE_CONTEXT_MAX_TOKENS = 1000
+DEFAULT_OUTLINE_CONTEXT_TOP_K = 40
+DEFAULT_SLIDE_CONTEXT_TOP_K = 4
+DOCUMENT_PASSAGE_MAX_TOKENS = 200
+
+# Summaries of documents that do not fit the outline context
+DEFAULT_SUMMARY_CONCURRENCY = 4
+SUMMARY_PART_MAX_TOKENS = 6000
+SUMMARY_MAX_REDUCE_ROUNDS = 4
+# Bump whenever summary prompts change so cached summaries are not reused
+SUMMARY_CACHE_VERSION = 1
+# Size budget of the summaries cache in megabytes, 0 disables the cache
+DEFAULT_SUMMARY_CACHE_SIZE_MB = 64
@@ -4,3 +4,6 @@ OPENAI_URL = "https://api.openai.com/v1"
 DEFAULT_OPENAI_MODEL = "gpt-4.1"
 DEFAULT_GOOGLE_MODEL = "models/gemini-2.5-flash"
 DEFAULT_ANTHROPIC_MODEL = "claude-sonnet-4-20250514"
+
+# Rough number of characters per token, used to keep prompts within a budget
+APPROX_CHARS_PER_TOKEN = 4
@@ -1 +1,10 @@
 DEFAULT_TEMPLATES = ["general", "modern", "standard", "swift"]
+
+# Resolution used to right-size pictures to their box in exported PPTX files
+DEFAULT_PPTX_IMAGE_DPI = 96
+DEFAULT_PPTX_JPEG_QUALITY = 85
+
+# Rendered slides kept on disk to speed up re-exports, 0 disables the cache
+DEFAULT_PPTX_SLIDE_CACHE_SIZE = 1000
+# Bump whenever slide rendering changes so stale cached slides are not reused
+PPTX_SLIDE_CACHE_VERSION = 1
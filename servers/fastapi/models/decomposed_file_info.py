@@ -1,6 +1,9 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 
 class DecomposedFileInfo(BaseModel):
     name: str
     file_path: str
+    error: Optional[str] = None
@@ -0,0 +1,13 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class IconSearchCacheStats(BaseModel):
+    entries: int
+    max_entries: int
+    semantic_threshold: Optional[float] = None
+    exact_hits: int
+    semantic_hits: int
+    misses: int
+    hit_rate: float
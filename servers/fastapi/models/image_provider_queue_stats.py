@@ -0,0 +1,21 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+from enums.circuit_state import CircuitState
+
+
+class ImageProviderQueueStats(BaseModel):
+    provider: str
+    state: CircuitState
+    max_in_flight: int
+    in_flight: int
+    queued: int
+    succeeded: int
+    failed: int
+    timeouts: int
+    retries: int
+    short_circuited: int
+    rate_limited: int
+    consecutive_failures: int
+    average_latency: Optional[float] = None
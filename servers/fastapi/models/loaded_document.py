@@ -0,0 +1,11 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class LoadedDocument(BaseModel):
+    index: int
+    file_path: str
+    document: str = ""
+    images: List[str] = []
+    error: Optional[str] = None
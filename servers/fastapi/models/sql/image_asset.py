@@ -17,4 +17,8 @@ class ImageAsset(SQLModel, table=True):
     )
     is_uploaded: bool = Field(default=False)
     path: str
+    # SHA-256 of the file, and a 64 bit difference hash of its pixels in hex.
+    # Similar hashes are found by scanning them all, so that one has no index
+    content_hash: Optional[str] = Field(default=None, index=True)
+    perceptual_hash: Optional[str] = Field(default=None)
     extras: Optional[dict] = Field(sa_column=Column(JSON), default=None)
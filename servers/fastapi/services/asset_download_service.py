@@ -0,0 +1,398 @@
+import asyncio
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+import uuid
+
+import aiohttp
+from pydantic import BaseModel
+
+from constants.assets import (
+    DEFAULT_ASSET_CACHE_SIZE_MB,
+    DEFAULT_ASSET_CACHE_TTL,
+    DEFAULT_DOWNLOAD_MAX_CONNECTIONS,
+    DEFAULT_DOWNLOAD_MAX_CONNECTIONS_PER_HOST,
+    DEFAULT_DOWNLOAD_RETRIES,
+    DEFAULT_DOWNLOAD_TIMEOUT,
+)
+from utils.asset_directory_utils import get_cache_directory
+from utils.get_env import (
+    get_asset_cache_size_mb_env,
+    get_asset_cache_ttl_env,
+    get_download_max_connections_env,
+    get_download_max_connections_per_host_env,
+    get_download_retries_env,
+    get_download_timeout_env,
+)
+from utils.parsers import parse_int_or_none
+
+
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class CachedAssetEntry(BaseModel):
+    url: str
+    blob: str
+    filename: Optional[str] = None
+    content_type: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    validated_at: float
+
+
+class AssetDownloadService:
+    """
+    Downloads files through one pooled aiohttp session and keeps them in a
+    content-addressed cache on disk.
+
+    Blobs are stored by the SHA-256 of their bytes, and an index entry keyed by
+    the URL points to the blob. Entries younger than the TTL are served without
+    touching the network, older ones are revalidated with ETag/Last-Modified.
+
+    Callers that read a blob after the fetch returns ask for it pinned, which
+    keeps the blob from being pruned until they unpin it.
+    """
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Lock of every url being fetched and the number of callers using it
+        self._url_locks: dict[str, Tuple[asyncio.Lock, int]] = {}
+        self._blobs_size: Optional[int] = None
+        # Number of callers still reading each blob
+        self._pinned: Dict[str, int] = {}
+
+        self.max_connections = (
+            parse_int_or_none(get_download_max_connections_env())
+            or DEFAULT_DOWNLOAD_MAX_CONNECTIONS
+        )
+        self.max_connections_per_host = (
+            parse_int_or_none(get_download_max_connections_per_host_env())
+            or DEFAULT_DOWNLOAD_MAX_CONNECTIONS_PER_HOST
+        )
+        self.timeout = (
+            parse_int_or_none(get_download_timeout_env()) or DEFAULT_DOWNLOAD_TIMEOUT
+        )
+        retries = parse_int_or_none(get_download_retries_env())
+        self.retries = DEFAULT_DOWNLOAD_RETRIES if retries is None else retries
+        ttl = parse_int_or_none(get_asset_cache_ttl_env())
+        self.cache_ttl = DEFAULT_ASSET_CACHE_TTL if ttl is None else ttl
+        size_mb = parse_int_or_none(get_asset_cache_size_mb_env())
+        size_mb = DEFAULT_ASSET_CACHE_SIZE_MB if size_mb is None else size_mb
+        self.max_size = size_mb * 1024 * 1024
+
+    @property
+    def cache_directory(self) -> str:
+        return get_cache_directory("assets")
+
+    def get_session(self) -> aiohttp.ClientSession:
+        # Sessions are bound to the loop they were created on
+        loop = asyncio.get_running_loop()
+        if (
+            self._session is None
+            or self._session.closed
+            or self._session_loop is not loop
+        ):
+            self._session = aiohttp.ClientSession(
+                trust_env=True,
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections,
+                    limit_per_host=self.max_connections_per_host,
+                ),
+                timeout=aiohttp.ClientTimeout(
+                    total=self.timeout, connect=min(self.timeout, 10)
+                ),
+            )
+            self._session_loop = loop
+            self._url_locks = {}
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+    def _get_url_key(self, url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _get_index_path(self, url: str) -> str:
+        index_directory = os.path.join(self.cache_directory, "index")
+        os.makedirs(index_directory, exist_ok=True)
+        return os.path.join(index_directory, f"{self._get_url_key(url)}.json")
+
+    def _get_blobs_directory(self) -> str:
+        blobs_directory = os.path.join(self.cache_directory, "blobs")
+        os.makedirs(blobs_directory, exist_ok=True)
+        return blobs_directory
+
+    def _read_entry(self, url: str) -> Optional[CachedAssetEntry]:
+        index_path = self._get_index_path(url)
+        try:
+            with open(index_path, "r") as f:
+                entry = CachedAssetEntry(**json.load(f))
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(entry.blob):
+            return None
+        return entry
+
+    def _write_entry(self, entry: CachedAssetEntry):
+        index_path = self._get_index_path(entry.url)
+        temp_path = f"{index_path}.{uuid.uuid4()}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(entry.model_dump_json())
+        os.replace(temp_path, index_path)
+
+    def _acquire_lock(self, url: str) -> asyncio.Lock:
+        lock, users = self._url_locks.get(url, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._url_locks[url] = (lock, users + 1)
+        return lock
+
+    def _release_lock(self, url: str, lock: asyncio.Lock):
+        current_lock, users = self._url_locks.get(url, (None, 0))
+        # The locks are reset when the session moves to another loop
+        if current_lock is not lock:
+            return
+        if users <= 1:
+            self._url_locks.pop(url, None)
+        else:
+            self._url_locks[url] = (lock, users - 1)
+
+    def _touch(self, path: str):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _get_blobs(self) -> List[Tuple[float, int, str]]:
+        blobs = []
+        with os.scandir(self._get_blobs_directory()) as entries:
+            for entry in entries:
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                blobs.append((stat.st_mtime, stat.st_size, entry.path))
+        return blobs
+
+    def _add_blob(self, blob_path: str):
+        """Counts a new blob and prunes the cache once it is over budget."""
+        if self._blobs_size is None:
+            self._blobs_size = sum(size for _, size, _ in self._get_blobs())
+        else:
+            try:
+                self._blobs_size += os.path.getsize(blob_path)
+            except OSError:
+                pass
+        if self._blobs_size > self.max_size:
+            self.prune(keep=blob_path)
+
+    def _pin(self, blob_path: str):
+        self._pinned[blob_path] = self._pinned.get(blob_path, 0) + 1
+
+    def unpin(self, blob_paths: Iterable[Optional[str]]):
+        for blob_path in blob_paths:
+            users = self._pinned.get(blob_path, 0)
+            if users <= 1:
+                self._pinned.pop(blob_path, None)
+            else:
+                self._pinned[blob_path] = users - 1
+
+    def prune(self, keep: Optional[str] = None):
+        blobs = self._get_blobs()
+        total_size = sum(size for _, size, _ in blobs)
+        blobs.sort()
+        for _, size, blob_path in blobs:
+            if total_size <= self.max_size:
+                break
+            if blob_path == keep or blob_path in self._pinned:
+                continue
+            try:
+                os.remove(blob_path)
+            except OSError:
+                continue
+            total_size -= size
+        self._blobs_size = total_size
+
+    async def fetch(
+        self, url: str, headers: Optional[dict] = None, pin: bool = False
+    ) -> Optional[str]:
+        """
+        Returns the path of the cached blob for url, downloading it if needed.
+        Returns None if the file could not be downloaded.
+        """
+        entry = await self.fetch_entry(url, headers, pin)
+        return entry.blob if entry else None
+
+    async def fetch_entry(
+        self, url: str, headers: Optional[dict] = None, pin: bool = False
+    ) -> Optional[CachedAssetEntry]:
+        self.get_session()
+        lock = self._acquire_lock(url)
+        try:
+            async with lock:
+                entry = self._read_entry(url)
+                if not entry or time.time() - entry.validated_at >= self.cache_ttl:
+                    try:
+                        entry = await self._download_with_retries(url, headers, entry)
+                    except Exception as e:
+                        print(f"Error downloading file from {url}: {e}")
+                        # A stale copy is better than nothing when the origin is down
+                else:
+                    self._touch(entry.blob)
+                if entry and pin:
+                    self._pin(entry.blob)
+                return entry
+        finally:
+            self._release_lock(url, lock)
+
+    async def fetch_many(
+        self, urls: List[str], headers: Optional[dict] = None, pin: bool = False
+    ) -> List[Optional[str]]:
+        results = await asyncio.gather(
+            *[self.fetch(url, headers, pin) for url in urls], return_exceptions=True
+        )
+        return [None if isinstance(each, Exception) else each for each in results]
+
+    async def _download_with_retries(
+        self,
+        url: str,
+        headers: Optional[dict],
+        entry: Optional[CachedAssetEntry],
+    ) -> Optional[CachedAssetEntry]:
+        attempt = 0
+        while True:
+            try:
+                return await self._download(url, headers, entry)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt >= self.retries:
+                    raise
+                print(f"Retrying download of {url} after error: {e}")
+            attempt += 1
+            await asyncio.sleep(min(0.5 * 2**attempt, 8))
+
+    async def _download(
+        self,
+        url: str,
+        headers: Optional[dict],
+        entry: Optional[CachedAssetEntry],
+    ) -> Optional[CachedAssetEntry]:
+        request_headers = dict(headers or {})
+        if entry and entry.etag:
+            request_headers["If-None-Match"] = entry.etag
+        if entry and entry.last_modified:
+            request_headers["If-Modified-Since"] = entry.last_modified
+
+        session = self.get_session()
+        async with session.get(url, headers=request_headers) as response:
+            if response.status == 304 and entry:
+                entry.validated_at = time.time()
+                self._write_entry(entry)
+                self._touch(entry.blob)
+                return entry
+
+            if response.status in RETRYABLE_STATUS_CODES:
+                raise aiohttp.ClientResponseError(
+                    response.request_info,
+                    response.history,
+                    status=response.status,
+                    message=f"HTTP status {response.status}",
+                )
+
+            if response.status != 200:
+                print(f"Failed to download file. HTTP status: {response.status}")
+                return None
+
+            content_type = response.headers.get("Content-Type", "").split(";")[0]
+            filename = self._get_filename(
+                url, response.headers.get("Content-Disposition", ""), content_type
+            )
+            extension = os.path.splitext(filename)[1] if filename else ""
+
+            blobs_directory = self._get_blobs_directory()
+            temp_path = os.path.join(blobs_directory, f"{uuid.uuid4()}.tmp")
+            sha256 = hashlib.sha256()
+            try:
+                with open(temp_path, "wb") as file:
+                    async for chunk in response.content.iter_chunked(65536):
+                        sha256.update(chunk)
+                        file.write(chunk)
+
+                blob_path = os.path.join(
+                    blobs_directory, f"{sha256.hexdigest()}{extension}"
+                )
+                if os.path.exists(blob_path):
+                    os.remove(temp_path)
+                    self._touch(blob_path)
+                else:
+                    os.replace(temp_path, blob_path)
+                    self._add_blob(blob_path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+            new_entry = CachedAssetEntry(
+                url=url,
+                blob=blob_path,
+                filename=filename,
+                content_type=content_type or None,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+                validated_at=time.time(),
+            )
+            self._write_entry(new_entry)
+            print(f"File downloaded successfully: {url}")
+            return new_entry
+
+    def _get_filename(
+        self, url: str, content_disposition: str, content_type: str
+    ) -> Optional[str]:
+        filename = os.path.basename(urlparse(url).path)
+        if filename and "." in filename:
+            return filename
+
+        if "filename=" in content_disposition:
+            return os.path.basename(
+                content_disposition.split("filename=")[1].strip("\"'")
+            )
+
+        if content_type:
+            extension = mimetypes.guess_extension(content_type)
+            if extension:
+                return f"{uuid.uuid4()}{extension}"
+
+        return None
+
+    async def download_file(
+        self, url: str, save_directory: str, headers: Optional[dict] = None
+    ) -> Optional[str]:
+        """
+        Copies the cached file for url into save_directory and returns its path.
+        """
+        entry = await self.fetch_entry(url, headers, pin=True)
+        if not entry:
+            return None
+
+        try:
+            os.makedirs(save_directory, exist_ok=True)
+            save_path = os.path.join(
+                save_directory, entry.filename or str(uuid.uuid4())
+            )
+            await asyncio.to_thread(shutil.copyfile, entry.blob, save_path)
+            return save_path
+        finally:
+            self.unpin([entry.blob])
+
+
+ASSET_DOWNLOAD_SERVICE = AssetDownloadService()
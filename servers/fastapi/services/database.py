@@ -1,5 +1,6 @@
 from collections.abc import AsyncGenerator
 import os
+from sqlalchemy import Connection, Table, inspect, text
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     create_async_engine,
@@ -48,24 +49,46 @@ async def get_container_db_async_session() -> AsyncGenerator[AsyncSession, None]
         yield session
 
 
+def add_missing_columns(sync_conn: Connection, tables: list[Table]):
+    """
+    create_all does not change tables that already exist, so nullable columns
+    added to a model later are added to them here, with their indexes.
+    """
+    inspector = inspect(sync_conn)
+    for table in tables:
+        existing_columns = {
+            each["name"] for each in inspector.get_columns(table.name)
+        }
+        missing_columns = [
+            each for each in table.columns if each.name not in existing_columns
+        ]
+        for column in missing_columns:
+            column_type = column.type.compile(dialect=sync_conn.dialect)
+            sync_conn.execute(
+                text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+            )
+        for index in table.indexes:
+            if any(each in missing_columns for each in index.columns):
+                index.create(sync_conn, checkfirst=True)
+
+
 # Create Database and Tables
 async def create_db_and_tables():
+    tables = [
+        PresentationModel.__table__,
+        SlideModel.__table__,
+        KeyValueSqlModel.__table__,
+        ImageAsset.__table__,
+        PresentationLayoutCodeModel.__table__,
+        TemplateModel.__table__,
+        WebhookSubscription.__table__,
+        AsyncPresentationGenerationTaskModel.__table__,
+    ]
     async with sql_engine.begin() as conn:
         await conn.run_sync(
-            lambda sync_conn: SQLModel.metadata.create_all(
-                sync_conn,
-                tables=[
-                    PresentationModel.__table__,
-                    SlideModel.__table__,
-                    KeyValueSqlModel.__table__,
-                    ImageAsset.__table__,
-                    PresentationLayoutCodeModel.__table__,
-                    TemplateModel.__table__,
-                    WebhookSubscription.__table__,
-                    AsyncPresentationGenerationTaskModel.__table__,
-                ],
-            )
+            lambda sync_conn: SQLModel.metadata.create_all(sync_conn, tables=tables)
         )
+        await conn.run_sync(add_missing_columns, tables)
 
     async with container_db_engine.begin() as conn:
         await conn.run_sync(
@@ -0,0 +1,230 @@
+import asyncio
+import re
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from constants.assets import (
+    DEFAULT_ASSET_GENERATION_CONCURRENCY,
+    IMAGE_PREFETCH_MATCH_THRESHOLD,
+    IMAGE_PREFETCH_QUERY_MAX_WORDS,
+    IMAGE_PROMPT_SIMILARITY_THRESHOLD,
+)
+from models.image_prompt import ImagePrompt
+from models.presentation_outline_model import SlideOutlineModel
+from models.sql.image_asset import ImageAsset
+from models.sql.slide import SlideModel
+from services.embedding_service import EMBEDDING_SERVICE
+from services.icon_finder_service import ICON_FINDER_SERVICE
+from services.image_generation_service import ImageGenerationService
+from services.stock_image_service import STOCK_IMAGE_SERVICE
+from utils.dict_utils import get_dict_at_path, get_dict_paths_with_key, set_dict_at_path
+from utils.get_env import (
+    get_asset_generation_concurrency_env,
+    get_image_prefetch_env,
+)
+from utils.parsers import parse_bool_or_none, parse_int_or_none
+
+
+def get_image_query_from_outline(outline: SlideOutlineModel) -> Optional[str]:
+    """Returns the first line of the outline without markdown, cut to a few words."""
+    for line in outline.content.splitlines():
+        line = re.sub(r"[#*_`>|\[\]]", " ", line)
+        line = re.sub(r"^(\s*([-+]|\d+\.)\s+)+", "", line)
+        words = line.split()
+        if words:
+            query = " ".join(words[:IMAGE_PREFETCH_QUERY_MAX_WORDS])
+            return None if query.lower().startswith("table of contents") else query
+    return None
+
+
+class DeckAssetPlanner:
+    """
+    Collects the images and icons of every slide of a deck before fetching
+    any of them.
+
+    Generated images are requested once per distinct prompt, and prompts that
+    only differ slightly share one image. Stock images are still picked per
+    slide, the stock image service searches each query only once. All icons
+    of the deck are searched in one batch, and image requests share a
+    concurrency budget.
+
+    With IMAGE_PREFETCH enabled and a stock provider selected, stock images
+    are searched from the outlines while the slide content is generated.
+    Image prompts close enough to one of those searches then use its results.
+    """
+
+    def __init__(self, image_generation_service: ImageGenerationService):
+        self.image_generation_service = image_generation_service
+        self.concurrency = (
+            parse_int_or_none(get_asset_generation_concurrency_env())
+            or DEFAULT_ASSET_GENERATION_CONCURRENCY
+        )
+        self.prefetch_enabled = parse_bool_or_none(get_image_prefetch_env()) or False
+        self._images: List[Tuple[SlideModel, list]] = []
+        self._icons: List[Tuple[SlideModel, list]] = []
+        self._prefetch_task: Optional[asyncio.Task] = None
+        self._prefetched_queries: List[str] = []
+        self._prefetched_embeddings: Optional[np.ndarray] = None
+
+    def prefetch_from_outlines(self, outlines: List[SlideOutlineModel]):
+        """Starts searching stock images for the outlines in the background."""
+        provider = self.image_generation_service.get_stock_provider()
+        if not self.prefetch_enabled or not provider or self._prefetch_task:
+            return
+
+        queries = [get_image_query_from_outline(each) for each in outlines]
+        queries = list(dict.fromkeys(each for each in queries if each))
+        self._prefetch_task = asyncio.create_task(self._prefetch(provider, queries))
+
+    async def _prefetch(self, provider, queries: List[str]):
+        results = await asyncio.gather(
+            *[STOCK_IMAGE_SERVICE.search(provider, each) for each in queries],
+            return_exceptions=True,
+        )
+        found = [
+            query
+            for query, result in zip(queries, results)
+            if result and not isinstance(result, Exception)
+        ]
+        print(f"Prefetched stock images for {len(found)} of {len(queries)} outlines")
+        try:
+            if found:
+                self._prefetched_embeddings = await EMBEDDING_SERVICE.embed_async(found)
+                self._prefetched_queries = found
+            # Icons are searched right after the slides, so open the index now
+            await asyncio.to_thread(ICON_FINDER_SERVICE.get_index)
+        except Exception as e:
+            print(f"Could not prepare prefetched image queries: {e}")
+
+    async def match_prefetched_queries(self, prompts: List[str]) -> List[str]:
+        """Swaps prompts for the prefetched query they are most similar to."""
+        if self._prefetch_task is None:
+            return prompts
+        await self._prefetch_task
+        if not self._prefetched_queries or not prompts:
+            return prompts
+
+        try:
+            embeddings = await EMBEDDING_SERVICE.embed_async(prompts)
+        except Exception as e:
+            print(f"Could not match image prompts to prefetched queries: {e}")
+            return prompts
+
+        similarities = embeddings @ self._prefetched_embeddings.T
+        matched = []
+        for prompt, scores in zip(prompts, similarities):
+            best = int(np.argmax(scores))
+            if scores[best] >= IMAGE_PREFETCH_MATCH_THRESHOLD:
+                matched.append(self._prefetched_queries[best])
+            else:
+                matched.append(prompt)
+        return matched
+
+    async def close(self):
+        """Stops the prefetch, for decks that failed before using it."""
+        task, self._prefetch_task = self._prefetch_task, None
+        if task is None:
+            return
+        task.cancel()
+        await asyncio.wait([task])
+        if not task.cancelled():
+            # Retrieved so a failed prefetch is not reported as never retrieved
+            task.exception()
+
+    def add_slide(self, slide: SlideModel):
+        for path in get_dict_paths_with_key(slide.content, "__image_prompt__"):
+            self._images.append((slide, path))
+        for path in get_dict_paths_with_key(slide.content, "__icon_query__"):
+            self._icons.append((slide, path))
+
+    @staticmethod
+    def normalize(prompt: str) -> str:
+        return " ".join(prompt.lower().split())
+
+    async def group_image_prompts(
+        self, prompts: List[str]
+    ) -> Tuple[List[str], List[int]]:
+        """
+        Returns the prompts to request and, for every prompt, the index of the
+        request whose image it uses.
+        """
+        if self.image_generation_service.is_stock_provider_selected():
+            prompts = await self.match_prefetched_queries(prompts)
+            return prompts, list(range(len(prompts)))
+
+        normalized = [self.normalize(each) for each in prompts]
+        unique = list(dict.fromkeys(normalized))
+        representatives = list(range(len(unique)))
+        if len(unique) > 1:
+            try:
+                embeddings = await EMBEDDING_SERVICE.embed_async(unique)
+                similarities = embeddings @ embeddings.T
+                for i in range(len(unique)):
+                    for j in range(i):
+                        if (
+                            representatives[j] == j
+                            and similarities[i, j] >= IMAGE_PROMPT_SIMILARITY_THRESHOLD
+                        ):
+                            representatives[i] = j
+                            break
+            except Exception as e:
+                print(f"Could not compare image prompts, only exact duplicates are merged: {e}")
+
+        request_indices = {}
+        requests = []
+        for i, each in enumerate(unique):
+            if representatives[i] == i:
+                request_indices[i] = len(requests)
+                requests.append(prompts[normalized.index(each)])
+
+        unique_indices = {each: i for i, each in enumerate(unique)}
+        groups = [
+            request_indices[representatives[unique_indices[each]]]
+            for each in normalized
+        ]
+        return requests, groups
+
+    async def fetch_assets(self) -> List[ImageAsset]:
+        """Fills in the image and icon urls of all slides added so far."""
+        image_prompts = [
+            get_dict_at_path(slide.content, path)["__image_prompt__"]
+            for slide, path in self._images
+        ]
+        icon_queries = [
+            get_dict_at_path(slide.content, path)["__icon_query__"]
+            for slide, path in self._icons
+        ]
+        requests, groups = await self.group_image_prompts(image_prompts)
+        if len(requests) < len(image_prompts):
+            print(f"Generating {len(requests)} images for {len(image_prompts)} prompts")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def generate_image(prompt: str):
+            async with semaphore:
+                return await self.image_generation_service.generate_image(
+                    ImagePrompt(prompt=prompt)
+                )
+
+        images, icons = await asyncio.gather(
+            asyncio.gather(*[generate_image(each) for each in requests]),
+            ICON_FINDER_SERVICE.search_icons_batch(icon_queries),
+        )
+
+        for (slide, path), group in zip(self._images, groups):
+            image = images[group]
+            image_dict = get_dict_at_path(slide.content, path)
+            image_dict["__image_url__"] = (
+                image.path if isinstance(image, ImageAsset) else image
+            )
+            set_dict_at_path(slide.content, path, image_dict)
+
+        for (slide, path), icon in zip(self._icons, icons):
+            icon_dict = get_dict_at_path(slide.content, path)
+            icon_dict["__icon_url__"] = icon[0]
+            set_dict_at_path(slide.content, path, icon_dict)
+
+        self._images = []
+        self._icons = []
+        return [each for each in images if isinstance(each, ImageAsset)]
@@ -1,3 +1,9 @@
+import asyncio
+from importlib.metadata import PackageNotFoundError, version
+import multiprocessing
+from multiprocessing.connection import Connection
+from typing import List, Optional
+
 from docling.document_converter import (
     DocumentConverter,
     PdfFormatOption,
@@ -7,27 +13,198 @@ from docling.document_converter import (
 from docling.datamodel.pipeline_options import PdfPipelineOptions
 from docling.datamodel.base_models import InputFormat
 
+from constants.documents import DEFAULT_DOCLING_POOL_SIZE, DEFAULT_DOCLING_TIMEOUT
+from utils.get_env import get_docling_pool_size_env, get_docling_timeout_env
+from utils.parsers import parse_int_or_none
+
+
+# Converter of the current worker process, created once per process
+_converter: Optional[DocumentConverter] = None
+
+DOCLING_DO_OCR = False
+
+
+def create_converter() -> DocumentConverter:
+    pipeline_options = PdfPipelineOptions()
+    pipeline_options.do_ocr = DOCLING_DO_OCR
+
+    return DocumentConverter(
+        allowed_formats=[InputFormat.PPTX, InputFormat.PDF, InputFormat.DOCX],
+        format_options={
+            InputFormat.DOCX: WordFormatOption(
+                pipeline_options=pipeline_options,
+            ),
+            InputFormat.PPTX: PowerpointFormatOption(
+                pipeline_options=pipeline_options,
+            ),
+            InputFormat.PDF: PdfFormatOption(
+                pipeline_options=pipeline_options,
+            ),
+        },
+    )
+
+
+def init_worker():
+    global _converter
+    if _converter is None:
+        _converter = create_converter()
+
+
+def convert_to_markdown(file_path: str) -> str:
+    init_worker()
+    result = _converter.convert(file_path)
+    return result.document.export_to_markdown()
+
+
+def run_worker(connection: Connection):
+    """Converts the files sent over connection until it is closed."""
+    init_worker()
+    while True:
+        try:
+            file_path = connection.recv()
+        except EOFError:
+            return
+        try:
+            connection.send((True, convert_to_markdown(file_path)))
+        except Exception as e:
+            connection.send((False, f"{type(e).__name__}: {e}"))
+
+
+class DoclingWorker:
+    """A worker process that keeps its converter loaded between jobs."""
+
+    def __init__(self):
+        self.process: Optional[multiprocessing.Process] = None
+        self.connection: Optional[Connection] = None
+
+    @property
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def start(self):
+        # Forking a process with running threads and loaded models is unsafe
+        context = multiprocessing.get_context("spawn")
+        connection, child_connection = context.Pipe()
+        process = context.Process(target=run_worker, args=(child_connection,))
+        try:
+            process.start()
+        except BaseException:
+            connection.close()
+            raise
+        finally:
+            child_connection.close()
+        self.process = process
+        self.connection = connection
+
+    def kill(self):
+        """Kills the process, the thread waiting on it then sees the pipe close."""
+        if self.process is not None and self.process.is_alive():
+            self.process.kill()
+            self.process.join(10)
+
+    def stop(self):
+        if self.process is not None:
+            if self.process.is_alive():
+                self.process.kill()
+            self.process.join(10)
+        if self.connection is not None:
+            self.connection.close()
+        self.process = None
+        self.connection = None
+
+    def convert(self, file_path: str) -> str:
+        """Sends a job to the process and blocks until its result arrives."""
+        try:
+            self.connection.send(file_path)
+            is_success, result = self.connection.recv()
+        except (EOFError, OSError):
+            raise Exception(f"Document conversion worker crashed on {file_path}")
+        if not is_success:
+            raise Exception(result)
+        return result
+
 
 class DoclingService:
+    """
+    Runs Docling conversions in a pool of worker processes.
+
+    Each worker builds its converter and layout models once when it starts,
+    so requests only pay for the conversion itself and never block the
+    event loop. Workers start on first use and run one job at a time, so a
+    job that times out or crashes its worker only takes down that worker,
+    which is started again for the next job.
+    """
+
     def __init__(self):
-        self.pipeline_options = PdfPipelineOptions()
-        self.pipeline_options.do_ocr = False
-
-        self.converter = DocumentConverter(
-            allowed_formats=[InputFormat.PPTX, InputFormat.PDF, InputFormat.DOCX],
-            format_options={
-                InputFormat.DOCX: WordFormatOption(
-                    pipeline_options=self.pipeline_options,
-                ),
-                InputFormat.PPTX: PowerpointFormatOption(
-                    pipeline_options=self.pipeline_options,
-                ),
-                InputFormat.PDF: PdfFormatOption(
-                    pipeline_options=self.pipeline_options,
-                ),
-            },
+        self.pool_size = (
+            parse_int_or_none(get_docling_pool_size_env()) or DEFAULT_DOCLING_POOL_SIZE
+        )
+        self.timeout = (
+            parse_int_or_none(get_docling_timeout_env()) or DEFAULT_DOCLING_TIMEOUT
         )
+        self._workers: List[DoclingWorker] = []
+        self._idle_workers: Optional[asyncio.Queue[DoclingWorker]] = None
+
+    @property
+    def parser_tag(self) -> str:
+        """Identifies parse output, changes with the docling version or options."""
+        try:
+            docling_version = version("docling")
+        except PackageNotFoundError:
+            docling_version = "unknown"
+        return f"docling={docling_version};ocr={DOCLING_DO_OCR}"
+
+    def _ensure_pool(self):
+        if self._idle_workers is not None:
+            return
+        self._idle_workers = asyncio.Queue()
+        for _ in range(self.pool_size):
+            worker = DoclingWorker()
+            self._workers.append(worker)
+            self._idle_workers.put_nowait(worker)
+
+    async def parse_to_markdown(
+        self, file_path: str, timeout: Optional[int] = None
+    ) -> str:
+        """Converts file_path to markdown in a worker process."""
+        self._ensure_pool()
+        # Jobs wait for an idle worker first, so the timeout only covers the
+        # conversion itself
+        worker = await self._idle_workers.get()
+        try:
+            if not worker.is_alive:
+                await asyncio.to_thread(worker.stop)
+                await asyncio.to_thread(worker.start)
+            return await self._run(worker, file_path, timeout)
+        finally:
+            self._idle_workers.put_nowait(worker)
+
+    async def _run(
+        self,
+        worker: DoclingWorker,
+        file_path: str,
+        timeout: Optional[int],
+    ) -> str:
+        try:
+            return await asyncio.wait_for(
+                asyncio.to_thread(worker.convert, file_path),
+                timeout or self.timeout,
+            )
+        except asyncio.TimeoutError:
+            # A running conversion can not be cancelled, so its worker is killed.
+            # Waiting for it to exit blocks, so it is kept off the event loop
+            await asyncio.to_thread(worker.kill)
+            raise Exception(
+                f"Document conversion timed out after {timeout or self.timeout} seconds"
+            )
+        except Exception:
+            if not worker.is_alive:
+                await asyncio.to_thread(worker.stop)
+            raise
+
+    def close(self):
+        for worker in self._workers:
+            worker.stop()
+
 
-    def parse_to_markdown(self, file_path: str) -> str:
-        result = self.converter.convert(file_path)
-        return result.document.export_to_markdown()
+DOCLING_SERVICE = DoclingService()
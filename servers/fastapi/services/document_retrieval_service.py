@@ -0,0 +1,200 @@
+from collections import OrderedDict
+import hashlib
+from typing import List, Optional
+
+import numpy as np
+
+from constants.documents import (
+    DEFAULT_DOCUMENT_CONTEXT_MAX_TOKENS,
+    DEFAULT_OUTLINE_CONTEXT_TOP_K,
+    DEFAULT_SLIDE_CONTEXT_MAX_TOKENS,
+    DEFAULT_SLIDE_CONTEXT_TOP_K,
+    DOCUMENT_PASSAGE_MAX_TOKENS,
+)
+from services.document_summary_service import DOCUMENT_SUMMARY_SERVICE
+from services.embedding_service import EMBEDDING_SERVICE
+from services.score_based_chunker import ScoreBasedChunker
+from utils.get_env import (
+    get_document_context_max_tokens_env,
+    get_document_summarization_env,
+    get_slide_context_max_tokens_env,
+)
+from utils.parsers import parse_bool_or_none, parse_int_or_none
+from utils.token_utils import estimate_token_count, truncate_to_token_count
+
+
+MAX_CACHED_INDEXES = 8
+
+
+class DocumentIndex:
+    """Passages of a set of documents and, once needed, their embeddings."""
+
+    def __init__(self, documents: List[str], passages: List[str]):
+        self.documents = documents
+        self.passages = passages
+        self.passage_tokens = [estimate_token_count(each) for each in passages]
+        self.embeddings: Optional[np.ndarray] = None
+
+    @property
+    def full_text(self) -> str:
+        return "\n\n".join(self.documents)
+
+    @property
+    def total_tokens(self) -> int:
+        return estimate_token_count(self.full_text)
+
+    def select_passages(
+        self, query_embedding: np.ndarray, max_tokens: int, top_k: int
+    ) -> str:
+        """
+        Takes the most similar passages until top_k or the token budget is
+        reached and joins them in document order.
+        """
+        scores = self.embeddings @ query_embedding
+        selected = []
+        used_tokens = 0
+        for index in np.argsort(-scores):
+            if len(selected) >= top_k:
+                break
+            if used_tokens + self.passage_tokens[index] > max_tokens:
+                continue
+            selected.append(int(index))
+            used_tokens += self.passage_tokens[index]
+
+        return "\n\n".join(self.passages[index] for index in sorted(selected))
+
+
+class DocumentRetrievalService:
+    """
+    Builds small in-memory retrieval indexes over uploaded documents, so the
+    outline and every slide only get the passages relevant to them instead
+    of the whole documents.
+
+    Documents that already fit in the budget are passed as they are and are
+    never embedded. Indexes are kept for the last few document sets, so the
+    outline and slide steps of a presentation share one index.
+    """
+
+    def __init__(self):
+        self.outline_max_tokens = (
+            parse_int_or_none(get_document_context_max_tokens_env())
+            or DEFAULT_DOCUMENT_CONTEXT_MAX_TOKENS
+        )
+        self.slide_max_tokens = (
+            parse_int_or_none(get_slide_context_max_tokens_env())
+            or DEFAULT_SLIDE_CONTEXT_MAX_TOKENS
+        )
+        summarization = parse_bool_or_none(get_document_summarization_env())
+        self.summarization_enabled = summarization is not False
+        self._chunker = ScoreBasedChunker()
+        self._indexes: OrderedDict[str, DocumentIndex] = OrderedDict()
+
+    def split_passages(self, text: str) -> List[str]:
+        """Splits text by headings, then packs paragraphs into small passages."""
+        heading_offsets = self._chunker.get_heading_offsets(text)
+        section_starts = [0] + [each.start for each in heading_offsets]
+        section_ends = section_starts[1:] + [len(text)]
+
+        passages = []
+        for start, end in zip(section_starts, section_ends):
+            current = ""
+            for paragraph in text[start:end].split("\n\n"):
+                paragraph = paragraph.strip()
+                if not paragraph:
+                    continue
+                while estimate_token_count(paragraph) > DOCUMENT_PASSAGE_MAX_TOKENS:
+                    if current:
+                        passages.append(current)
+                        current = ""
+                    head = truncate_to_token_count(
+                        paragraph, DOCUMENT_PASSAGE_MAX_TOKENS
+                    )
+                    passages.append(head)
+                    paragraph = paragraph[len(head) :].strip()
+                candidate = f"{current}\n\n{paragraph}" if current else paragraph
+                if estimate_token_count(candidate) > DOCUMENT_PASSAGE_MAX_TOKENS:
+                    passages.append(current)
+                    current = paragraph
+                else:
+                    current = candidate
+            if current:
+                passages.append(current)
+        return passages
+
+    def get_index(self, documents: List[str]) -> DocumentIndex:
+        documents = [each for each in documents if each and each.strip()]
+        key = hashlib.sha256("\0".join(documents).encode("utf-8")).hexdigest()
+
+        index = self._indexes.get(key)
+        if index is None:
+            passages = []
+            for document in documents:
+                passages.extend(self.split_passages(document))
+            index = DocumentIndex(documents, passages)
+            self._indexes[key] = index
+            while len(self._indexes) > MAX_CACHED_INDEXES:
+                self._indexes.popitem(last=False)
+        self._indexes.move_to_end(key)
+        return index
+
+    async def ensure_embeddings(self, index: DocumentIndex):
+        if index.embeddings is None:
+            index.embeddings = await EMBEDDING_SERVICE.embed_async(index.passages)
+
+    async def get_outline_context(
+        self, documents: List[str], query: Optional[str]
+    ) -> str:
+        """
+        Returns the documents as they are if they fit the outline budget.
+        Otherwise returns their summaries, or if summarization is off or
+        fails, the passages most relevant to the user's prompt, or the best
+        scoring sections when there is no prompt to compare with.
+        """
+        index = self.get_index(documents)
+        if index.total_tokens <= self.outline_max_tokens:
+            return index.full_text
+
+        if self.summarization_enabled:
+            try:
+                summaries = await DOCUMENT_SUMMARY_SERVICE.summarize_documents(
+                    index.documents, self.outline_max_tokens
+                )
+                return "\n\n".join(summaries)
+            except Exception as e:
+                print(f"Could not summarize documents, selecting passages: {e}")
+
+        if not query or not query.strip():
+            chunks = await self._chunker.get_chunks_for_token_budget(
+                index.full_text, self.outline_max_tokens
+            )
+            return "\n\n".join(
+                f"{each.heading}\n{each.content}".strip() for each in chunks
+            )
+
+        await self.ensure_embeddings(index)
+        query_embedding = (await EMBEDDING_SERVICE.embed_async([query]))[0]
+        return index.select_passages(
+            query_embedding, self.outline_max_tokens, DEFAULT_OUTLINE_CONTEXT_TOP_K
+        )
+
+    async def get_slide_contexts(
+        self, documents: List[str], slide_outlines: List[str]
+    ) -> List[str]:
+        """Returns the source passages relevant to each slide outline."""
+        index = self.get_index(documents)
+        if not index.passages:
+            return ["" for _ in slide_outlines]
+        if index.total_tokens <= self.slide_max_tokens:
+            return [index.full_text for _ in slide_outlines]
+
+        await self.ensure_embeddings(index)
+        query_embeddings = await EMBEDDING_SERVICE.embed_async(slide_outlines)
+        return [
+            index.select_passages(
+                query_embedding, self.slide_max_tokens, DEFAULT_SLIDE_CONTEXT_TOP_K
+            )
+            for query_embedding in query_embeddings
+        ]
+
+
+DOCUMENT_RETRIEVAL_SERVICE = DocumentRetrievalService()
@@ -0,0 +1,233 @@
+import asyncio
+import hashlib
+import os
+from typing import List, Optional, Tuple
+import uuid
+
+from constants.documents import (
+    DEFAULT_SUMMARY_CACHE_SIZE_MB,
+    DEFAULT_SUMMARY_CONCURRENCY,
+    SUMMARY_CACHE_VERSION,
+    SUMMARY_MAX_REDUCE_ROUNDS,
+    SUMMARY_PART_MAX_TOKENS,
+)
+from services.score_based_chunker import ScoreBasedChunker
+from utils.asset_directory_utils import get_cache_directory
+from utils.get_env import get_summary_cache_size_mb_env, get_summary_concurrency_env
+from utils.llm_calls.generate_document_summary import generate_document_summary
+from utils.llm_provider import get_model
+from utils.parsers import parse_int_or_none
+from utils.token_utils import estimate_token_count, truncate_to_token_count
+
+
+class DocumentSummaryService:
+    """
+    Shrinks documents that do not fit a token budget with map-reduce
+    summarization.
+
+    A document is split along its headings into parts the model can read
+    whole, the parts are summarized in parallel, and the summaries are
+    combined in rounds until they fit the budget. Every summary is cached on
+    disk by the hash of its input, so decks made from the same source reuse
+    them. Summaries are evicted least recently used first once the cache
+    grows past its size budget.
+    """
+
+    def __init__(self):
+        self.concurrency = (
+            parse_int_or_none(get_summary_concurrency_env())
+            or DEFAULT_SUMMARY_CONCURRENCY
+        )
+        size_mb = parse_int_or_none(get_summary_cache_size_mb_env())
+        size_mb = DEFAULT_SUMMARY_CACHE_SIZE_MB if size_mb is None else size_mb
+        self.max_cache_size = size_mb * 1024 * 1024
+        # Measured on the first write, then kept up to date by every write
+        self._cache_size: Optional[int] = None
+        self._chunker = ScoreBasedChunker()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def split_parts(self, text: str, max_tokens: int) -> List[str]:
+        """Packs consecutive heading sections into parts of at most max_tokens."""
+        section_starts = [0] + [
+            each.start for each in self._chunker.get_heading_offsets(text)
+        ]
+        section_ends = section_starts[1:] + [len(text)]
+
+        parts = []
+        current = ""
+        for start, end in zip(section_starts, section_ends):
+            section = text[start:end]
+            if estimate_token_count(current + section) <= max_tokens:
+                current += section
+                continue
+            if current.strip():
+                parts.append(current.strip())
+            current = ""
+            # A single section longer than a part is cut where it has to be
+            while estimate_token_count(section) > max_tokens:
+                head = truncate_to_token_count(section, max_tokens)
+                parts.append(head.strip())
+                section = section[len(head) :]
+            current = section
+        if current.strip():
+            parts.append(current.strip())
+        return parts
+
+    def _get_cache_path(self, key: str) -> str:
+        return os.path.join(get_cache_directory("summaries"), f"{key}.md")
+
+    def _get_cache_key(self, text: str, max_tokens: int, is_combining: bool) -> str:
+        return hashlib.sha256(
+            "|".join(
+                [
+                    str(SUMMARY_CACHE_VERSION),
+                    get_model() or "",
+                    str(max_tokens),
+                    str(is_combining),
+                    text,
+                ]
+            ).encode("utf-8")
+        ).hexdigest()
+
+    def _read_cache(self, key: str) -> Optional[str]:
+        if self.max_cache_size <= 0:
+            return None
+
+        cache_path = self._get_cache_path(key)
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                summary = f.read()
+        except OSError:
+            return None
+
+        # Touch the summary so pruning drops least recently used ones first
+        try:
+            os.utime(cache_path)
+        except OSError:
+            pass
+        return summary
+
+    def _write_cache(self, key: str, summary: str):
+        if self.max_cache_size <= 0:
+            return
+
+        cache_path = self._get_cache_path(key)
+        temp_path = f"{cache_path}.{uuid.uuid4()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(summary)
+        os.replace(temp_path, cache_path)
+
+        if self._cache_size is None:
+            self._cache_size = sum(size for _, size, _ in self._get_cache_entries())
+        else:
+            self._cache_size += os.path.getsize(cache_path)
+        if self._cache_size > self.max_cache_size:
+            self.prune()
+
+    def _get_cache_entries(self) -> List[Tuple[float, int, str]]:
+        cache_directory = get_cache_directory("summaries")
+        entries = []
+        for name in os.listdir(cache_directory):
+            path = os.path.join(cache_directory, name)
+            try:
+                entries.append((os.path.getmtime(path), os.path.getsize(path), path))
+            except OSError:
+                continue
+        return entries
+
+    def prune(self):
+        entries = self._get_cache_entries()
+        total_size = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_cache_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+        self._cache_size = total_size
+
+    async def summarize(
+        self, text: str, max_tokens: int, is_combining: bool = False
+    ) -> str:
+        key = self._get_cache_key(text, max_tokens, is_combining)
+        summary = self._read_cache(key)
+        if summary is not None:
+            return summary
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            summary = await generate_document_summary(text, max_tokens, is_combining)
+
+        self._write_cache(key, summary)
+        return summary
+
+    async def summarize_document(self, document: str, max_tokens: int) -> str:
+        """Returns document unchanged if it fits max_tokens, else its summary."""
+        if estimate_token_count(document) <= max_tokens:
+            return document
+
+        key = self._get_cache_key(document, max_tokens, False)
+        summary = self._read_cache(key)
+        if summary is not None:
+            print("Using cached document summary")
+            return summary
+
+        parts = self.split_parts(document, SUMMARY_PART_MAX_TOKENS)
+        part_max_tokens = max(
+            200, min(max_tokens // len(parts), SUMMARY_PART_MAX_TOKENS // 4)
+        )
+        print(f"Summarizing {len(parts)} document parts")
+        summaries = await asyncio.gather(
+            *[self.summarize(part, part_max_tokens) for part in parts]
+        )
+
+        for _ in range(SUMMARY_MAX_REDUCE_ROUNDS):
+            combined = "\n\n".join(summaries)
+            if estimate_token_count(combined) <= max_tokens:
+                break
+            if len(summaries) == 1:
+                summaries = [await self.summarize(combined, max_tokens, True)]
+                continue
+
+            groups = self.split_parts(combined, SUMMARY_PART_MAX_TOKENS)
+            group_max_tokens = max(200, max_tokens // len(groups))
+            summaries = await asyncio.gather(
+                *[self.summarize(group, group_max_tokens, True) for group in groups]
+            )
+
+        # Models do not always respect the length, so the budget is enforced here
+        summary = truncate_to_token_count("\n\n".join(summaries), max_tokens)
+        self._write_cache(key, summary)
+        return summary
+
+    async def summarize_documents(
+        self, documents: List[str], max_tokens: int
+    ) -> List[str]:
+        """
+        Fits documents into max_tokens together. Each document gets a share of
+        the budget proportional to its size, and only those over their share
+        are summarized.
+        """
+        total_tokens = sum(estimate_token_count(each) for each in documents)
+        if total_tokens <= max_tokens:
+            return documents
+
+        return await asyncio.gather(
+            *[
+                self.summarize_document(
+                    document,
+                    max(
+                        1,
+                        max_tokens * estimate_token_count(document) // total_tokens,
+                    ),
+                )
+                for document in documents
+            ]
+        )
+
+
+DOCUMENT_SUMMARY_SERVICE = DocumentSummaryService()
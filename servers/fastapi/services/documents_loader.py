@@ -1,16 +1,26 @@
 import mimetypes
 from fastapi import HTTPException
 import os, asyncio
-from typing import List, Tuple
-import pdfplumber
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
 
 from constants.documents import (
+    DEFAULT_DOCUMENTS_LOAD_CONCURRENCY,
     PDF_MIME_TYPES,
     POWERPOINT_TYPES,
     TEXT_MIME_TYPES,
     WORD_TYPES,
 )
-from services.docling_service import DoclingService
+from models.loaded_document import LoadedDocument
+from services.docling_service import DOCLING_SERVICE
+from services.parsed_document_cache_service import PARSED_DOCUMENT_CACHE_SERVICE
+from services.pdf_rasterizer_service import (
+    PDF_RASTERIZER_SERVICE,
+    get_pdf_page_count,
+    render_pdf_pages,
+)
+from services.temp_file_service import TEMP_FILE_SERVICE
+from utils.get_env import get_documents_load_concurrency_env
+from utils.parsers import parse_int_or_none
 
 
 class DocumentsLoader:
@@ -18,10 +28,12 @@ class DocumentsLoader:
     def __init__(self, file_paths: List[str]):
         self._file_paths = file_paths
 
-        self.docling_service = DoclingService()
+        self.docling_service = DOCLING_SERVICE
 
         self._documents: List[str] = []
         self._images: List[List[str]] = []
+        self._errors: List[Optional[str]] = []
+        self._file_hashes: Dict[str, str] = {}
 
     @property
     def documents(self):
@@ -31,41 +43,117 @@ class DocumentsLoader:
     def images(self):
         return self._images
 
+    @property
+    def errors(self):
+        return self._errors
+
     async def load_documents(
         self,
         temp_dir: str,
         load_text: bool = True,
         load_images: bool = False,
     ):
-        documents: List[str] = []
-        images: List[str] = []
+        async for _ in self.load_documents_iter(temp_dir, load_text, load_images):
+            pass
 
+    async def load_documents_iter(
+        self,
+        temp_dir: str,
+        load_text: bool = True,
+        load_images: bool = False,
+    ) -> AsyncGenerator[LoadedDocument, None]:
+        """
+        Loads all files concurrently and yields each one as soon as it is done.
+        Documents, images and errors are stored in the order of the file paths.
+        A file that fails to load gets an empty document and an error message.
+        """
         for file_path in self._file_paths:
             if not os.path.exists(file_path):
                 raise HTTPException(
                     status_code=404, detail=f"File {file_path} not found"
                 )
 
-            document = ""
-            imgs = []
+        concurrency = (
+            parse_int_or_none(get_documents_load_concurrency_env())
+            or DEFAULT_DOCUMENTS_LOAD_CONCURRENCY
+        )
+        semaphore = asyncio.Semaphore(concurrency)
+        queue: asyncio.Queue[LoadedDocument] = asyncio.Queue()
 
-            mime_type = mimetypes.guess_type(file_path)[0]
-            if mime_type in PDF_MIME_TYPES:
-                document, imgs = await self.load_pdf(
-                    file_path, load_text, load_images, temp_dir
-                )
-            elif mime_type in TEXT_MIME_TYPES:
-                document = await self.load_text(file_path)
-            elif mime_type in POWERPOINT_TYPES:
-                document = self.load_powerpoint(file_path)
-            elif mime_type in WORD_TYPES:
-                document = self.load_msword(file_path)
+        async def load(index: int, file_path: str):
+            async with semaphore:
+                try:
+                    # Page images are named by page number, keep files apart
+                    images_dir = os.path.join(temp_dir, str(index))
+                    if load_images:
+                        os.makedirs(images_dir, exist_ok=True)
+                    document, images = await self.load_document(
+                        file_path,
+                        load_text,
+                        load_images,
+                        images_dir,
+                    )
+                    loaded_document = LoadedDocument(
+                        index=index,
+                        file_path=file_path,
+                        document=document,
+                        images=images,
+                    )
+                except Exception as e:
+                    print(f"Failed to load document {file_path}: {e}")
+                    loaded_document = LoadedDocument(
+                        index=index, file_path=file_path, error=str(e)
+                    )
+            await queue.put(loaded_document)
 
-            documents.append(document)
-            images.append(imgs)
+        documents: List[str] = [""] * len(self._file_paths)
+        images: List[List[str]] = [[] for _ in self._file_paths]
+        errors: List[Optional[str]] = [None] * len(self._file_paths)
+
+        tasks = [
+            asyncio.create_task(load(index, file_path))
+            for index, file_path in enumerate(self._file_paths)
+        ]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                item = await queue.get()
+                documents[item.index] = item.document
+                images[item.index] = item.images
+                errors[item.index] = item.error
+                remaining -= 1
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
 
         self._documents = documents
         self._images = images
+        self._errors = errors
+
+    async def load_document(
+        self,
+        file_path: str,
+        load_text: bool,
+        load_images: bool,
+        temp_dir: str,
+    ) -> Tuple[str, List[str]]:
+        document = ""
+        imgs = []
+
+        mime_type = mimetypes.guess_type(file_path)[0]
+        if mime_type in PDF_MIME_TYPES:
+            document, imgs = await self.load_pdf(
+                file_path, load_text, load_images, temp_dir
+            )
+        elif mime_type in TEXT_MIME_TYPES:
+            document = await self.load_text(file_path)
+        elif mime_type in POWERPOINT_TYPES:
+            document = await self.load_powerpoint(file_path)
+        elif mime_type in WORD_TYPES:
+            document = await self.load_msword(file_path)
+
+        return document, imgs
 
     async def load_pdf(
         self,
@@ -78,10 +166,10 @@ class DocumentsLoader:
         document: str = ""
 
         if load_text:
-            document = self.docling_service.parse_to_markdown(file_path)
+            document = await self.parse_to_markdown(file_path)
 
         if load_images:
-            image_paths = await self.get_page_images_from_pdf_async(file_path, temp_dir)
+            image_paths = await self.get_cached_page_images(file_path, temp_dir)
 
         return document, image_paths
 
@@ -89,25 +177,86 @@ class DocumentsLoader:
         with open(file_path, "r") as file:
             return await asyncio.to_thread(file.read)
 
-    def load_msword(self, file_path: str) -> str:
-        return self.docling_service.parse_to_markdown(file_path)
+    async def load_msword(self, file_path: str) -> str:
+        return await self.parse_to_markdown(file_path)
+
+    async def load_powerpoint(self, file_path: str) -> str:
+        return await self.parse_to_markdown(file_path)
+
+    async def get_file_hash(self, file_path: str) -> str:
+        if file_path not in self._file_hashes:
+            self._file_hashes[file_path] = (
+                await PARSED_DOCUMENT_CACHE_SERVICE.get_file_hash_async(file_path)
+            )
+        return self._file_hashes[file_path]
 
-    def load_powerpoint(self, file_path: str) -> str:
-        return self.docling_service.parse_to_markdown(file_path)
+    async def parse_to_markdown(self, file_path: str) -> str:
+        if not PARSED_DOCUMENT_CACHE_SERVICE.enabled:
+            return await self.docling_service.parse_to_markdown(file_path)
+
+        file_hash = await self.get_file_hash(file_path)
+        parser_tag = self.docling_service.parser_tag
+        document = await asyncio.to_thread(
+            PARSED_DOCUMENT_CACHE_SERVICE.get_markdown, file_hash, parser_tag
+        )
+        if document is not None:
+            print(f"Using cached parse result for {file_path}")
+            return document
+
+        document = await self.docling_service.parse_to_markdown(file_path)
+        await asyncio.to_thread(
+            PARSED_DOCUMENT_CACHE_SERVICE.save_markdown, file_hash, parser_tag, document
+        )
+        return document
+
+    async def get_cached_page_images(self, file_path: str, temp_dir: str) -> List[str]:
+        if not PARSED_DOCUMENT_CACHE_SERVICE.enabled:
+            return await self.get_page_images_from_pdf_async(file_path, temp_dir)
+
+        file_hash = await self.get_file_hash(file_path)
+        images_tag = (
+            f"pdfplumber;resolution={PDF_RASTERIZER_SERVICE.dpi};"
+            f"format={PDF_RASTERIZER_SERVICE.image_format}"
+        )
+        image_paths = await asyncio.to_thread(
+            PARSED_DOCUMENT_CACHE_SERVICE.get_page_images,
+            file_hash,
+            images_tag,
+            temp_dir,
+        )
+        if image_paths is not None:
+            return image_paths
+
+        image_paths = await self.get_page_images_from_pdf_async(file_path, temp_dir)
+        await asyncio.to_thread(
+            PARSED_DOCUMENT_CACHE_SERVICE.save_page_images,
+            file_hash,
+            images_tag,
+            image_paths,
+        )
+        return image_paths
 
     @classmethod
     def get_page_images_from_pdf(cls, file_path: str, temp_dir: str) -> List[str]:
-        with pdfplumber.open(file_path) as pdf:
-            images = []
-            for page in pdf.pages:
-                img = page.to_image(resolution=150)
-                image_path = os.path.join(temp_dir, f"page_{page.page_number}.png")
-                img.save(image_path)
-                images.append(image_path)
-            return images
+        return render_pdf_pages(
+            file_path,
+            list(range(1, get_pdf_page_count(file_path) + 1)),
+            temp_dir,
+            PDF_RASTERIZER_SERVICE.dpi,
+            PDF_RASTERIZER_SERVICE.image_format,
+        )
 
     @classmethod
     async def get_page_images_from_pdf_async(cls, file_path: str, temp_dir: str):
-        return await asyncio.to_thread(
-            cls.get_page_images_from_pdf, file_path, temp_dir
-        )
+        return await PDF_RASTERIZER_SERVICE.render_pages(file_path, temp_dir)
+
+
+async def load_documents_text(file_paths: List[str]) -> List[str]:
+    """Loads the text of the given files, skipping the ones that fail."""
+    temp_dir = TEMP_FILE_SERVICE.create_temp_dir()
+    try:
+        documents_loader = DocumentsLoader(file_paths=file_paths)
+        await documents_loader.load_documents(temp_dir)
+        return [each for each in documents_loader.documents if each]
+    finally:
+        TEMP_FILE_SERVICE.cleanup_temp_dir(temp_dir)
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+from typing import TYPE_CHECKING, List, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+
+
+EMBEDDING_BATCH_SIZE = 64
+
+
+class EmbeddingService:
+    """
+    Local sentence embeddings with the ONNX MiniLM model shipped for icon
+    search. The model, and chromadb with it, is loaded once on first use and
+    shared by all callers.
+    """
+
+    def __init__(self):
+        self._embedding_function: Optional["ONNXMiniLM_L6_V2"] = None
+        self._lock = threading.Lock()
+
+    def get_embedding_function(self) -> "ONNXMiniLM_L6_V2":
+        with self._lock:
+            if self._embedding_function is None:
+                from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+
+                embedding_function = ONNXMiniLM_L6_V2()
+                embedding_function.DOWNLOAD_PATH = "chroma/models"
+                embedding_function._download_model_if_not_exists()
+                self._embedding_function = embedding_function
+        return self._embedding_function
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Returns L2 normalized embeddings, one row per text."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        embedding_function = self.get_embedding_function()
+        embeddings = []
+        for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+            embeddings.extend(
+                embedding_function(texts[start : start + EMBEDDING_BATCH_SIZE])
+            )
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+    async def embed_async(self, texts: List[str]) -> np.ndarray:
+        return await asyncio.to_thread(self.embed, texts)
+
+
+EMBEDDING_SERVICE = EmbeddingService()
@@ -1,56 +1,395 @@
 import asyncio
+from collections import OrderedDict
+import hashlib
 import json
-import chromadb
-from chromadb.config import Settings
-from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+import uuid
 
+import numpy as np
+
+from constants.assets import (
+    DEFAULT_ICON_SEARCH_BACKEND,
+    DEFAULT_ICON_SEARCH_CACHE_SIZE,
+    ICON_EMBEDDINGS_DIRECTORY,
+    ICON_EMBEDDINGS_VERSION,
+    ICON_SEARCH_BACKENDS,
+    ICONS_METADATA_PATH,
+)
+from models.icon_search_cache_stats import IconSearchCacheStats
+from services.embedding_service import EMBEDDING_SERVICE
+from utils.asset_directory_utils import get_cache_directory
+from utils.get_env import (
+    get_icon_search_backend_env,
+    get_icon_search_cache_size_env,
+    get_icon_semantic_cache_threshold_env,
+)
+from utils.parsers import parse_float_or_none, parse_int_or_none
+
+
+def get_icon_documents() -> Tuple[List[str], List[str]]:
+    """Returns the ids of the bold icons and the text each one is searched by."""
+    with open(ICONS_METADATA_PATH, "r") as f:
+        icons = json.load(f)
+
+    ids = []
+    documents = []
+    for each in icons["icons"]:
+        if each["name"].split("-")[-1] == "bold":
+            ids.append(each["name"])
+            documents.append(f"{each['name']} {each['tags']}")
+    return ids, documents
+
+
+def get_icon_documents_hash(documents: List[str]) -> str:
+    return hashlib.sha256(
+        "\0".join([str(ICON_EMBEDDINGS_VERSION), *documents]).encode("utf-8")
+    ).hexdigest()
+
+
+def get_icon_url(icon_id: str) -> str:
+    return f"/static/icons/bold/{icon_id}.svg"
+
+
+def save_icon_embeddings(
+    directory: str, ids: List[str], embeddings: np.ndarray, documents_hash: str
+):
+    """Writes the embedding matrix as .npy and the icon ids next to it."""
+    os.makedirs(directory, exist_ok=True)
+    embeddings_path = os.path.join(directory, "embeddings.npy")
+    ids_path = os.path.join(directory, "ids.json")
+
+    # np.save adds the extension when it is missing
+    temp_embeddings_path = f"{embeddings_path}.{uuid.uuid4()}.tmp.npy"
+    np.save(temp_embeddings_path, np.asarray(embeddings, dtype=np.float32))
+    os.replace(temp_embeddings_path, embeddings_path)
+
+    temp_ids_path = f"{ids_path}.{uuid.uuid4()}.tmp"
+    with open(temp_ids_path, "w") as f:
+        json.dump({"documents_hash": documents_hash, "ids": ids}, f)
+    os.replace(temp_ids_path, ids_path)
+
+
+def load_icon_embeddings(
+    directory: str, documents_hash: str
+) -> Optional[Tuple[List[str], np.ndarray]]:
+    """
+    Returns the icon ids and a memory mapped embedding matrix, or None if
+    they are missing or were built from other icons.
+    """
+    try:
+        with open(os.path.join(directory, "ids.json"), "r") as f:
+            metadata = json.load(f)
+        if metadata["documents_hash"] != documents_hash:
+            return None
+        embeddings = np.load(os.path.join(directory, "embeddings.npy"), mmap_mode="r")
+    except (OSError, ValueError, KeyError):
+        return None
+
+    if embeddings.ndim != 2 or embeddings.shape[0] != len(metadata["ids"]):
+        return None
+    return metadata["ids"], embeddings
+
+
+class NumpyIconIndex:
+    """
+    Every icon embedding in one normalized matrix. A batch of queries is
+    embedded together and ranked against all icons with a single matrix
+    product.
+
+    The matrix is memory mapped from the artifact built with
+    build_icon_embeddings.py. Without a current artifact the icons are
+    embedded once and the result is kept in the cache directory.
+    """
 
-class IconFinderService:
     def __init__(self):
-        self.collection_name = "icons"
-        self.client = chromadb.PersistentClient(
+        ids, documents = get_icon_documents()
+        documents_hash = get_icon_documents_hash(documents)
+
+        for directory in (ICON_EMBEDDINGS_DIRECTORY, get_cache_directory("icons")):
+            loaded = load_icon_embeddings(directory, documents_hash)
+            if loaded:
+                self.ids, self.embeddings = loaded
+                return
+
+        print("Prebuilt icon embeddings not found, embedding icons...")
+        self.ids = ids
+        self.embeddings = EMBEDDING_SERVICE.embed(documents)
+        save_icon_embeddings(
+            get_cache_directory("icons"), ids, self.embeddings, documents_hash
+        )
+
+    def search_embeddings(
+        self, query_embeddings: np.ndarray, k: int
+    ) -> List[List[str]]:
+        k = min(k, len(self.ids))
+        if k <= 0:
+            return [[] for _ in range(len(query_embeddings))]
+
+        scores = query_embeddings @ self.embeddings.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        return [[self.ids[index] for index in row] for row in top]
+
+    def search(self, queries: List[str], k: int) -> List[List[str]]:
+        return self.search_embeddings(EMBEDDING_SERVICE.embed(queries), k)
+
+
+class ChromaIconIndex:
+    """The icons in a persistent Chroma collection, built on first start."""
+
+    collection_name = "icons"
+
+    def __init__(self):
+        import chromadb
+        from chromadb.config import Settings
+
+        client = chromadb.PersistentClient(
             path="chroma", settings=Settings(anonymized_telemetry=False)
         )
-        print("Initializing icons collection...")
-        self._initialize_icons_collection()
-        print("Icons collection initialized.")
-
-    def _initialize_icons_collection(self):
-        self.embedding_function = ONNXMiniLM_L6_V2()
-        self.embedding_function.DOWNLOAD_PATH = "chroma/models"
-        self.embedding_function._download_model_if_not_exists()
+        embedding_function = EMBEDDING_SERVICE.get_embedding_function()
         try:
-            self.collection = self.client.get_collection(
-                self.collection_name, embedding_function=self.embedding_function
+            self.collection = client.get_collection(
+                self.collection_name, embedding_function=embedding_function
             )
         except Exception:
-            with open("assets/icons.json", "r") as f:
-                icons = json.load(f)
+            ids, documents = get_icon_documents()
+            self.collection = client.create_collection(
+                name=self.collection_name,
+                embedding_function=embedding_function,
+                metadata={"hnsw:space": "cosine"},
+            )
+            if documents:
+                self.collection.add(documents=documents, ids=ids)
 
-            documents = []
-            ids = []
+    def search(self, queries: List[str], k: int) -> List[List[str]]:
+        result = self.collection.query(query_texts=queries, n_results=k)
+        return result["ids"]
 
-            for i, each in enumerate(icons["icons"]):
-                if each["name"].split("-")[-1] == "bold":
-                    doc_text = f"{each['name']} {each['tags']}"
-                    documents.append(doc_text)
-                    ids.append(each["name"])
 
-            if documents:
-                self.collection = self.client.create_collection(
-                    name=self.collection_name,
-                    embedding_function=self.embedding_function,
-                    metadata={"hnsw:space": "cosine"},
+class IconQueryCache:
+    """
+    Icon search results by normalized query, least recently used first out.
+
+    With a similarity threshold, a query that misses is also compared with
+    the embeddings of the cached queries and reuses the results of one that
+    is at least that similar.
+    """
+
+    def __init__(self, max_entries: int, semantic_threshold: Optional[float]):
+        self.max_entries = max_entries
+        self.semantic_threshold = semantic_threshold
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        # Normalized query to the k it was searched with and the icon ids
+        self._entries: OrderedDict[str, Tuple[int, List[str]]] = OrderedDict()
+        self._embeddings: Dict[str, np.ndarray] = {}
+        self._embedding_matrix: Optional[Tuple[List[str], np.ndarray]] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def get(self, query: str, k: int) -> Optional[List[str]]:
+        key = self.normalize(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < k:
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return entry[1][:k]
+
+    def get_similar(
+        self, query_embeddings: np.ndarray, k: int
+    ) -> List[Optional[List[str]]]:
+        results: List[Optional[List[str]]] = [None] * len(query_embeddings)
+        with self._lock:
+            if self.semantic_threshold is None or not self._embeddings:
+                return results
+            if self._embedding_matrix is None:
+                keys = list(self._embeddings)
+                self._embedding_matrix = (
+                    keys,
+                    np.stack([self._embeddings[key] for key in keys]),
                 )
-                self.collection.add(documents=documents, ids=ids)
+            keys, matrix = self._embedding_matrix
+
+            scores = query_embeddings @ matrix.T
+            for i, best in enumerate(np.argmax(scores, axis=1)):
+                if scores[i, best] < self.semantic_threshold:
+                    continue
+                entry = self._entries[keys[best]]
+                if entry[0] >= k:
+                    self.semantic_hits += 1
+                    results[i] = entry[1][:k]
+        return results
+
+    def put(
+        self,
+        query: str,
+        k: int,
+        ids: List[str],
+        embedding: Optional[np.ndarray] = None,
+    ):
+        key = self.normalize(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < k:
+                self._entries[key] = (k, ids)
+            self._entries.move_to_end(key)
+            if embedding is not None and key not in self._embeddings:
+                self._embeddings[key] = embedding
+                self._embedding_matrix = None
+
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                if self._embeddings.pop(evicted, None) is not None:
+                    self._embedding_matrix = None
+
+    def record_misses(self, count: int):
+        with self._lock:
+            self.misses += count
+
+    def get_stats(self) -> IconSearchCacheStats:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return IconSearchCacheStats(
+                entries=len(self._entries),
+                max_entries=self.max_entries,
+                semantic_threshold=self.semantic_threshold,
+                exact_hits=self.exact_hits,
+                semantic_hits=self.semantic_hits,
+                misses=self.misses,
+                hit_rate=(
+                    (self.exact_hits + self.semantic_hits) / lookups if lookups else 0
+                ),
+            )
+
+
+class IconFinderService:
+    """
+    Finds icons for text queries.
+
+    Searches made while a batch is being collected, like the icon queries of
+    all slides processed together, are answered with one embedding call and
+    one search. ICON_SEARCH_BACKEND picks between the in-memory NumPy index
+    and the Chroma collection. Unless one is given, the index is opened on
+    the first search so it does not slow down startup.
 
-    async def search_icons(self, query: str, k: int = 1):
-        result = await asyncio.to_thread(
-            self.collection.query,
-            query_texts=[query],
-            n_results=k,
+    Results are cached by query. ICON_SEMANTIC_CACHE_THRESHOLD turns on reuse
+    of results for near-identical queries with the NumPy index.
+    """
+
+    def __init__(self, index: Optional[NumpyIconIndex | ChromaIconIndex] = None):
+        backend = (get_icon_search_backend_env() or DEFAULT_ICON_SEARCH_BACKEND).lower()
+        if backend not in ICON_SEARCH_BACKENDS:
+            print(
+                f"Unknown icon search backend {backend}, using {DEFAULT_ICON_SEARCH_BACKEND}"
+            )
+            backend = DEFAULT_ICON_SEARCH_BACKEND
+        self.backend = backend
+
+        cache_size = parse_int_or_none(get_icon_search_cache_size_env())
+        self.cache = IconQueryCache(
+            DEFAULT_ICON_SEARCH_CACHE_SIZE if cache_size is None else cache_size,
+            parse_float_or_none(get_icon_semantic_cache_threshold_env()),
         )
-        return [f"/static/icons/bold/{each}.svg" for each in result["ids"][0]]
+
+        self._index = index
+        self._index_lock = threading.Lock()
+        self._pending: List[Tuple[List[str], int, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def get_index(self) -> NumpyIconIndex | ChromaIconIndex:
+        with self._index_lock:
+            if self._index is None:
+                print("Initializing icons index...")
+                if self.backend == "chroma":
+                    self._index = ChromaIconIndex()
+                else:
+                    self._index = NumpyIconIndex()
+                print("Icons index initialized.")
+        return self._index
+
+    def _search_uncached(self, queries: List[str], k: int) -> List[List[str]]:
+        index = self.get_index()
+        if self.cache.semantic_threshold is None or not isinstance(
+            index, NumpyIconIndex
+        ):
+            self.cache.record_misses(len(queries))
+            results = index.search(queries, k)
+            for query, each in zip(queries, results):
+                self.cache.put(query, k, each)
+            return results
+
+        query_embeddings = EMBEDDING_SERVICE.embed(queries)
+        results = self.cache.get_similar(query_embeddings, k)
+        to_search = [i for i, each in enumerate(results) if each is None]
+        self.cache.record_misses(len(to_search))
+        if to_search:
+            searched = index.search_embeddings(query_embeddings[to_search], k)
+            for i, each in zip(to_search, searched):
+                results[i] = each
+        for i, query in enumerate(queries):
+            self.cache.put(query, k, results[i], query_embeddings[i])
+        return results
+
+    def _search(self, queries: List[str], k: int) -> List[List[str]]:
+        keys = [self.cache.normalize(query) for query in queries]
+        results = {}
+        misses = []
+        for key in dict.fromkeys(keys):
+            cached = self.cache.get(key, k)
+            if cached is None:
+                misses.append(key)
+            else:
+                results[key] = cached
+        if misses:
+            results.update(zip(misses, self._search_uncached(misses, k)))
+
+        return [[get_icon_url(each) for each in results[key]] for key in keys]
+
+    def get_cache_stats(self) -> IconSearchCacheStats:
+        return self.cache.get_stats()
+
+    async def _flush_pending(self):
+        pending, self._pending = self._pending, []
+        queries = [query for each_queries, _, _ in pending for query in each_queries]
+        try:
+            results = await asyncio.to_thread(
+                self._search, queries, max(k for _, k, _ in pending)
+            )
+        except Exception as e:
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for each_queries, k, future in pending:
+            each_results = [each[:k] for each in results[: len(each_queries)]]
+            results = results[len(each_queries) :]
+            if not future.done():
+                future.set_result(each_results)
+
+    async def search_icons_batch(self, queries: List[str], k: int = 1) -> List[List[str]]:
+        """Returns the urls of the k best icons for each query."""
+        if not queries:
+            return []
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((queries, k, future))
+        if len(self._pending) == 1:
+            # Runs after the searches already scheduled have joined the batch
+            self._flush_task = asyncio.create_task(self._flush_pending())
+        return await future
+
+    async def search_icons(self, query: str, k: int = 1) -> List[str]:
+        return (await self.search_icons_batch([query], k))[0]
 
 
 ICON_FINDER_SERVICE = IconFinderService()
@@ -0,0 +1,171 @@
+import asyncio
+import os
+from typing import List, Optional, Tuple
+
+from PIL import Image
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from constants.assets import (
+    DEFAULT_SIMILAR_IMAGE_MAX_DISTANCE,
+    IMAGE_HASH_BACKFILL_BATCH_SIZE,
+    MAX_SIMILAR_IMAGES,
+)
+from models.sql.image_asset import ImageAsset
+from services.image_variant_service import IMAGE_VARIANT_SERVICE
+from utils.image_utils import get_file_sha256, get_hash_distance, get_perceptual_hash
+
+
+class ImageAssetService:
+    """
+    Identifies image assets by their content, so an image uploaded or
+    generated again reuses the stored file and row instead of adding a copy.
+
+    Every asset gets the SHA-256 of its file, which finds exact copies through
+    an index, and a perceptual hash, which finds resized or recompressed
+    copies by the number of bits the hashes differ in.
+    """
+
+    @staticmethod
+    def get_hashes(
+        path: str, content_hash: Optional[str] = None
+    ) -> Tuple[str, Optional[str]]:
+        content_hash = content_hash or get_file_sha256(path)
+        try:
+            with Image.open(path) as image:
+                perceptual_hash = get_perceptual_hash(image)
+        except Exception:
+            # Files Pillow cannot read still dedupe by their content hash
+            perceptual_hash = None
+        return content_hash, perceptual_hash
+
+    async def set_hashes(self, asset: ImageAsset, content_hash: Optional[str] = None):
+        asset.content_hash, asset.perceptual_hash = await asyncio.to_thread(
+            self.get_hashes, asset.path, content_hash
+        )
+
+    async def find_duplicate(
+        self, sql_session: AsyncSession, asset: ImageAsset
+    ) -> Optional[ImageAsset]:
+        """
+        Returns the oldest other asset with the same content whose file still
+        exists. Uploaded and generated images are kept apart, so each keeps
+        showing up in its own list.
+        """
+        duplicates = await sql_session.scalars(
+            select(ImageAsset)
+            .where(
+                ImageAsset.content_hash == asset.content_hash,
+                ImageAsset.is_uploaded == asset.is_uploaded,
+                ImageAsset.id != asset.id,
+            )
+            .order_by(ImageAsset.created_at)
+        )
+        for duplicate in duplicates:
+            if os.path.exists(duplicate.path):
+                return duplicate
+        return None
+
+    async def deduplicate(
+        self,
+        sql_session: AsyncSession,
+        asset: ImageAsset,
+        content_hash: Optional[str] = None,
+    ) -> ImageAsset:
+        """
+        Returns the stored copy of a new asset and removes the new file, or
+        the new asset itself with its hashes set.
+        """
+        await self.set_hashes(asset, content_hash)
+        duplicate = await self.find_duplicate(sql_session, asset)
+        if duplicate is None:
+            return asset
+
+        if duplicate.path != asset.path:
+            try:
+                os.remove(asset.path)
+            except OSError:
+                pass
+            IMAGE_VARIANT_SERVICE.delete_variants(asset.path)
+        return duplicate
+
+    @staticmethod
+    def get_unique(assets: List[ImageAsset]) -> List[ImageAsset]:
+        """
+        Returns the first of the assets with the same content. Assets created
+        together, like the mirrored images of one deck, are not in the
+        database yet when each is deduplicated.
+        """
+        unique = {}
+        for asset in assets:
+            unique.setdefault(asset.content_hash or asset.path, asset)
+        return list(unique.values())
+
+    async def backfill_hashes(self, sql_session: AsyncSession):
+        """
+        Sets the hashes of assets stored before images were hashed. Runs in the
+        background, so assets are committed in batches and a restart resumes
+        where it stopped.
+        """
+        assets = await sql_session.scalars(
+            select(ImageAsset).where(ImageAsset.content_hash == None)
+        )
+        hashed = 0
+        for asset in assets.all():
+            if not os.path.exists(asset.path):
+                continue
+            await self.set_hashes(asset)
+            sql_session.add(asset)
+            hashed += 1
+            if hashed % IMAGE_HASH_BACKFILL_BATCH_SIZE == 0:
+                await sql_session.commit()
+        if hashed:
+            await sql_session.commit()
+            print(f"Hashed {hashed} image assets")
+
+    async def is_path_shared(self, sql_session: AsyncSession, asset: ImageAsset) -> bool:
+        """Whether another asset points at the file of asset."""
+        other = await sql_session.scalars(
+            select(ImageAsset.id)
+            .where(ImageAsset.path == asset.path, ImageAsset.id != asset.id)
+            .limit(1)
+        )
+        return other.first() is not None
+
+    async def find_similar(
+        self,
+        sql_session: AsyncSession,
+        asset: ImageAsset,
+        max_distance: int = DEFAULT_SIMILAR_IMAGE_MAX_DISTANCE,
+        limit: int = MAX_SIMILAR_IMAGES,
+    ) -> List[ImageAsset]:
+        """
+        Returns the assets that look like asset, most similar first. The
+        distance between hashes can not use an index, so every stored hash is
+        compared.
+        """
+        if asset.perceptual_hash is None:
+            return []
+
+        rows = await sql_session.execute(
+            select(ImageAsset.id, ImageAsset.perceptual_hash).where(
+                ImageAsset.perceptual_hash != None,
+                ImageAsset.id != asset.id,
+            )
+        )
+        distances = {}
+        for asset_id, perceptual_hash in rows:
+            distance = get_hash_distance(asset.perceptual_hash, perceptual_hash)
+            if distance <= max_distance:
+                distances[asset_id] = distance
+        if not distances:
+            return []
+
+        closest = sorted(distances, key=distances.get)[:limit]
+        similar = await sql_session.scalars(
+            select(ImageAsset).where(ImageAsset.id.in_(closest))
+        )
+        return sorted(similar, key=lambda each: distances[each.id])
+
+
+IMAGE_ASSET_SERVICE = ImageAssetService()
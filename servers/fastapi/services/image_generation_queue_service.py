@@ -0,0 +1,232 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from constants.assets import (
+    DEFAULT_IMAGE_GENERATION_CIRCUIT_COOLDOWN,
+    DEFAULT_IMAGE_GENERATION_CIRCUIT_FAILURES,
+    DEFAULT_IMAGE_GENERATION_MAX_IN_FLIGHT,
+    DEFAULT_IMAGE_GENERATION_RETRIES,
+    DEFAULT_IMAGE_GENERATION_TIMEOUT,
+    IMAGE_GENERATION_RETRY_BACKOFF,
+)
+from enums.circuit_state import CircuitState
+from enums.image_provider import ImageProvider
+from models.image_provider_queue_stats import ImageProviderQueueStats
+from services.stock_image_service import RateLimitError
+from utils.get_env import (
+    get_image_generation_circuit_cooldown_env,
+    get_image_generation_circuit_failures_env,
+    get_image_generation_max_in_flight_env,
+    get_image_generation_retries_env,
+    get_image_generation_timeout_env,
+)
+from utils.parsers import parse_float_or_none, parse_int_or_none
+
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class ImageProviderQueue:
+    """
+    Runs the image requests of one provider, at most max_in_flight at a time.
+
+    Every attempt is cut off after timeout seconds and failed requests are
+    retried. After failure_threshold requests in a row fail, the circuit
+    opens and requests fail at once with CircuitOpenError for cooldown
+    seconds. Then a single trial request is let through, which closes the
+    circuit if it succeeds or opens it again if it fails.
+
+    Requests must be cancellable coroutines, not calls run in a thread, so
+    a timed out request has stopped before its slot is given to the next.
+
+    Requests refused with RateLimitError are neither retried nor counted as
+    failures, as the provider is up and only the quota is used up.
+    """
+
+    def __init__(
+        self,
+        provider: ImageProvider,
+        max_in_flight: int,
+        timeout: float,
+        retries: int,
+        failure_threshold: int,
+        cooldown: float,
+    ):
+        self.provider = provider
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.retries = retries
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+
+        self.in_flight = 0
+        self.queued = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.retried = 0
+        self.short_circuited = 0
+        self.rate_limited = 0
+        self.consecutive_failures = 0
+        self._total_latency = 0.0
+
+    @property
+    def state(self) -> CircuitState:
+        if self._opened_at is None:
+            return CircuitState.CLOSED
+        if time.monotonic() - self._opened_at < self.cooldown:
+            return CircuitState.OPEN
+        return CircuitState.HALF_OPEN
+
+    def _check_circuit(self, start_trial: bool) -> bool:
+        """Raises if the circuit is open, returns whether this is a trial."""
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return False
+        if state == CircuitState.HALF_OPEN and not self._trial_running:
+            self._trial_running = start_trial
+            return start_trial
+        self.short_circuited += 1
+        raise CircuitOpenError(f"{self.provider.value} circuit is open")
+
+    def _record_success(self, latency: float):
+        self.succeeded += 1
+        self._total_latency += latency
+        self.consecutive_failures = 0
+        self._opened_at = None
+
+    def _record_failure(self, is_trial: bool):
+        self.failed += 1
+        self.consecutive_failures += 1
+        if is_trial or self.consecutive_failures >= self.failure_threshold:
+            if self._opened_at is None or is_trial:
+                print(f"Opening {self.provider.value} image generation circuit")
+            self._opened_at = time.monotonic()
+
+    async def run(self, func: Callable[..., Awaitable[T]], *args) -> T:
+        self._check_circuit(start_trial=False)
+        # Semaphores are bound to the loop they were first used on
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._semaphore_loop = loop
+        semaphore = self._semaphore
+
+        self.queued += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        is_trial = False
+        try:
+            # The circuit may have opened while this request was waiting
+            is_trial = self._check_circuit(start_trial=True)
+            # A trial only tells whether the provider is back, it is not retried
+            attempts = 1 if is_trial else self.retries + 1
+            for attempt in range(attempts):
+                start = time.monotonic()
+                try:
+                    result = await asyncio.wait_for(func(*args), self.timeout)
+                    self._record_success(time.monotonic() - start)
+                    return result
+                except RateLimitError:
+                    self.rate_limited += 1
+                    raise
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    error = Exception(
+                        f"{self.provider.value} did not respond in {self.timeout:.0f}s"
+                    )
+                except Exception as e:
+                    error = e
+
+                if attempt + 1 == attempts or self.state != CircuitState.CLOSED:
+                    break
+                self.retried += 1
+                await asyncio.sleep(IMAGE_GENERATION_RETRY_BACKOFF * 2**attempt)
+
+            self._record_failure(is_trial)
+            raise error
+        finally:
+            if is_trial:
+                self._trial_running = False
+            self.in_flight -= 1
+            semaphore.release()
+
+    def get_stats(self) -> ImageProviderQueueStats:
+        return ImageProviderQueueStats(
+            provider=self.provider.value,
+            state=self.state,
+            max_in_flight=self.max_in_flight,
+            in_flight=self.in_flight,
+            queued=self.queued,
+            succeeded=self.succeeded,
+            failed=self.failed,
+            timeouts=self.timeouts,
+            retries=self.retried,
+            short_circuited=self.short_circuited,
+            rate_limited=self.rate_limited,
+            consecutive_failures=self.consecutive_failures,
+            average_latency=(
+                self._total_latency / self.succeeded if self.succeeded else None
+            ),
+        )
+
+
+class ImageGenerationQueueService:
+    """
+    Keeps one queue per image provider, so a slow or failing provider is
+    limited and cut off on its own. Settings apply to every provider.
+    """
+
+    def __init__(self):
+        self.max_in_flight = (
+            parse_int_or_none(get_image_generation_max_in_flight_env())
+            or DEFAULT_IMAGE_GENERATION_MAX_IN_FLIGHT
+        )
+        self.timeout = (
+            parse_float_or_none(get_image_generation_timeout_env())
+            or DEFAULT_IMAGE_GENERATION_TIMEOUT
+        )
+        retries = parse_int_or_none(get_image_generation_retries_env())
+        self.retries = DEFAULT_IMAGE_GENERATION_RETRIES if retries is None else retries
+        self.failure_threshold = (
+            parse_int_or_none(get_image_generation_circuit_failures_env())
+            or DEFAULT_IMAGE_GENERATION_CIRCUIT_FAILURES
+        )
+        cooldown = parse_float_or_none(get_image_generation_circuit_cooldown_env())
+        self.cooldown = (
+            DEFAULT_IMAGE_GENERATION_CIRCUIT_COOLDOWN if cooldown is None else cooldown
+        )
+        self._queues: Dict[ImageProvider, ImageProviderQueue] = {}
+
+    def get_queue(self, provider: ImageProvider) -> ImageProviderQueue:
+        queue = self._queues.get(provider)
+        if queue is None:
+            queue = ImageProviderQueue(
+                provider,
+                self.max_in_flight,
+                self.timeout,
+                self.retries,
+                self.failure_threshold,
+                self.cooldown,
+            )
+            self._queues[provider] = queue
+        return queue
+
+    def get_stats(self) -> List[ImageProviderQueueStats]:
+        return [queue.get_stats() for queue in self._queues.values()]
+
+
+IMAGE_GENERATION_QUEUE_SERVICE = ImageGenerationQueueService()
@@ -1,14 +1,25 @@
-import asyncio
 import os
-import aiohttp
 from google import genai
-from google.genai.types import GenerateContentConfig
+from google.genai.types import GenerateContentConfig, HttpOptions
 from openai import AsyncOpenAI
 from models.image_prompt import ImagePrompt
 from models.sql.image_asset import ImageAsset
+from enums.image_provider import ImageProvider
+from services.database import async_session_maker
+from services.image_asset_service import IMAGE_ASSET_SERVICE
+from services.image_generation_queue_service import (
+    IMAGE_GENERATION_QUEUE_SERVICE,
+    CircuitOpenError,
+)
+from services.image_mirror_service import IMAGE_MIRROR_SERVICE
+from services.image_variant_service import IMAGE_VARIANT_SERVICE
+from services.stock_image_service import STOCK_IMAGE_SERVICE
 from utils.download_helpers import download_file
-from utils.get_env import get_pexels_api_key_env
-from utils.get_env import get_pixabay_api_key_env
+from utils.get_env import (
+    get_image_stock_fallback_env,
+    get_pexels_api_key_env,
+    get_pixabay_api_key_env,
+)
 from utils.image_provider import (
     is_pixels_selected,
     is_pixabay_selected,
@@ -16,6 +27,7 @@ from utils.image_provider import (
     is_dalle3_selected,
     is_none_selected,
 )
+from utils.parsers import parse_bool_or_none
 import uuid
 
 
@@ -24,6 +36,9 @@ class ImageGenerationService:
     def __init__(self, output_directory: str):
         self.output_directory = output_directory
         self.image_gen_func = self.get_image_gen_func()
+        self.provider = self.get_provider()
+        # Times each stock query was used, so repeated prompts get other images
+        self.stock_image_uses: dict[str, int] = {}
 
     def get_image_gen_func(self):
         if is_none_selected():
@@ -38,16 +53,37 @@ class ImageGenerationService:
             return self.generate_image_openai
         return None
 
+    def get_provider(self) -> ImageProvider | None:
+        if is_pixabay_selected():
+            return ImageProvider.PIXABAY
+        elif is_pixels_selected():
+            return ImageProvider.PEXELS
+        elif is_gemini_flash_selected():
+            return ImageProvider.GEMINI_FLASH
+        elif is_dalle3_selected():
+            return ImageProvider.DALLE3
+        return None
+
     def is_stock_provider_selected(self):
         return is_pixels_selected() or is_pixabay_selected()
 
+    def get_stock_provider(self) -> ImageProvider | None:
+        provider = self.get_provider()
+        if provider in (ImageProvider.PIXABAY, ImageProvider.PEXELS):
+            return provider
+        return None
+
     async def generate_image(self, prompt: ImagePrompt) -> str | ImageAsset:
         """
         Generates an image based on the provided prompt.
         - If no image generation function is available, returns a placeholder image.
         - If the stock provider is selected, it uses the prompt directly,
         otherwise it uses the full image prompt with theme.
-        - Output Directory is used for saving the generated image not the stock provider.
+        - Output Directory is used for saving the generated image, stock images
+        are copied into it too unless mirroring is disabled.
+        - Requests go through the provider's queue. When generation fails or
+        the provider's circuit is open, a stock image is used if a stock API
+        key is configured, otherwise a placeholder image.
         """
         if not self.image_gen_func:
             print("No image generation function found. Using placeholder image.")
@@ -59,32 +95,111 @@ class ImageGenerationService:
         print(f"Request - Generating Image for {image_prompt}")
 
         try:
+            queue = IMAGE_GENERATION_QUEUE_SERVICE.get_queue(self.provider)
             if self.is_stock_provider_selected():
-                image_path = await self.image_gen_func(image_prompt)
+                image_path = await queue.run(self.image_gen_func, image_prompt)
             else:
-                image_path = await self.image_gen_func(
-                    image_prompt, self.output_directory
+                image_path = await queue.run(
+                    self.image_gen_func, image_prompt, self.output_directory
                 )
             if image_path:
                 if image_path.startswith("http"):
-                    return image_path
+                    return await self.mirror_stock_image(image_path, prompt)
                 elif os.path.exists(image_path):
-                    return ImageAsset(
-                        path=image_path,
-                        is_uploaded=False,
-                        extras={
-                            "prompt": prompt.prompt,
-                            "theme_prompt": prompt.theme_prompt,
-                        },
+                    return await self.store_image_asset(
+                        ImageAsset(
+                            path=image_path,
+                            is_uploaded=False,
+                            extras={
+                                "prompt": prompt.prompt,
+                                "theme_prompt": prompt.theme_prompt,
+                            },
+                        )
                     )
             raise Exception(f"Image not found at {image_path}")
 
+        except CircuitOpenError as e:
+            print(f"Skipping image generation: {e}")
         except Exception as e:
             print(f"Error generating image: {e}")
-            return "/static/images/placeholder.jpg"
+        return await self.get_fallback_image(prompt)
+
+    def get_fallback_stock_provider(self) -> ImageProvider | None:
+        """Stock provider to use when the selected provider fails, if any."""
+        if self.is_stock_provider_selected():
+            return None
+        if parse_bool_or_none(get_image_stock_fallback_env()) is False:
+            return None
+        if get_pexels_api_key_env():
+            return ImageProvider.PEXELS
+        elif get_pixabay_api_key_env():
+            return ImageProvider.PIXABAY
+        return None
+
+    async def get_fallback_image(self, prompt: ImagePrompt) -> str | ImageAsset:
+        stock_provider = self.get_fallback_stock_provider()
+        if stock_provider:
+            try:
+                image_url = await IMAGE_GENERATION_QUEUE_SERVICE.get_queue(
+                    stock_provider
+                ).run(
+                    self.get_stock_image,
+                    stock_provider,
+                    prompt.get_image_prompt(with_theme=False),
+                )
+                if image_url:
+                    return await self.mirror_stock_image(image_url, prompt)
+            except Exception as e:
+                print(f"Error getting fallback stock image: {e}")
+        return "/static/images/placeholder.jpg"
+
+    async def mirror_stock_image(
+        self, image_url: str, prompt: ImagePrompt
+    ) -> str | ImageAsset:
+        """Returns the stock image as a local asset, or its url if that fails."""
+        if not IMAGE_MIRROR_SERVICE.enabled:
+            return image_url
+
+        try:
+            image_path = await IMAGE_MIRROR_SERVICE.mirror(
+                image_url, self.output_directory
+            )
+            if not image_path:
+                return image_url
+            return await self.store_image_asset(
+                ImageAsset(
+                    path=image_path,
+                    is_uploaded=False,
+                    extras={"prompt": prompt.prompt, "source_url": image_url},
+                )
+            )
+        except Exception as e:
+            print(f"Could not mirror stock image {image_url}: {e}")
+            return image_url
+
+    async def store_image_asset(self, image_asset: ImageAsset) -> ImageAsset:
+        """
+        Returns the stored asset of an image generated before, or the new
+        asset with its hashes set and its variants scheduled.
+        """
+        try:
+            async with async_session_maker() as sql_session:
+                stored_asset = await IMAGE_ASSET_SERVICE.deduplicate(
+                    sql_session, image_asset
+                )
+            if stored_asset is not image_asset:
+                return stored_asset
+        except Exception as e:
+            print(f"Could not deduplicate image {image_asset.path}: {e}")
+
+        IMAGE_VARIANT_SERVICE.schedule(image_asset.path)
+        return image_asset
 
     async def generate_image_openai(self, prompt: str, output_directory: str) -> str:
-        client = AsyncOpenAI()
+        # The queue times out and retries requests, the client must not too
+        client = AsyncOpenAI(
+            max_retries=0, timeout=IMAGE_GENERATION_QUEUE_SERVICE.timeout
+        )
         result = await client.images.generate(
             model="dall-e-3",
             prompt=prompt,
@@ -96,9 +211,14 @@ class ImageGenerationService:
         return await download_file(image_url, output_directory)
 
     async def generate_image_google(self, prompt: str, output_directory: str) -> str:
-        client = genai.Client()
-        response = await asyncio.to_thread(
-            client.models.generate_content,
+        # The async client is cancelled with the request when the queue times
+        # it out, a call run in a thread would keep going and hold no slot
+        client = genai.Client(
+            http_options=HttpOptions(
+                timeout=int(IMAGE_GENERATION_QUEUE_SERVICE.timeout * 1000)
+            )
+        )
+        response = await client.aio.models.generate_content(
             model="gemini-2.5-flash-image-preview",
             contents=[prompt],
             config=GenerateContentConfig(response_modalities=["TEXT", "IMAGE"]),
@@ -114,21 +234,21 @@ class ImageGenerationService:
 
         return image_path
 
-    async def get_image_from_pexels(self, prompt: str) -> str:
-        async with aiohttp.ClientSession(trust_env=True) as session:
-            response = await session.get(
-                f"https://api.pexels.com/v1/search?query={prompt}&per_page=1",
-                headers={"Authorization": f"{get_pexels_api_key_env()}"},
-            )
-            data = await response.json()
-            image_url = data["photos"][0]["src"]["large"]
-            return image_url
+    async def get_stock_image(
+        self, provider: ImageProvider, prompt: str
+    ) -> str | None:
+        image_urls = await STOCK_IMAGE_SERVICE.search(provider, prompt)
+        # Not an error of the provider, so it does not count against its circuit
+        if not image_urls:
+            return None
 
-    async def get_image_from_pixabay(self, prompt: str) -> str:
-        async with aiohttp.ClientSession(trust_env=True) as session:
-            response = await session.get(
-                f"https://pixabay.com/api/?key={get_pixabay_api_key_env()}&q={prompt}&image_type=photo&per_page=3"
-            )
-            data = await response.json()
-            image_url = data["hits"][0]["largeImageURL"]
-            return image_url
+        key = STOCK_IMAGE_SERVICE.normalize(prompt)
+        uses = self.stock_image_uses.get(key, 0)
+        self.stock_image_uses[key] = uses + 1
+        return image_urls[uses % len(image_urls)]
+
+    async def get_image_from_pexels(self, prompt: str) -> str | None:
+        return await self.get_stock_image(ImageProvider.PEXELS, prompt)
+
+    async def get_image_from_pixabay(self, prompt: str) -> str | None:
+        return await self.get_stock_image(ImageProvider.PIXABAY, prompt)
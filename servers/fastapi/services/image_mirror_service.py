@@ -0,0 +1,58 @@
+import asyncio
+import os
+import shutil
+from typing import Optional
+
+from constants.assets import DEFAULT_IMAGE_MIRROR_CONCURRENCY
+from services.asset_download_service import ASSET_DOWNLOAD_SERVICE
+from utils.get_env import (
+    get_image_mirror_concurrency_env,
+    get_mirror_stock_images_env,
+)
+from utils.parsers import parse_bool_or_none, parse_int_or_none
+
+
+class ImageMirrorService:
+    """
+    Copies stock images into the images directory while a deck is generated,
+    so exports read them from disk and old decks survive expired provider
+    urls. Set MIRROR_STOCK_IMAGES=false to keep the remote urls instead.
+    """
+
+    def __init__(self):
+        self.enabled = parse_bool_or_none(get_mirror_stock_images_env()) is not False
+        self.concurrency = (
+            parse_int_or_none(get_image_mirror_concurrency_env())
+            or DEFAULT_IMAGE_MIRROR_CONCURRENCY
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def mirror(self, url: str, output_directory: str) -> Optional[str]:
+        """
+        Returns the local path of the image at url, or None if it could not be
+        downloaded. The file is named by its content hash, so an image chosen
+        twice is stored once.
+        """
+        # Semaphores are bound to the loop they were first used on
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._semaphore_loop = loop
+
+        async with self._semaphore:
+            entry = await ASSET_DOWNLOAD_SERVICE.fetch_entry(url, pin=True)
+        if not entry:
+            return None
+
+        try:
+            os.makedirs(output_directory, exist_ok=True)
+            image_path = os.path.join(output_directory, os.path.basename(entry.blob))
+            if not os.path.exists(image_path):
+                await asyncio.to_thread(shutil.copyfile, entry.blob, image_path)
+            return image_path
+        finally:
+            ASSET_DOWNLOAD_SERVICE.unpin([entry.blob])
+
+
+IMAGE_MIRROR_SERVICE = ImageMirrorService()
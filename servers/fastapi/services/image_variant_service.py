@@ -0,0 +1,196 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+import shutil
+from typing import List, Optional, Set
+from urllib.parse import urlencode
+import uuid
+
+from PIL import Image, features
+
+from constants.assets import (
+    DEFAULT_IMAGE_VARIANT_POOL_SIZE,
+    IMAGE_VARIANT_FORMATS,
+    IMAGE_VARIANT_QUALITY,
+    IMAGE_VARIANT_WIDTHS,
+)
+from utils.asset_directory_utils import get_images_directory
+from utils.get_env import get_image_variant_pool_size_env
+from utils.parsers import parse_int_or_none
+
+
+def get_variants_directory(image_path: str) -> str:
+    """
+    Variants of images/<name> are stored as images/variants/<name>/<width>.<format>,
+    so they are served from the same place as the image itself.
+    """
+    return os.path.join(
+        os.path.dirname(image_path), "variants", os.path.basename(image_path)
+    )
+
+
+def get_variant_url(image_url: str, width: int) -> str:
+    """
+    Returns the url of the variant endpoint for a stored image, or image_url
+    itself for placeholders and remote images.
+    """
+    images_directory = os.path.realpath(get_images_directory())
+    image_path = os.path.realpath(image_url)
+    if os.path.commonpath([images_directory, image_path]) != images_directory:
+        return image_url
+    return "/api/v1/ppt/images/variant?" + urlencode(
+        {"path": image_url, "width": width}
+    )
+
+
+def create_image_variants(
+    image_path: str, widths: List[int], image_formats: List[str]
+) -> List[str]:
+    """
+    Writes every format at each width smaller than the image, plus one at the
+    image's own width. Runs in a worker process.
+    """
+    variants_directory = get_variants_directory(image_path)
+    os.makedirs(variants_directory, exist_ok=True)
+
+    variant_paths = []
+    with Image.open(image_path) as image:
+        image.load()
+        has_alpha = "A" in image.getbands() or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+        variant_widths = sorted({w for w in widths if w < image.width} | {image.width})
+        for width in variant_widths:
+            height = max(1, round(image.height * width / image.width))
+            resized = (
+                image
+                if width == image.width
+                else image.resize((width, height), Image.Resampling.LANCZOS)
+            )
+            for image_format in image_formats:
+                if not features.check(image_format):
+                    continue
+                variant_path = os.path.join(variants_directory, f"{width}.{image_format}")
+                temp_path = f"{variant_path}.{uuid.uuid4()}.tmp"
+                resized.save(temp_path, format=image_format, quality=IMAGE_VARIANT_QUALITY)
+                os.replace(temp_path, variant_path)
+                variant_paths.append(variant_path)
+    return variant_paths
+
+
+class ImageVariantService:
+    """
+    Creates resized WebP/AVIF copies of images in a pool of worker processes.
+
+    Variants are made in the background when an image asset is created, and
+    the slide previews of the presentation list ask for them through
+    get_variant_url. The editor and exports keep using the original images.
+    get_best_variant picks the smallest one that is at least as wide as
+    requested in the best format the client accepts.
+    """
+
+    def __init__(self):
+        self.pool_size = parse_int_or_none(get_image_variant_pool_size_env()) or min(
+            DEFAULT_IMAGE_VARIANT_POOL_SIZE, os.cpu_count() or 1
+        )
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._scheduled: Set[str] = set()
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.pool_size,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def create_variants(self, image_path: str) -> List[str]:
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            executor = self.get_executor()
+            try:
+                return await loop.run_in_executor(
+                    executor,
+                    create_image_variants,
+                    image_path,
+                    IMAGE_VARIANT_WIDTHS,
+                    IMAGE_VARIANT_FORMATS,
+                )
+            except BrokenProcessPool:
+                if attempt:
+                    raise
+                # Other jobs of the broken pool may have replaced it already
+                if self._executor is executor:
+                    print("Image variant pool broke, starting a new one")
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    self._executor = None
+
+    async def _create_variants_in_background(self, image_path: str):
+        try:
+            await self.create_variants(image_path)
+        except Exception as e:
+            print(f"Could not create variants of {image_path}: {e}")
+
+    def has_variants(self, image_path: str) -> bool:
+        try:
+            return any(
+                not name.endswith(".tmp")
+                for name in os.listdir(get_variants_directory(image_path))
+            )
+        except OSError:
+            return False
+
+    def schedule(self, image_path: str):
+        """
+        Starts creating the variants of image_path without waiting for them,
+        unless they exist or are being created already.
+        """
+        # Mirrored images are named by their content, so the same file comes
+        # back every time the image is chosen again
+        if image_path in self._scheduled or self.has_variants(image_path):
+            return
+
+        task = asyncio.create_task(self._create_variants_in_background(image_path))
+        # Keeps the task referenced until it is done
+        self._scheduled.add(image_path)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(lambda _: self._scheduled.discard(image_path))
+
+    def get_best_variant(
+        self, image_path: str, width: Optional[int], accept: str
+    ) -> Optional[str]:
+        variants_directory = get_variants_directory(image_path)
+        try:
+            names = os.listdir(variants_directory)
+        except OSError:
+            return None
+
+        for image_format in IMAGE_VARIANT_FORMATS:
+            if f"image/{image_format}" not in accept:
+                continue
+            widths = sorted(
+                int(name.split(".")[0])
+                for name in names
+                if name.endswith(f".{image_format}") and name.split(".")[0].isdigit()
+            )
+            if not widths:
+                continue
+            fitting = [each for each in widths if width is None or each >= width]
+            best_width = fitting[0] if width is not None and fitting else widths[-1]
+            return os.path.join(variants_directory, f"{best_width}.{image_format}")
+        return None
+
+    def delete_variants(self, image_path: str):
+        shutil.rmtree(get_variants_directory(image_path), ignore_errors=True)
+
+    def close(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+IMAGE_VARIANT_SERVICE = ImageVariantService()
@@ -0,0 +1,362 @@
+import asyncio
+import os
+import shutil
+import socket
+from typing import Dict, List, Optional
+
+from constants.documents import (
+    DEFAULT_LIBREOFFICE_JOB_TIMEOUT,
+    DEFAULT_LIBREOFFICE_POOL_SIZE,
+    DEFAULT_LIBREOFFICE_WORKER_MAX_JOBS,
+    LIBREOFFICE_BINARY,
+)
+from services.temp_file_service import TEMP_FILE_SERVICE
+from utils.get_env import (
+    get_libreoffice_job_timeout_env,
+    get_libreoffice_pool_size_env,
+    get_libreoffice_python_env,
+    get_libreoffice_worker_max_jobs_env,
+)
+from utils.parsers import parse_int_or_none
+
+
+UNO_CLIENT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "utils",
+    "libreoffice_uno_client.py",
+)
+UNO_PYTHON_CANDIDATES = ["/usr/lib/libreoffice/program/python", "/usr/bin/python3"]
+WORKER_STARTUP_TIMEOUT = 60
+
+
+def write_font_alias_config(font_aliases: Dict[str, str], config_path: str):
+    """Writes a fontconfig file that aliases variant family names to root families."""
+    with open(config_path, "w", encoding="utf-8") as cfg:
+        cfg.write(
+            """<?xml version='1.0'?>
+<!DOCTYPE fontconfig SYSTEM "urn:fontconfig:fonts.dtd">
+<fontconfig>
+  <include>/etc/fonts/fonts.conf</include>
+"""
+        )
+        for src, dst in sorted(font_aliases.items()):
+            cfg.write(
+                f"""
+  <match target="pattern">
+    <test name="family" compare="eq">
+      <string>{src}</string>
+    </test>
+    <edit name="family" mode="assign" binding="strong">
+      <string>{dst}</string>
+    </edit>
+  </match>
+"""
+            )
+        cfg.write("\n</fontconfig>\n")
+
+
+def get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def kill_process(process: Optional[asyncio.subprocess.Process]):
+    if not process or process.returncode is not None:
+        return
+    process.kill()
+    try:
+        await asyncio.wait_for(process.wait(), 10)
+    except asyncio.TimeoutError:
+        print(f"LibreOffice process {process.pid} did not exit after kill")
+
+
+class LibreOfficeWorker:
+    """
+    A headless LibreOffice instance with its own user profile.
+
+    With a UNO capable python available the instance is kept running and
+    jobs are sent to it over a socket. Otherwise every job runs a short lived
+    `--convert-to` process that reuses this worker's initialized profile.
+    """
+
+    def __init__(self, worker_id: int, base_dir: str, uno_python: Optional[str]):
+        self.worker_id = worker_id
+        self.profile_dir = os.path.join(base_dir, f"worker_{worker_id}")
+        self.uno_python = uno_python
+        self.jobs_done = 0
+        self.generation = -1
+        # Font aliases in effect when the instance started
+        self.font_aliases: Dict[str, str] = {}
+        self.port: Optional[int] = None
+        self.process: Optional[asyncio.subprocess.Process] = None
+
+    @property
+    def is_alive(self) -> bool:
+        if not self.uno_python:
+            return True
+        return self.process is not None and self.process.returncode is None
+
+    def _get_profile_arg(self) -> str:
+        return f"-env:UserInstallation=file://{self.profile_dir}"
+
+    async def start(self, env: dict, generation: int, font_aliases: Dict[str, str]):
+        self.jobs_done = 0
+        self.generation = generation
+        self.font_aliases = dict(font_aliases)
+        if not self.uno_python:
+            return
+
+        self.port = get_free_port()
+        self.process = await asyncio.create_subprocess_exec(
+            LIBREOFFICE_BINARY,
+            "--headless",
+            "--invisible",
+            "--nologo",
+            "--norestore",
+            "--nodefault",
+            "--nolockcheck",
+            self._get_profile_arg(),
+            f"--accept=socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext",
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+            env=env,
+        )
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + WORKER_STARTUP_TIMEOUT
+        while loop.time() < deadline:
+            if self.process.returncode is not None:
+                break
+            try:
+                _, writer = await asyncio.open_connection("127.0.0.1", self.port)
+                writer.close()
+                await writer.wait_closed()
+                print(f"LibreOffice worker {self.worker_id} listening on {self.port}")
+                return
+            except OSError:
+                await asyncio.sleep(0.25)
+
+        await self.stop()
+        raise Exception(f"LibreOffice worker {self.worker_id} failed to start")
+
+    async def stop(self):
+        await kill_process(self.process)
+        self.process = None
+        self.port = None
+
+    async def convert(
+        self,
+        input_path: str,
+        output_dir: str,
+        filter_name: str,
+        env: dict,
+        timeout: int,
+    ) -> str:
+        output_path = os.path.join(
+            output_dir, f"{os.path.splitext(os.path.basename(input_path))[0]}.pdf"
+        )
+
+        if self.uno_python:
+            command = [
+                self.uno_python,
+                UNO_CLIENT_PATH,
+                str(self.port),
+                input_path,
+                output_path,
+                filter_name,
+            ]
+        else:
+            command = [
+                LIBREOFFICE_BINARY,
+                "--headless",
+                "--norestore",
+                self._get_profile_arg(),
+                "--convert-to",
+                "pdf",
+                "--outdir",
+                output_dir,
+                input_path,
+            ]
+
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=env,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            await kill_process(process)
+            raise
+        finally:
+            self.jobs_done += 1
+
+        if stdout:
+            print(f"LibreOffice PDF conversion output: {stdout.decode(errors='ignore')}")
+        if process.returncode != 0:
+            error_msg = stderr.decode(errors="ignore") if stderr else ""
+            raise Exception(f"LibreOffice PDF conversion failed: {error_msg}")
+        if not os.path.exists(output_path):
+            raise Exception("LibreOffice failed to generate PDF file")
+        return output_path
+
+
+class LibreOfficeService:
+    """
+    Pool of LibreOffice workers for document to PDF conversion.
+
+    Workers start lazily on first use, are recycled after a number of jobs or
+    a failed job, and are restarted when fonts change since LibreOffice only
+    reads them at startup. A job that needs font aliases its worker started
+    without restarts only that worker, the others pick new aliases up when
+    they are restarted anyway.
+    """
+
+    def __init__(self):
+        self.pool_size = (
+            parse_int_or_none(get_libreoffice_pool_size_env())
+            or DEFAULT_LIBREOFFICE_POOL_SIZE
+        )
+        self.max_jobs_per_worker = (
+            parse_int_or_none(get_libreoffice_worker_max_jobs_env())
+            or DEFAULT_LIBREOFFICE_WORKER_MAX_JOBS
+        )
+        self.job_timeout = (
+            parse_int_or_none(get_libreoffice_job_timeout_env())
+            or DEFAULT_LIBREOFFICE_JOB_TIMEOUT
+        )
+
+        self._workers: List[LibreOfficeWorker] = []
+        self._idle_workers: Optional[asyncio.Queue[LibreOfficeWorker]] = None
+        self._init_lock: Optional[asyncio.Lock] = None
+        self._generation = 0
+        self._font_aliases: Dict[str, str] = {}
+        self._base_dir: Optional[str] = None
+
+    @property
+    def fonts_config_path(self) -> str:
+        return os.path.join(self._base_dir, "fonts_alias.conf")
+
+    def _get_env(self) -> dict:
+        env = os.environ.copy()
+        env["FONTCONFIG_FILE"] = self.fonts_config_path
+        return env
+
+    async def _find_uno_python(self) -> Optional[str]:
+        candidates = [get_libreoffice_python_env(), *UNO_PYTHON_CANDIDATES]
+        for candidate in candidates:
+            if not candidate or not shutil.which(candidate):
+                continue
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    candidate,
+                    "-c",
+                    "import uno",
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.DEVNULL,
+                )
+                if await asyncio.wait_for(process.wait(), 30) == 0:
+                    return candidate
+            except Exception:
+                continue
+        return None
+
+    async def _ensure_pool(self):
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
+        async with self._init_lock:
+            if self._idle_workers is not None:
+                return
+
+            self._base_dir = TEMP_FILE_SERVICE.create_temp_dir("libreoffice")
+            write_font_alias_config(self._font_aliases, self.fonts_config_path)
+
+            uno_python = await self._find_uno_python()
+            if uno_python:
+                print(f"LibreOffice workers will use UNO through {uno_python}")
+            else:
+                print("UNO not available, LibreOffice workers will run per job")
+
+            self._idle_workers = asyncio.Queue()
+            for worker_id in range(self.pool_size):
+                worker = LibreOfficeWorker(worker_id, self._base_dir, uno_python)
+                self._workers.append(worker)
+                self._idle_workers.put_nowait(worker)
+
+    def recycle_workers(self):
+        """Restarts every worker before its next job."""
+        self._generation += 1
+
+    def add_font_aliases(self, font_aliases: Dict[str, str]):
+        new_aliases = {
+            src: dst
+            for src, dst in font_aliases.items()
+            if self._font_aliases.get(src) != dst
+        }
+        if not new_aliases:
+            return
+        self._font_aliases.update(new_aliases)
+        if self._base_dir:
+            write_font_alias_config(self._font_aliases, self.fonts_config_path)
+
+    async def convert_to_pdf(
+        self,
+        input_path: str,
+        output_dir: str,
+        font_aliases: Optional[Dict[str, str]] = None,
+        filter_name: str = "impress_pdf_Export",
+        timeout: Optional[int] = None,
+    ) -> str:
+        """
+        Converts input_path to PDF inside output_dir and returns the PDF path.
+        Waits for an idle worker if all of them are busy.
+        """
+        await self._ensure_pool()
+        if font_aliases:
+            self.add_font_aliases(font_aliases)
+
+        worker = await self._idle_workers.get()
+        try:
+            is_missing_aliases = any(
+                worker.font_aliases.get(src) != dst
+                for src, dst in (font_aliases or {}).items()
+            )
+            if (
+                not worker.is_alive
+                or worker.generation != self._generation
+                or worker.jobs_done >= self.max_jobs_per_worker
+                or is_missing_aliases
+            ):
+                await worker.stop()
+                await worker.start(
+                    self._get_env(), self._generation, self._font_aliases
+                )
+
+            try:
+                return await worker.convert(
+                    input_path,
+                    output_dir,
+                    filter_name,
+                    self._get_env(),
+                    timeout or self.job_timeout,
+                )
+            except asyncio.TimeoutError:
+                await worker.stop()
+                raise Exception(
+                    f"LibreOffice PDF conversion timed out after {timeout or self.job_timeout} seconds"
+                )
+            except Exception:
+                # The instance may be left in a bad state, start fresh next time
+                await worker.stop()
+                raise
+        finally:
+            self._idle_workers.put_nowait(worker)
+
+    async def close(self):
+        for worker in self._workers:
+            await worker.stop()
+
+
+LIBREOFFICE_SERVICE = LibreOfficeService()
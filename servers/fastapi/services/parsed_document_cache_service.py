@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import os
+import shutil
+from typing import List, Optional
+import uuid
+
+from constants.documents import DEFAULT_DOCUMENT_CACHE_SIZE_MB
+from utils.asset_directory_utils import get_cache_directory
+from utils.get_env import get_document_cache_size_mb_env
+from utils.parsers import parse_int_or_none
+
+
+class ParsedDocumentCacheService:
+    """
+    Keeps parse results of uploaded documents on disk, keyed by the SHA-256 of
+    the file bytes, so uploading the same file again skips the conversion.
+
+    Every file gets an entry directory holding its markdown and page images.
+    Results are stored per parser tag, so a parser upgrade or option change
+    misses instead of serving stale output. Entries are evicted least
+    recently used first once the cache grows past its size budget.
+    """
+
+    def __init__(self):
+        size_mb = parse_int_or_none(get_document_cache_size_mb_env())
+        size_mb = DEFAULT_DOCUMENT_CACHE_SIZE_MB if size_mb is None else size_mb
+        self.max_size = size_mb * 1024 * 1024
+        # Measured on the first save, then kept up to date by every save
+        self._size: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @property
+    def cache_directory(self) -> str:
+        return get_cache_directory("documents")
+
+    def get_file_hash(self, file_path: str) -> str:
+        sha256 = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    async def get_file_hash_async(self, file_path: str) -> str:
+        return await asyncio.to_thread(self.get_file_hash, file_path)
+
+    def _get_entry_directory(self, file_hash: str) -> str:
+        return os.path.join(self.cache_directory, file_hash)
+
+    def _get_tag_name(self, tag: str) -> str:
+        return hashlib.sha256(tag.encode("utf-8")).hexdigest()[:16]
+
+    def _touch(self, file_hash: str):
+        try:
+            os.utime(self._get_entry_directory(file_hash))
+        except OSError:
+            pass
+
+    def get_markdown(self, file_hash: str, parser_tag: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+
+        markdown_path = os.path.join(
+            self._get_entry_directory(file_hash),
+            f"{self._get_tag_name(parser_tag)}.md",
+        )
+        try:
+            with open(markdown_path, "r", encoding="utf-8") as f:
+                markdown = f.read()
+        except OSError:
+            return None
+
+        self._touch(file_hash)
+        return markdown
+
+    def save_markdown(self, file_hash: str, parser_tag: str, markdown: str):
+        if not self.enabled:
+            return
+
+        entry_directory = self._get_entry_directory(file_hash)
+        os.makedirs(entry_directory, exist_ok=True)
+        markdown_path = os.path.join(
+            entry_directory, f"{self._get_tag_name(parser_tag)}.md"
+        )
+        temp_path = f"{markdown_path}.{uuid.uuid4()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(markdown)
+        os.replace(temp_path, markdown_path)
+        self._add_size(os.path.getsize(markdown_path))
+
+    def get_page_images(
+        self, file_hash: str, images_tag: str, save_directory: str
+    ) -> Optional[List[str]]:
+        """
+        Copies cached page images into save_directory and returns their paths.
+        """
+        if not self.enabled:
+            return None
+
+        images_directory = os.path.join(
+            self._get_entry_directory(file_hash),
+            f"{self._get_tag_name(images_tag)}_images",
+        )
+        try:
+            names = sorted(
+                os.listdir(images_directory),
+                key=lambda name: int(os.path.splitext(name)[0].split("_")[-1]),
+            )
+            image_paths = []
+            for name in names:
+                image_path = os.path.join(save_directory, name)
+                shutil.copyfile(os.path.join(images_directory, name), image_path)
+                image_paths.append(image_path)
+        except (OSError, ValueError):
+            return None
+
+        self._touch(file_hash)
+        return image_paths
+
+    def save_page_images(self, file_hash: str, images_tag: str, image_paths: List[str]):
+        if not self.enabled:
+            return
+
+        entry_directory = self._get_entry_directory(file_hash)
+        images_directory = os.path.join(
+            entry_directory, f"{self._get_tag_name(images_tag)}_images"
+        )
+        if os.path.exists(images_directory):
+            return
+
+        # Images are copied aside first so readers never see a partial set
+        temp_directory = f"{images_directory}.{uuid.uuid4()}.tmp"
+        os.makedirs(temp_directory)
+        try:
+            for image_path in image_paths:
+                shutil.copyfile(
+                    image_path,
+                    os.path.join(temp_directory, os.path.basename(image_path)),
+                )
+            os.rename(temp_directory, images_directory)
+        except OSError:
+            shutil.rmtree(temp_directory, ignore_errors=True)
+            return
+        self._add_size(self._get_directory_size(images_directory))
+
+    def _get_directory_size(self, directory: str) -> int:
+        size = 0
+        for root, _, files in os.walk(directory):
+            for name in files:
+                try:
+                    size += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    continue
+        return size
+
+    def _add_size(self, size: int):
+        """Counts newly saved bytes and prunes only once over the budget."""
+        if self._size is None:
+            self._size = self._get_directory_size(self.cache_directory)
+        else:
+            self._size += size
+        if self._size > self.max_size:
+            self.prune()
+
+    def prune(self):
+        cache_directory = self.cache_directory
+        entries = []
+        for name in os.listdir(cache_directory):
+            entry_directory = os.path.join(cache_directory, name)
+            try:
+                entries.append(
+                    (
+                        os.path.getmtime(entry_directory),
+                        self._get_directory_size(entry_directory),
+                        entry_directory,
+                    )
+                )
+            except OSError:
+                continue
+
+        total_size = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, entry_directory in entries:
+            if total_size <= self.max_size:
+                break
+            shutil.rmtree(entry_directory, ignore_errors=True)
+            total_size -= size
+        self._size = total_size
+
+
+PARSED_DOCUMENT_CACHE_SERVICE = ParsedDocumentCacheService()
@@ -0,0 +1,219 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import math
+import multiprocessing
+import os
+from typing import Dict, List, Optional, Tuple
+import uuid
+
+import pdfplumber
+
+from constants.documents import (
+    DEFAULT_PDF_RASTER_DPI,
+    DEFAULT_PDF_RASTER_FORMAT,
+    DEFAULT_PDF_RASTER_POOL_SIZE,
+    DEFAULT_PDF_RASTER_QUALITY,
+    PDF_RASTER_FORMATS,
+)
+from utils.get_env import (
+    get_pdf_raster_dpi_env,
+    get_pdf_raster_format_env,
+    get_pdf_raster_pool_size_env,
+)
+from utils.parsers import parse_int_or_none
+
+
+def get_page_image_path(
+    output_dir: str, page_number: int, image_format: str, prefix: str = "page"
+) -> str:
+    extension = "jpg" if image_format == "jpeg" else image_format
+    return os.path.join(output_dir, f"{prefix}_{page_number}.{extension}")
+
+
+def render_pdf_pages(
+    pdf_path: str,
+    page_numbers: List[int],
+    output_dir: str,
+    dpi: int,
+    image_format: str,
+    prefix: str = "page",
+) -> List[str]:
+    """Renders the given 1-based pages of a PDF. Runs in a worker process."""
+    image_paths = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page_number in page_numbers:
+            image = pdf.pages[page_number - 1].to_image(resolution=dpi).original
+            if image_format == "jpeg" and image.mode != "RGB":
+                image = image.convert("RGB")
+
+            image_path = get_page_image_path(
+                output_dir, page_number, image_format, prefix
+            )
+            # Written aside and renamed so lazy readers never see partial files
+            temp_path = f"{image_path}.{uuid.uuid4()}.tmp"
+            image.save(
+                temp_path, format=image_format, quality=DEFAULT_PDF_RASTER_QUALITY
+            )
+            os.replace(temp_path, image_path)
+            image_paths.append(image_path)
+    return image_paths
+
+
+def get_pdf_page_count(pdf_path: str) -> int:
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+class PdfRasterizerService:
+    """
+    Renders PDF pages to images in a pool of worker processes.
+
+    Pages are split into one contiguous batch per worker so every worker opens
+    the PDF only once. For lazy use, get_page_image renders a single page the
+    first time it is requested and serves the stored file afterwards.
+    """
+
+    def __init__(self):
+        self.pool_size = parse_int_or_none(get_pdf_raster_pool_size_env()) or min(
+            DEFAULT_PDF_RASTER_POOL_SIZE, os.cpu_count() or 1
+        )
+        self.dpi = parse_int_or_none(get_pdf_raster_dpi_env()) or DEFAULT_PDF_RASTER_DPI
+        try:
+            self.image_format = self.get_image_format(get_pdf_raster_format_env())
+        except ValueError as e:
+            print(f"{e}, falling back to {DEFAULT_PDF_RASTER_FORMAT}")
+            self.image_format = DEFAULT_PDF_RASTER_FORMAT
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Lock of every page being rendered and the number of callers using it
+        self._page_locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+    @staticmethod
+    def get_image_format(image_format: Optional[str]) -> str:
+        image_format = (image_format or DEFAULT_PDF_RASTER_FORMAT).lower()
+        if image_format == "jpg":
+            image_format = "jpeg"
+        if image_format not in PDF_RASTER_FORMATS:
+            raise ValueError(
+                f"Unsupported image format {image_format}, use one of {PDF_RASTER_FORMATS}"
+            )
+        return image_format
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.pool_size,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def run_in_executor(self, func, *args):
+        """Runs func in the pool, replacing the pool once if a worker died."""
+        for attempt in range(2):
+            executor = self.get_executor()
+            try:
+                return await asyncio.get_running_loop().run_in_executor(
+                    executor, func, *args
+                )
+            except BrokenProcessPool:
+                if attempt:
+                    raise
+                # Other jobs of the broken pool may have replaced it already
+                if self._executor is executor:
+                    print("PDF rasterizer pool broke, starting a new one")
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    self._executor = None
+
+    def _acquire_lock(self, image_path: str) -> asyncio.Lock:
+        lock, users = self._page_locks.get(image_path, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._page_locks[image_path] = (lock, users + 1)
+        return lock
+
+    def _release_lock(self, image_path: str):
+        lock, users = self._page_locks[image_path]
+        if users <= 1:
+            self._page_locks.pop(image_path, None)
+        else:
+            self._page_locks[image_path] = (lock, users - 1)
+
+    async def get_page_count(self, pdf_path: str) -> int:
+        return await asyncio.to_thread(get_pdf_page_count, pdf_path)
+
+    async def render_pages(
+        self,
+        pdf_path: str,
+        output_dir: str,
+        page_numbers: Optional[List[int]] = None,
+        dpi: Optional[int] = None,
+        image_format: Optional[str] = None,
+        prefix: str = "page",
+    ) -> List[str]:
+        """
+        Renders pages of pdf_path into output_dir and returns the image paths
+        in page order. Renders every page if page_numbers is not given.
+        """
+        if page_numbers is None:
+            page_numbers = list(range(1, await self.get_page_count(pdf_path) + 1))
+        if not page_numbers:
+            return []
+
+        batch_size = math.ceil(len(page_numbers) / self.pool_size)
+        batches = [
+            page_numbers[start : start + batch_size]
+            for start in range(0, len(page_numbers), batch_size)
+        ]
+
+        results = await asyncio.gather(
+            *[
+                self.run_in_executor(
+                    render_pdf_pages,
+                    pdf_path,
+                    batch,
+                    output_dir,
+                    dpi or self.dpi,
+                    self.get_image_format(image_format or self.image_format),
+                    prefix,
+                )
+                for batch in batches
+            ]
+        )
+        return [image_path for batch in results for image_path in batch]
+
+    async def get_page_image(
+        self,
+        pdf_path: str,
+        output_dir: str,
+        page_number: int,
+        image_format: Optional[str] = None,
+        prefix: str = "page",
+    ) -> str:
+        """Returns the stored image of a page, rendering it on first request."""
+        image_format = self.get_image_format(image_format or self.image_format)
+        image_path = get_page_image_path(output_dir, page_number, image_format, prefix)
+        if os.path.exists(image_path):
+            return image_path
+
+        lock = self._acquire_lock(image_path)
+        try:
+            async with lock:
+                if not os.path.exists(image_path):
+                    await self.render_pages(
+                        pdf_path,
+                        output_dir,
+                        [page_number],
+                        image_format=image_format,
+                        prefix=prefix,
+                    )
+        finally:
+            self._release_lock(image_path)
+        return image_path
+
+    def close(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+PDF_RASTERIZER_SERVICE = PdfRasterizerService()
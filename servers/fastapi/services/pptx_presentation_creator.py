@@ -1,5 +1,6 @@
+from io import BytesIO
 import os
-from typing import List, Optional
+from typing import Dict, List, Optional
 from lxml import etree
 from services.html_to_text_runs_service import (
     parse_html_text_to_text_runs as parse_inline_html_to_runs,
@@ -17,6 +18,11 @@ from pptx.oxml.xmlchemy import OxmlElement
 from pptx.util import Pt
 from pptx.dml.color import RGBColor
 
+from constants.presentation import (
+    DEFAULT_PPTX_IMAGE_DPI,
+    DEFAULT_PPTX_JPEG_QUALITY,
+    PPTX_SLIDE_CACHE_VERSION,
+)
 from models.pptx_models import (
     PptxAutoShapeBoxModel,
     PptxBoxShapeEnum,
@@ -34,28 +40,46 @@ from models.pptx_models import (
     PptxTextBoxModel,
     PptxTextRunModel,
 )
-from utils.download_helpers import download_files
+from services.asset_download_service import ASSET_DOWNLOAD_SERVICE
+from services.pptx_slide_cache_service import PPTX_SLIDE_CACHE_SERVICE
+from utils.get_env import get_pptx_image_dpi_env, get_pptx_jpeg_quality_env
 from utils.image_utils import (
     clip_image,
     create_circle_image,
+    downsample_image,
+    encode_image,
     fit_image,
     invert_image,
     round_image_corners,
     set_image_opacity,
 )
-import uuid
+from utils.parsers import parse_int_or_none
 
 BLANK_SLIDE_LAYOUT = 6
 
 
 class PptxPresentationCreator:
 
-    def __init__(self, ppt_model: PptxPresentationModel, temp_dir: str):
+    def __init__(
+        self,
+        ppt_model: PptxPresentationModel,
+        temp_dir: str,
+        image_dpi: Optional[int] = None,
+    ):
         self._temp_dir = temp_dir
 
         self._ppt_model = ppt_model
         self._slide_models = ppt_model.slides
 
+        image_dpi = image_dpi or parse_int_or_none(get_pptx_image_dpi_env())
+        self._image_scale = (image_dpi or DEFAULT_PPTX_IMAGE_DPI) / 72
+        self._jpeg_quality = (
+            parse_int_or_none(get_pptx_jpeg_quality_env()) or DEFAULT_PPTX_JPEG_QUALITY
+        )
+        self._picture_blob_cache: Dict[str, Optional[bytes | str]] = {}
+        # Cached blobs read in place, pinned until the presentation is built
+        self._pinned_blobs: List[str] = []
+
         self._ppt = Presentation()
         self._ppt.slide_width = Pt(1280)
         self._ppt.slide_height = Pt(720)
@@ -67,7 +91,9 @@ class PptxPresentationCreator:
         parent.append(element)
         return element
 
-    async def fetch_network_assets(self):
+    async def fetch_network_assets(
+        self, slide_models: Optional[List[PptxSlideModel]] = None
+    ):
         image_urls = []
         models_with_network_asset: List[PptxPictureBoxModel] = []
 
@@ -86,7 +112,9 @@ class PptxPresentationCreator:
                         image_urls.append(image_path)
                         models_with_network_asset.append(each_shape)
 
-        for each_slide in self._slide_models:
+        for each_slide in (
+            self._slide_models if slide_models is None else slide_models
+        ):
             for each_shape in each_slide.shapes:
                 if isinstance(each_shape, PptxPictureBoxModel):
                     image_path = each_shape.picture.path
@@ -102,7 +130,9 @@ class PptxPresentationCreator:
                         models_with_network_asset.append(each_shape)
 
         if image_urls:
-            image_paths = await download_files(image_urls, self._temp_dir)
+            # Cached blobs are only read, so they are used in place
+            image_paths = await ASSET_DOWNLOAD_SERVICE.fetch_many(image_urls, pin=True)
+            self._pinned_blobs.extend(each for each in image_paths if each)
 
             for each_shape, each_image_path in zip(
                 models_with_network_asset, image_paths
@@ -112,14 +142,81 @@ class PptxPresentationCreator:
                     each_shape.picture.is_network = False
 
     async def create_ppt(self):
-        await self.fetch_network_assets()
+        try:
+            await self._create_ppt()
+        finally:
+            ASSET_DOWNLOAD_SERVICE.unpin(self._pinned_blobs)
+            self._pinned_blobs = []
+
+    async def _create_ppt(self):
+        # Keys are computed before assets are fetched so they depend on the
+        # image urls rather than on where the downloads ended up
+        cache_keys = [self.get_slide_cache_key(each) for each in self._slide_models]
+        cached_slides = [
+            PPTX_SLIDE_CACHE_SERVICE.get_entry(each) for each in cache_keys
+        ]
+
+        await self.fetch_network_assets(
+            [
+                slide_model
+                for slide_model, cached_slide in zip(self._slide_models, cached_slides)
+                if cached_slide is None
+            ]
+        )
 
-        for slide_model in self._slide_models:
+        for slide_model, cache_key, cached_slide in zip(
+            self._slide_models, cache_keys, cached_slides
+        ):
             # Adding global shapes to slide
             if self._ppt_model.shapes:
                 slide_model.shapes.append(self._ppt_model.shapes)
 
-            self.add_and_populate_slide(slide_model)
+            if cached_slide:
+                slide = self.add_slide(slide_model)
+                try:
+                    PPTX_SLIDE_CACHE_SERVICE.restore_slide(cached_slide, slide)
+                    continue
+                except Exception as e:
+                    print(f"Could not restore cached slide, rendering it: {e}")
+                    await self.fetch_network_assets([slide_model])
+                    self.populate_slide(slide, slide_model)
+            else:
+                slide = self.add_and_populate_slide(slide_model)
+
+            try:
+                PPTX_SLIDE_CACHE_SERVICE.save_slide(cache_key, slide)
+            except Exception as e:
+                print(f"Could not cache rendered slide: {e}")
+
+    def get_slide_cache_key(self, slide_model: PptxSlideModel) -> str:
+        """
+        Identifies the rendered content of a slide. Notes are left out since
+        they live in their own part and are always written fresh.
+        """
+        local_images = []
+        for each_shape in [*slide_model.shapes, *(self._ppt_model.shapes or [])]:
+            if isinstance(each_shape, PptxPictureBoxModel):
+                image_path = each_shape.picture.path
+                if image_path.startswith("http"):
+                    continue
+                try:
+                    modified_at = os.path.getmtime(image_path)
+                except OSError:
+                    modified_at = None
+                local_images.append(f"{image_path}:{modified_at}")
+
+        global_shapes = "".join(
+            each.model_dump_json() for each in self._ppt_model.shapes or []
+        )
+
+        return PPTX_SLIDE_CACHE_SERVICE.get_key(
+            str(PPTX_SLIDE_CACHE_VERSION),
+            str(self._image_scale),
+            str(self._jpeg_quality),
+            slide_model.model_dump_json(exclude={"note"}),
+            global_shapes,
+            *local_images,
+        )
 
     def set_presentation_theme(self):
         slide_master = self._ppt.slide_master
@@ -141,15 +238,23 @@ class PptxPresentationCreator:
 
         theme_part._blob = tostring(theme)
 
-    def add_and_populate_slide(self, slide_model: PptxSlideModel):
-        slide = self._ppt.slides.add_slide(self._ppt.slide_layouts[BLANK_SLIDE_LAYOUT])
+    def add_and_populate_slide(self, slide_model: PptxSlideModel) -> Slide:
+        slide = self.add_slide(slide_model)
+        self.populate_slide(slide, slide_model)
+        return slide
 
-        if slide_model.background:
-            self.apply_fill_to_shape(slide.background, slide_model.background)
+    def add_slide(self, slide_model: PptxSlideModel) -> Slide:
+        slide = self._ppt.slides.add_slide(self._ppt.slide_layouts[BLANK_SLIDE_LAYOUT])
 
         if slide_model.note:
             slide.notes_slide.notes_text_frame.text = slide_model.note
 
+        return slide
+
+    def populate_slide(self, slide: Slide, slide_model: PptxSlideModel):
+        if slide_model.background:
+            self.apply_fill_to_shape(slide.background, slide_model.background)
+
         for shape_model in slide_model.shapes:
             model_type = type(shape_model)
 
@@ -176,54 +281,116 @@ class PptxPresentationCreator:
         self.set_fill_opacity(connector_shape, connector_model.opacity)
 
     def add_picture(self, slide: Slide, picture_model: PptxPictureBoxModel):
+        margined_position = self.get_margined_position(
+            picture_model.position, picture_model.margin
+        )
+
+        image_blob = self.get_picture_blob(picture_model, margined_position)
+        if image_blob is None:
+            return
+
+        # python-pptx shares one media part between pictures with identical bytes
+        image_source = (
+            BytesIO(image_blob)
+            if isinstance(image_blob, bytes)
+            else picture_model.picture.path
+        )
+        slide.shapes.add_picture(image_source, *margined_position.to_pt_list())
+
+    def get_picture_blob(
+        self, picture_model: PptxPictureBoxModel, box: PptxPositionModel
+    ) -> Optional[bytes | str]:
+        """
+        Returns encoded image bytes resized to the box at the configured DPI.
+        Returns the original path if Pillow can not read the image and no
+        transformation is needed, or None if the image must be skipped.
+        """
         image_path = picture_model.picture.path
-        if (
+        needs_transform = bool(
             picture_model.clip
             or picture_model.border_radius
             or picture_model.invert
             or picture_model.opacity
             or picture_model.object_fit
             or picture_model.shape
-        ):
-            try:
-                image = Image.open(image_path)
-            except:
-                print(f"Could not open image: {image_path}")
-                return
-
-            image = image.convert("RGBA")
-            # ? Applying border radius twice to support both clip and object fit
-            if picture_model.border_radius:
-                image = round_image_corners(image, picture_model.border_radius)
-            if picture_model.object_fit:
-                image = fit_image(
-                    image,
-                    picture_model.position.width,
-                    picture_model.position.height,
-                    picture_model.object_fit,
-                )
-            elif picture_model.clip:
-                image = clip_image(
-                    image,
-                    picture_model.position.width,
-                    picture_model.position.height,
-                )
-            if picture_model.border_radius:
-                image = round_image_corners(image, picture_model.border_radius)
-            if picture_model.shape == PptxBoxShapeEnum.CIRCLE:
-                image = create_circle_image(image)
-            if picture_model.invert:
-                image = invert_image(image)
-            if picture_model.opacity:
-                image = set_image_opacity(image, picture_model.opacity)
-            image_path = os.path.join(self._temp_dir, f"{uuid.uuid4()}.png")
-            image.save(image_path)
+        )
 
-        margined_position = self.get_margined_position(
-            picture_model.position, picture_model.margin
+        box_width = max(1, round(box.width * self._image_scale))
+        box_height = max(1, round(box.height * self._image_scale))
+        cache_key = self.get_picture_cache_key(picture_model, box_width, box_height)
+        if cache_key in self._picture_blob_cache:
+            return self._picture_blob_cache[cache_key]
+
+        try:
+            image = Image.open(image_path)
+            image.load()
+        except:
+            print(f"Could not open image: {image_path}")
+            image_blob = None if needs_transform else image_path
+            self._picture_blob_cache[cache_key] = image_blob
+            return image_blob
+
+        if needs_transform:
+            image = self.transform_picture(image, picture_model)
+        image = downsample_image(image, box_width, box_height)
+
+        image_blob, _ = encode_image(image, self._jpeg_quality)
+        self._picture_blob_cache[cache_key] = image_blob
+        return image_blob
+
+    def get_picture_cache_key(
+        self, picture_model: PptxPictureBoxModel, box_width: int, box_height: int
+    ) -> str:
+        image_path = picture_model.picture.path
+        try:
+            modified_at = os.path.getmtime(image_path)
+        except OSError:
+            modified_at = None
+        # Position only matters through its size, so repeated logos share an entry
+        size = f"{picture_model.position.width}x{picture_model.position.height}"
+        transform = picture_model.model_dump_json(
+            exclude={"margin", "picture", "position"}
+        )
+        return f"{image_path}|{modified_at}|{size}|{box_width}x{box_height}|{transform}"
+
+    def transform_picture(
+        self, image: Image.Image, picture_model: PptxPictureBoxModel
+    ) -> Image.Image:
+        # Transformations run at the export resolution, so pixel sizes scale too
+        width = max(1, round(picture_model.position.width * self._image_scale))
+        height = max(1, round(picture_model.position.height * self._image_scale))
+        border_radius = (
+            [round(radius * self._image_scale) for radius in picture_model.border_radius]
+            if picture_model.border_radius
+            else None
         )
 
-        slide.shapes.add_picture(image_path, *margined_position.to_pt_list())
+        image = image.convert("RGBA")
+        # ? Applying border radius twice to support both clip and object fit
+        if border_radius:
+            image = round_image_corners(image, border_radius)
+        if picture_model.object_fit:
+            image = fit_image(
+                image,
+                width,
+                height,
+                picture_model.object_fit,
+            )
+        elif picture_model.clip:
+            image = clip_image(
+                image,
+                width,
+                height,
+            )
+        if border_radius:
+            image = round_image_corners(image, border_radius)
+        if picture_model.shape == PptxBoxShapeEnum.CIRCLE:
+            image = create_circle_image(image)
+        if picture_model.invert:
+            image = invert_image(image)
+        if picture_model.opacity:
+            image = set_image_opacity(image, picture_model.opacity)
+        return image
 
     def add_autoshape(self, slide: Slide, autoshape_box_model: PptxAutoShapeBoxModel):
         position = autoshape_box_model.position
@@ -0,0 +1,187 @@
+import hashlib
+import io
+import json
+import os
+from typing import List, Optional
+import uuid
+
+from lxml import etree
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.oxml import parse_xml
+from pptx.slide import Slide
+from pydantic import BaseModel
+
+from constants.presentation import DEFAULT_PPTX_SLIDE_CACHE_SIZE
+from utils.asset_directory_utils import get_cache_directory
+from utils.get_env import get_pptx_slide_cache_size_env
+from utils.parsers import parse_int_or_none
+
+
+R_NAMESPACE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+
+class CachedPptxSlideMedia(BaseModel):
+    r_id: str
+    blob_name: str
+
+
+class CachedPptxSlide(BaseModel):
+    xml: str
+    media: List[CachedPptxSlideMedia]
+
+
+class PptxSlideCacheService:
+    """
+    Stores rendered slides on disk so unchanged slides are not rendered again.
+
+    An entry holds the slide's common slide data XML (background and shape
+    tree) and the images it references. Images are stored once by SHA-1, the
+    same identity python-pptx uses to share media parts inside a package.
+    """
+
+    def __init__(self):
+        max_entries = parse_int_or_none(get_pptx_slide_cache_size_env())
+        self.max_entries = (
+            DEFAULT_PPTX_SLIDE_CACHE_SIZE if max_entries is None else max_entries
+        )
+        self._writes_since_prune = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @property
+    def slides_directory(self) -> str:
+        directory = os.path.join(get_cache_directory("pptx_slides"), "slides")
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    @property
+    def media_directory(self) -> str:
+        directory = os.path.join(get_cache_directory("pptx_slides"), "media")
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def get_entry(self, key: str) -> Optional[CachedPptxSlide]:
+        if not self.enabled:
+            return None
+
+        entry_path = os.path.join(self.slides_directory, f"{key}.json")
+        try:
+            with open(entry_path, "r") as f:
+                entry = CachedPptxSlide(**json.load(f))
+        except (OSError, ValueError):
+            return None
+
+        for media in entry.media:
+            if not os.path.exists(os.path.join(self.media_directory, media.blob_name)):
+                return None
+
+        # Touch the entry so pruning drops least recently used slides first
+        os.utime(entry_path)
+        return entry
+
+    def save_slide(self, key: str, slide: Slide):
+        if not self.enabled:
+            return
+
+        media = []
+        for r_id, rel in slide.part.rels.items():
+            if rel.is_external or rel.reltype != RT.IMAGE:
+                continue
+            image_part = rel.target_part
+            blob_name = f"{image_part.sha1}.{image_part.ext}"
+            blob_path = os.path.join(self.media_directory, blob_name)
+            if not os.path.exists(blob_path):
+                self._write_file(blob_path, image_part.blob)
+            media.append(CachedPptxSlideMedia(r_id=r_id, blob_name=blob_name))
+
+        entry = CachedPptxSlide(
+            xml=etree.tostring(slide._element.cSld, encoding="unicode"),
+            media=media,
+        )
+        self._write_file(
+            os.path.join(self.slides_directory, f"{key}.json"),
+            entry.model_dump_json().encode("utf-8"),
+        )
+
+        self._writes_since_prune += 1
+        if self._writes_since_prune >= max(self.max_entries // 10, 1):
+            self._writes_since_prune = 0
+            self.prune()
+
+    def restore_slide(self, entry: CachedPptxSlide, slide: Slide):
+        """
+        Replaces the content of a blank slide with a cached rendering. Media
+        pruned since the entry was read raises before the slide is changed,
+        so the caller can render the slide instead.
+        """
+        blobs = []
+        for media in entry.media:
+            blob_path = os.path.join(self.media_directory, media.blob_name)
+            with open(blob_path, "rb") as f:
+                blobs.append((media.r_id, f.read()))
+
+        r_id_mapping = {}
+        for r_id, blob in blobs:
+            _, new_r_id = slide.part.get_or_add_image_part(io.BytesIO(blob))
+            r_id_mapping[r_id] = new_r_id
+
+        cached_c_sld = parse_xml(entry.xml)
+        for element in cached_c_sld.iter():
+            for attribute in ("embed", "link", "id"):
+                name = f"{{{R_NAMESPACE}}}{attribute}"
+                r_id = element.get(name)
+                if r_id in r_id_mapping:
+                    element.set(name, r_id_mapping[r_id])
+
+        slide._element.replace(slide._element.cSld, cached_c_sld)
+
+    def prune(self):
+        slides_directory = self.slides_directory
+        entries = []
+        for name in os.listdir(slides_directory):
+            path = os.path.join(slides_directory, name)
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+        if len(entries) <= self.max_entries:
+            return
+
+        entries.sort(reverse=True)
+        for _, path in entries[self.max_entries :]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        referenced_media = set()
+        for _, path in entries[: self.max_entries]:
+            try:
+                with open(path, "r") as f:
+                    entry = CachedPptxSlide(**json.load(f))
+            except (OSError, ValueError):
+                continue
+            referenced_media.update(each.blob_name for each in entry.media)
+
+        media_directory = self.media_directory
+        for name in os.listdir(media_directory):
+            if name not in referenced_media:
+                try:
+                    os.remove(os.path.join(media_directory, name))
+                except OSError:
+                    pass
+
+    def _write_file(self, path: str, content: bytes):
+        temp_path = f"{path}.{uuid.uuid4()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(content)
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def get_key(*parts: str) -> str:
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+PPTX_SLIDE_CACHE_SERVICE = PptxSlideCacheService()
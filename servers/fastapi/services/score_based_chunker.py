@@ -1,21 +1,39 @@
 import asyncio
-from typing import List
+from typing import List, NamedTuple
 
 from models.document_chunk import DocumentChunk
+from utils.token_utils import estimate_token_count, truncate_to_token_count
+
+
+class HeadingOffset(NamedTuple):
+    heading: str
+    # Offset of the heading line and of the line right after it
+    start: int
+    content_start: int
 
 
 class ScoreBasedChunker:
 
+    def get_heading_offsets(self, text: str) -> List[HeadingOffset]:
+        """Finds every heading line and its offsets in a single pass."""
+        heading_offsets = []
+        offset = 0
+        for line in text.split("\n"):
+            line_end = offset + len(line)
+            line_stripped = line.strip()
+            if line_stripped.startswith("#"):
+                heading_offsets.append(
+                    HeadingOffset(
+                        heading=line_stripped,
+                        start=offset,
+                        content_start=min(line_end + 1, len(text)),
+                    )
+                )
+            offset = line_end + 1
+        return heading_offsets
+
     def extract_headings(self, text: str) -> List[str]:
-        lines = text.split("\n")
-        headings = []
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith("#"):
-                headings.append(line)
-        
-        return headings
+        return [each.heading for each in self.get_heading_offsets(text)]
 
     def score_headings(self, headings: List[str]) -> List[float]:
         heading_scores = []
@@ -111,45 +129,85 @@ class ScoreBasedChunker:
 
             selected_indices.sort()
 
-        lines = text.split("\n")
-        heading_positions = {}
-        
-        for i, line in enumerate(lines):
-            line_stripped = line.strip()
-            if line_stripped.startswith("#"):
-                for heading_idx, heading in enumerate(headings):
-                    if heading == line_stripped and heading_idx not in heading_positions:
-                        heading_positions[heading_idx] = i
-                        break
-        
+        heading_offsets = self.get_heading_offsets(text)
+        selected_indices = [
+            idx for idx in selected_indices if idx < len(heading_offsets)
+        ]
+
+        # Each chunk runs until the next selected heading
         for i, heading_idx in enumerate(selected_indices):
-            if heading_idx not in heading_positions:
-                continue
-                
-            heading = headings[heading_idx]
-            heading_line_idx = heading_positions[heading_idx]
-            
             if i + 1 < len(selected_indices):
-                next_heading_idx = selected_indices[i + 1]
-                if next_heading_idx in heading_positions:
-                    next_heading_line_idx = heading_positions[next_heading_idx]
-                    content_end = next_heading_line_idx
-                else:
-                    content_end = len(lines)
+                content_end = heading_offsets[selected_indices[i + 1]].start
             else:
-                content_end = len(lines)
-
-            content_lines = lines[heading_line_idx + 1 : content_end]
-            content = "\n".join(content_lines).strip()
+                content_end = len(text)
 
+            content_start = heading_offsets[heading_idx].content_start
             chunk = DocumentChunk(
-                heading=heading,
-                content=content,
+                heading=headings[heading_idx],
+                content=text[content_start:content_end].strip(),
                 heading_index=heading_idx,
                 score=heading_scores[heading_idx],
             )
             chunks.append(chunk)
-            
+
+        return chunks
+
+    def get_chunks_within_token_budget(
+        self, text: str, max_tokens: int
+    ) -> List[DocumentChunk]:
+        """
+        Picks the highest scoring sections, in document order, whose combined
+        size fits in max_tokens. Each chunk holds only its own section, up to
+        the next heading. Text without headings is returned as one truncated
+        chunk, so the result always stays within the budget.
+        """
+        heading_offsets = self.get_heading_offsets(text)
+        if not heading_offsets:
+            content = truncate_to_token_count(text.strip(), max_tokens)
+            if not content:
+                return []
+            return [
+                DocumentChunk(heading="", content=content, heading_index=0, score=0)
+            ]
+
+        heading_scores = self.score_headings(
+            [each.heading for each in heading_offsets]
+        )
+
+        chunks: List[DocumentChunk] = []
+        used_tokens = 0
+        ranked_indices = sorted(
+            range(len(heading_offsets)), key=lambda idx: (-heading_scores[idx], idx)
+        )
+        for heading_idx in ranked_indices:
+            heading_offset = heading_offsets[heading_idx]
+            if heading_idx + 1 < len(heading_offsets):
+                content_end = heading_offsets[heading_idx + 1].start
+            else:
+                content_end = len(text)
+            content = text[heading_offset.content_start : content_end].strip()
+
+            remaining_tokens = (
+                max_tokens - used_tokens - estimate_token_count(heading_offset.heading)
+            )
+            if estimate_token_count(content) > remaining_tokens:
+                # A huge best section is cut down rather than leaving the budget empty
+                if chunks or remaining_tokens <= 0:
+                    continue
+                content = truncate_to_token_count(content, remaining_tokens)
+
+            used_tokens += estimate_token_count(heading_offset.heading)
+            used_tokens += estimate_token_count(content)
+            chunks.append(
+                DocumentChunk(
+                    heading=heading_offset.heading,
+                    content=content,
+                    heading_index=heading_idx,
+                    score=heading_scores[heading_idx],
+                )
+            )
+
+        chunks.sort(key=lambda each: each.heading_index)
         return chunks
 
     async def get_n_chunks(self, text: str, n: int) -> List[DocumentChunk]:
@@ -161,3 +219,10 @@ class ScoreBasedChunker:
         if len(chunks) < n:
             raise ValueError(f"Only {len(chunks)} chunks found, requested {n}")
         return chunks
+
+    async def get_chunks_for_token_budget(
+        self, text: str, max_tokens: int
+    ) -> List[DocumentChunk]:
+        return await asyncio.to_thread(
+            self.get_chunks_within_token_budget, text, max_tokens
+        )
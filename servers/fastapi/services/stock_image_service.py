@@ -0,0 +1,255 @@
+from abc import ABC, abstractmethod
+import asyncio
+from collections import OrderedDict, deque
+import time
+from typing import Deque, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from constants.assets import (
+    DEFAULT_STOCK_IMAGE_CACHE_SIZE,
+    DEFAULT_STOCK_IMAGE_CACHE_TTL,
+    PEXELS_MAX_CONCURRENCY,
+    PEXELS_RATE_LIMIT,
+    PEXELS_RATE_LIMIT_WINDOW,
+    PIXABAY_MAX_CONCURRENCY,
+    PIXABAY_RATE_LIMIT,
+    PIXABAY_RATE_LIMIT_WINDOW,
+    STOCK_IMAGE_MAX_RATE_LIMIT_WAIT,
+    STOCK_IMAGE_RESULTS_PER_QUERY,
+)
+from enums.image_provider import ImageProvider
+from utils.get_env import (
+    get_pexels_api_key_env,
+    get_pixabay_api_key_env,
+    get_stock_image_cache_ttl_env,
+)
+from utils.parsers import parse_int_or_none
+
+
+class RateLimitError(Exception):
+    """A request was refused because the provider's quota is used up."""
+
+
+class RateLimiter:
+    """Allows at most max_requests in any window of window_seconds."""
+
+    def __init__(self, max_requests: int, window_seconds: float):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self._sent: Deque[float] = deque()
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self, max_wait: float):
+        """Waits for a free slot, or raises if that takes longer than max_wait."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            now = time.monotonic()
+            while self._sent and now - self._sent[0] >= self.window_seconds:
+                self._sent.popleft()
+
+            if len(self._sent) >= self.max_requests:
+                wait = self._sent[0] + self.window_seconds - now
+                if wait > max_wait:
+                    raise RateLimitError(
+                        f"Rate limit reached, next request in {wait:.0f}s"
+                    )
+                await asyncio.sleep(wait)
+                self._sent.popleft()
+
+            self._sent.append(time.monotonic())
+
+
+class StockImageProvider(ABC):
+    """A stock image API with its own session, concurrency limit and quota."""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        rate_limit: int,
+        rate_limit_window: float,
+    ):
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = RateLimiter(rate_limit, rate_limit_window)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get_session(self) -> aiohttp.ClientSession:
+        # Sessions are bound to the loop they were created on
+        loop = asyncio.get_running_loop()
+        if (
+            self._session is None
+            or self._session.closed
+            or self._session_loop is not loop
+        ):
+            self._session = aiohttp.ClientSession(
+                trust_env=True,
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+                timeout=aiohttp.ClientTimeout(total=30),
+            )
+            self._session_loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+    @abstractmethod
+    def get_api_key(self) -> str:
+        pass
+
+    @abstractmethod
+    def get_request(self, query: str) -> Tuple[str, dict, dict]:
+        """Returns the url, query params and headers of a search."""
+        pass
+
+    @abstractmethod
+    def get_image_urls(self, data: dict) -> List[str]:
+        pass
+
+    async def search(self, query: str) -> List[str]:
+        session = self.get_session()
+        url, params, headers = self.get_request(query)
+        async with self._semaphore:
+            await self.rate_limiter.acquire(STOCK_IMAGE_MAX_RATE_LIMIT_WAIT)
+            async with session.get(url, params=params, headers=headers) as response:
+                if response.status == 429:
+                    raise RateLimitError("Stock image search was rate limited")
+                if not response.ok:
+                    raise Exception(
+                        f"Stock image search failed with status {response.status}: {await response.text()}"
+                    )
+                return self.get_image_urls(await response.json())
+
+
+class PexelsProvider(StockImageProvider):
+    def __init__(self):
+        super().__init__(
+            PEXELS_MAX_CONCURRENCY, PEXELS_RATE_LIMIT, PEXELS_RATE_LIMIT_WINDOW
+        )
+
+    def get_api_key(self) -> str:
+        return get_pexels_api_key_env() or ""
+
+    def get_request(self, query: str) -> Tuple[str, dict, dict]:
+        return (
+            "https://api.pexels.com/v1/search",
+            {"query": query, "per_page": STOCK_IMAGE_RESULTS_PER_QUERY},
+            {"Authorization": self.get_api_key()},
+        )
+
+    def get_image_urls(self, data: dict) -> List[str]:
+        return [each["src"]["large"] for each in data.get("photos", [])]
+
+
+class PixabayProvider(StockImageProvider):
+    def __init__(self):
+        super().__init__(
+            PIXABAY_MAX_CONCURRENCY, PIXABAY_RATE_LIMIT, PIXABAY_RATE_LIMIT_WINDOW
+        )
+
+    def get_api_key(self) -> str:
+        return get_pixabay_api_key_env() or ""
+
+    def get_request(self, query: str) -> Tuple[str, dict, dict]:
+        return (
+            "https://pixabay.com/api/",
+            {
+                "key": self.get_api_key(),
+                # Pixabay rejects queries longer than 100 characters
+                "q": query[:100],
+                "image_type": "photo",
+                "per_page": STOCK_IMAGE_RESULTS_PER_QUERY,
+            },
+            {},
+        )
+
+    def get_image_urls(self, data: dict) -> List[str]:
+        return [each["largeImageURL"] for each in data.get("hits", [])]
+
+
+class StockImageService:
+    """
+    Searches Pexels and Pixabay and remembers the results.
+
+    Results are kept in memory by provider, API key and normalized query for
+    STOCK_IMAGE_CACHE_TTL seconds, and concurrent searches for the same query
+    share one request. Every provider has one pooled session and limits its
+    concurrent requests and its request rate to the provider's quota.
+    """
+
+    def __init__(self):
+        self.providers: Dict[ImageProvider, StockImageProvider] = {
+            ImageProvider.PEXELS: PexelsProvider(),
+            ImageProvider.PIXABAY: PixabayProvider(),
+        }
+        ttl = parse_int_or_none(get_stock_image_cache_ttl_env())
+        self.cache_ttl = DEFAULT_STOCK_IMAGE_CACHE_TTL if ttl is None else ttl
+        self.max_cache_entries = DEFAULT_STOCK_IMAGE_CACHE_SIZE
+        self._cache: OrderedDict[tuple, Tuple[float, List[str]]] = OrderedDict()
+        self._in_flight: Dict[tuple, asyncio.Task] = {}
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def _get_key(self, provider: ImageProvider, query: str) -> tuple:
+        # Changing the API key must not keep serving results of the old one
+        api_key = self.providers[provider].get_api_key()
+        return (provider, api_key, self.normalize(query))
+
+    def get_cached(self, provider: ImageProvider, query: str) -> Optional[List[str]]:
+        key = self._get_key(provider, query)
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._cache.pop(key, None)
+            return None
+        self._cache.move_to_end(key)
+        return entry[1]
+
+    def _put(self, key: tuple, urls: List[str]):
+        self._cache[key] = (time.monotonic() + self.cache_ttl, urls)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_cache_entries:
+            self._cache.popitem(last=False)
+
+    async def _search(
+        self, provider: ImageProvider, key: tuple, query: str
+    ) -> List[str]:
+        try:
+            urls = await self.providers[provider].search(self.normalize(query))
+            # Empty results are not cached, the provider may just be flaky
+            if urls and self.cache_ttl > 0:
+                self._put(key, urls)
+            return urls
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def search(self, provider: ImageProvider, query: str) -> List[str]:
+        """Returns the image urls found for query, best match first."""
+        cached = self.get_cached(provider, query)
+        if cached is not None:
+            return cached
+
+        # The request runs in its own task, so a cancelled caller neither
+        # stops it nor cancels the others waiting for the same query
+        key = self._get_key(provider, query)
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._search(provider, key, query))
+            self._in_flight[key] = task
+        return await asyncio.shield(task)
+
+    async def close(self):
+        for provider in self.providers.values():
+            await provider.close()
+
+
+STOCK_IMAGE_SERVICE = StockImageService()
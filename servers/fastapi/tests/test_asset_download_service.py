@@ -0,0 +1,117 @@
+import asyncio
+import os
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from services.asset_download_service import AssetDownloadService
+
+
+def create_app(requests: list):
+    async def image(request: web.Request):
+        requests.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.Response(
+            body=b"image-bytes",
+            content_type="image/png",
+            headers={"ETag": '"v1"'},
+        )
+
+    app = web.Application()
+    app.router.add_get("/image.png", image)
+    return app
+
+
+def test_repeated_fetch_is_served_from_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_DATA_DIRECTORY", str(tmp_path))
+    requests = []
+
+    async def run():
+        service = AssetDownloadService()
+        async with TestServer(create_app(requests)) as server:
+            url = str(server.make_url("/image.png"))
+            first = await service.fetch(url)
+            second = await service.fetch(url)
+        await service.close()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert open(first, "rb").read() == b"image-bytes"
+    assert requests == [None]
+
+
+def test_stale_entry_is_revalidated_with_etag(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_DATA_DIRECTORY", str(tmp_path))
+    monkeypatch.setenv("ASSET_CACHE_TTL", "0")
+    requests = []
+
+    async def run():
+        service = AssetDownloadService()
+        async with TestServer(create_app(requests)) as server:
+            url = str(server.make_url("/image.png"))
+            first = await service.fetch(url)
+            second = await service.download_file(url, str(tmp_path / "out"))
+        await service.close()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert requests == [None, '"v1"']
+    assert os.path.basename(second) == "image.png"
+    assert open(second, "rb").read() == open(first, "rb").read()
+
+
+def test_concurrent_fetches_share_a_download_and_old_blobs_are_pruned(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setenv("APP_DATA_DIRECTORY", str(tmp_path))
+    requests = []
+
+    async def other(request: web.Request):
+        return web.Response(body=b"other-bytes", content_type="image/png")
+
+    async def run():
+        service = AssetDownloadService()
+        service.max_size = 15
+        app = create_app(requests)
+        app.router.add_get("/other.png", other)
+        async with TestServer(app) as server:
+            url = str(server.make_url("/image.png"))
+            first = await asyncio.gather(*[service.fetch(url) for _ in range(5)])
+            assert service._url_locks == {}
+            os.utime(first[0], (0, 0))
+            second = await service.fetch(str(server.make_url("/other.png")))
+        await service.close()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert requests == [None]
+    assert len(set(first)) == 1
+    assert not os.path.exists(first[0])
+    assert os.path.exists(second)
+
+
+def test_pinned_blobs_are_not_pruned(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_DATA_DIRECTORY", str(tmp_path))
+
+    async def other(request: web.Request):
+        return web.Response(body=b"other-bytes", content_type="image/png")
+
+    async def run():
+        service = AssetDownloadService()
+        service.max_size = 15
+        app = create_app([])
+        app.router.add_get("/other.png", other)
+        async with TestServer(app) as server:
+            first = await service.fetch(str(server.make_url("/image.png")), pin=True)
+            os.utime(first, (0, 0))
+            await service.fetch(str(server.make_url("/other.png")))
+            assert os.path.exists(first)
+
+            service.unpin([first])
+            service.prune()
+        await service.close()
+        return first
+
+    assert not os.path.exists(asyncio.run(run()))
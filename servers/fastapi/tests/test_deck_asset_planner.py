@@ -0,0 +1,105 @@
+import asyncio
+import uuid
+from unittest.mock import patch
+
+import numpy as np
+
+from models.sql.slide import SlideModel
+from services.deck_asset_planner import DeckAssetPlanner
+
+
+class FakeImageGenerationService:
+    def __init__(self):
+        self.prompts = []
+
+    def is_stock_provider_selected(self):
+        return False
+
+    async def generate_image(self, prompt):
+        self.prompts.append(prompt.prompt)
+        return f"/images/{len(self.prompts)}.jpg"
+
+
+def get_slide(index: int, prompts: list) -> SlideModel:
+    return SlideModel(
+        presentation=uuid.uuid4(),
+        layout_group="general",
+        layout="layout",
+        index=index,
+        content={"images": [{"__image_prompt__": each} for each in prompts]},
+    )
+
+
+def test_duplicate_prompts_across_slides_are_generated_once():
+    image_generation_service = FakeImageGenerationService()
+    planner = DeckAssetPlanner(image_generation_service)
+    slides = [
+        get_slide(0, ["Team meeting", "City skyline"]),
+        get_slide(1, ["team  meeting", "A city skyline"]),
+    ]
+    for slide in slides:
+        planner.add_slide(slide)
+
+    def embed(texts):
+        # Both skyline prompts point the same way, the meeting prompt does not
+        return np.array(
+            [[0.0, 1.0] if "skyline" in each else [1.0, 0.0] for each in texts]
+        )
+
+    async def embed_async(texts):
+        return embed(texts)
+
+    with patch(
+        "services.deck_asset_planner.EMBEDDING_SERVICE.embed_async", embed_async
+    ):
+        asyncio.run(planner.fetch_assets())
+
+    assert image_generation_service.prompts == ["Team meeting", "City skyline"]
+    urls = [
+        [each["__image_url__"] for each in slide.content["images"]] for slide in slides
+    ]
+    assert urls == [
+        ["/images/1.jpg", "/images/2.jpg"],
+        ["/images/1.jpg", "/images/2.jpg"],
+    ]
+
+
+def test_stock_prompts_use_matching_prefetched_queries():
+    image_generation_service = FakeImageGenerationService()
+    image_generation_service.is_stock_provider_selected = lambda: True
+    planner = DeckAssetPlanner(image_generation_service)
+    planner._prefetched_queries = ["Quarterly revenue growth"]
+    planner._prefetched_embeddings = np.array([[1.0, 0.0]])
+
+    async def embed_async(texts):
+        return np.array(
+            [[1.0, 0.0] if "revenue" in each else [0.0, 1.0] for each in texts]
+        )
+
+    async def match():
+        planner._prefetch_task = asyncio.create_task(asyncio.sleep(0))
+        return await planner.match_prefetched_queries(
+            ["rising revenue chart", "mountain lake"]
+        )
+
+    with patch(
+        "services.deck_asset_planner.EMBEDDING_SERVICE.embed_async", embed_async
+    ):
+        prompts = asyncio.run(match())
+
+    assert prompts == ["Quarterly revenue growth", "mountain lake"]
+
+
+def test_close_stops_a_running_prefetch():
+    planner = DeckAssetPlanner(FakeImageGenerationService())
+
+    async def run():
+        planner._prefetch_task = asyncio.create_task(asyncio.sleep(60))
+        task = planner._prefetch_task
+        await planner.close()
+        return task
+
+    task = asyncio.run(run())
+
+    assert task.cancelled()
+    assert planner._prefetch_task is None
@@ -0,0 +1,59 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+pytest.importorskip("chromadb")
+
+from services import document_retrieval_service
+from services.document_retrieval_service import DocumentRetrievalService
+from utils.token_utils import estimate_token_count
+
+
+TOPICS = ["solar", "wind", "hydro", "nuclear"]
+
+
+def fake_embed(texts):
+    # One dimension per topic, enough to tell passages apart
+    embeddings = np.array(
+        [[text.lower().count(topic) for topic in TOPICS] for text in texts],
+        dtype=np.float32,
+    )
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+async def fake_embed_async(texts):
+    return fake_embed(texts)
+
+
+def test_slide_contexts_only_hold_relevant_passages(monkeypatch):
+    monkeypatch.setattr(
+        document_retrieval_service.EMBEDDING_SERVICE, "embed_async", fake_embed_async
+    )
+    document = "\n\n".join(
+        f"# {topic.title()}\n\n" + f"{topic} energy facts. " * 60 for topic in TOPICS
+    )
+
+    service = DocumentRetrievalService()
+    service.slide_max_tokens = 300
+    contexts = asyncio.run(
+        service.get_slide_contexts([document], ["Wind farms", "Nuclear plants"])
+    )
+
+    assert "wind" in contexts[0] and "solar" not in contexts[0]
+    assert "nuclear" in contexts[1] and "wind" not in contexts[1]
+    assert all(estimate_token_count(each) <= 300 for each in contexts)
+
+
+def test_small_documents_are_passed_without_embedding(monkeypatch):
+    async def fail(texts):
+        raise AssertionError("Small documents should not be embedded")
+
+    monkeypatch.setattr(
+        document_retrieval_service.EMBEDDING_SERVICE, "embed_async", fail
+    )
+
+    service = DocumentRetrievalService()
+    context = asyncio.run(service.get_outline_context(["# A\nshort"], "query"))
+    assert context == "# A\nshort"
@@ -0,0 +1,63 @@
+import asyncio
+import os
+
+from services import document_summary_service
+from services.document_summary_service import DocumentSummaryService
+from utils.token_utils import estimate_token_count
+
+
+def test_summaries_fit_budget_and_are_cached(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_DATA_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(document_summary_service, "get_model", lambda: "test-model")
+
+    calls = []
+
+    async def generate_document_summary(text, max_tokens, is_combining=False):
+        calls.append(is_combining)
+        # Keep the first heading of the input, cut to the requested size
+        return text.split("\n")[0][: max_tokens * 4]
+
+    monkeypatch.setattr(
+        document_summary_service,
+        "generate_document_summary",
+        generate_document_summary,
+    )
+
+    document = "\n".join(
+        f"# Chapter {i}\n" + ("lorem ipsum " * 500) for i in range(40)
+    )
+    service = DocumentSummaryService()
+
+    summary = asyncio.run(service.summarize_document(document, 500))
+    assert estimate_token_count(summary) <= 500
+    assert summary.startswith("# Chapter 0")
+    # Several parts are summarized separately before being combined
+    assert calls.count(False) > 1
+
+    calls.clear()
+    assert asyncio.run(service.summarize_document(document, 500)) == summary
+    assert not calls
+
+
+def test_documents_within_budget_are_not_summarized():
+    service = DocumentSummaryService()
+    documents = ["# Short\ntext", "more text"]
+    assert asyncio.run(service.summarize_documents(documents, 1000)) == documents
+
+
+def test_summary_cache_is_pruned_least_recently_used_first(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_DATA_DIRECTORY", str(tmp_path))
+    service = DocumentSummaryService()
+    service.max_cache_size = 2500
+
+    service._write_cache("first", "a" * 1000)
+    service._write_cache("second", "b" * 1000)
+    # Reading a summary keeps it over summaries written before it
+    os.utime(service._get_cache_path("first"), (0, 0))
+    assert service._read_cache("first") == "a" * 1000
+    os.utime(service._get_cache_path("second"), (1, 1))
+    service._write_cache("third", "c" * 1000)
+
+    assert service._read_cache("second") is None
+    assert service._read_cache("first") == "a" * 1000
+    assert service._read_cache("third") == "c" * 1000
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("docling")
+
+from services.docling_service import DOCLING_SERVICE
+from services.documents_loader import DocumentsLoader, load_documents_text
+
+
+def test_load_documents_keeps_order_and_reports_failures(tmp_path):
+    file_paths = []
+    for index in range(5):
+        file_path = tmp_path / f"doc_{index}.txt"
+        file_path.write_text(f"document {index}")
+        file_paths.append(str(file_path))
+
+    # Not valid UTF-8, so reading it as text fails
+    broken_path = tmp_path / "broken.txt"
+    broken_path.write_bytes(b"\xff\xfe\xfa")
+    file_paths.insert(2, str(broken_path))
+
+    documents_loader = DocumentsLoader(file_paths)
+
+    async def load():
+        return [
+            each
+            async for each in documents_loader.load_documents_iter(str(tmp_path))
+        ]
+
+    loaded_documents = asyncio.run(load())
+
+    assert sorted(each.index for each in loaded_documents) == list(range(6))
+    assert documents_loader.documents == [
+        "document 0",
+        "document 1",
+        "",
+        "document 2",
+        "document 3",
+        "document 4",
+    ]
+    assert documents_loader.errors[2]
+    assert documents_loader.errors.count(None) == 5
+
+
+def test_parsed_pdfs_are_reused_by_later_loads(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_DATA_DIRECTORY", str(tmp_path / "app_data"))
+
+    pdf_path = tmp_path / "report.pdf"
+    pdf_path.write_bytes(b"%PDF")
+
+    parsed = []
+
+    async def parse_to_markdown(file_path, timeout=None):
+        parsed.append(file_path)
+        return "report"
+
+    monkeypatch.setattr(DOCLING_SERVICE, "parse_to_markdown", parse_to_markdown)
+
+    async def load():
+        documents_loader = DocumentsLoader([str(pdf_path)])
+        await documents_loader.load_documents(str(tmp_path))
+        return documents_loader.documents, await load_documents_text([str(pdf_path)])
+
+    loaded, loaded_again = asyncio.run(load())
+
+    assert loaded == ["report"]
+    # The second load reads the cached result
+    assert loaded_again == loaded
+    assert parsed == [str(pdf_path)]
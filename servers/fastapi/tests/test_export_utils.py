@@ -0,0 +1,40 @@
+import asyncio
+import os
+from unittest.mock import patch
+import uuid
+
+from utils.export_utils import export_presentation_as_response, get_content_disposition
+
+
+def test_content_disposition_is_a_valid_header_for_any_title():
+    assert get_content_disposition('Q3 "Plan"\r\nX.pptx') == (
+        "attachment; filename=\"Q3 PlanX.pptx\"; filename*=UTF-8''Q3%20PlanX.pptx"
+    )
+    assert get_content_disposition("Отчёт.pdf").startswith(
+        'attachment; filename="presentation.pdf"; filename*=UTF-8\'\'%D0%9E'
+    )
+
+
+def test_streamed_pdf_exports_use_and_remove_their_own_file(tmp_path):
+    shared_path = tmp_path / "Plan.pdf"
+    shared_path.write_bytes(b"%PDF")
+    titles = []
+
+    async def export_pdf(presentation_id, title):
+        titles.append(title)
+        pdf_path = tmp_path / f"{title}.pdf"
+        pdf_path.write_bytes(b"%PDF")
+        return str(pdf_path)
+
+    async def run():
+        with patch("utils.export_utils.export_pdf", export_pdf):
+            response = await export_presentation_as_response(uuid.uuid4(), "Plan", "pdf")
+        await response.background()
+        return response
+
+    response = asyncio.run(run())
+
+    assert titles[0].startswith("Plan-") and titles[0] != "Plan"
+    assert 'filename="Plan.pdf"' in response.headers["Content-Disposition"]
+    assert not os.path.exists(tmp_path / f"{titles[0]}.pdf")
+    assert shared_path.exists()
@@ -0,0 +1,74 @@
+import asyncio
+
+import numpy as np
+
+from services.icon_finder_service import (
+    IconFinderService,
+    IconQueryCache,
+    NumpyIconIndex,
+    load_icon_embeddings,
+    save_icon_embeddings,
+)
+
+
+def test_icon_embeddings_round_trip(tmp_path):
+    ids = ["a-bold", "b-bold"]
+    embeddings = np.eye(2, dtype=np.float32)
+    save_icon_embeddings(str(tmp_path), ids, embeddings, "hash")
+
+    loaded_ids, loaded_embeddings = load_icon_embeddings(str(tmp_path), "hash")
+
+    assert loaded_ids == ids
+    assert np.array_equal(loaded_embeddings, embeddings)
+    assert load_icon_embeddings(str(tmp_path), "other-hash") is None
+
+
+def test_numpy_index_ranks_every_query_at_once():
+    index = NumpyIconIndex.__new__(NumpyIconIndex)
+    index.ids = ["a-bold", "b-bold", "c-bold"]
+    index.embeddings = np.eye(3, dtype=np.float32)
+    queries = np.array([[0.1, 0.9, 0.3], [1.0, 0.0, 0.5]], dtype=np.float32)
+
+    assert index.search_embeddings(queries, 2) == [
+        ["b-bold", "c-bold"],
+        ["a-bold", "c-bold"],
+    ]
+
+
+def test_concurrent_searches_share_one_batch():
+    calls = []
+
+    class FakeIndex:
+        def search(self, queries, k):
+            calls.append(list(queries))
+            return [[f"{query}-{i}" for i in range(k)] for query in queries]
+
+    service = IconFinderService(index=FakeIndex())
+
+    async def search():
+        return await asyncio.gather(
+            service.search_icons("chart", 2),
+            service.search_icons_batch(["team", "chart"]),
+        )
+
+    single, batch = asyncio.run(search())
+
+    assert calls == [["chart", "team"]]
+    assert single == ["/static/icons/bold/chart-0.svg", "/static/icons/bold/chart-1.svg"]
+    assert batch == [["/static/icons/bold/team-0.svg"], ["/static/icons/bold/chart-0.svg"]]
+
+
+def test_query_cache_reuses_exact_and_similar_queries():
+    cache = IconQueryCache(max_entries=2, semantic_threshold=0.9)
+    cache.put("Team Growth", 3, ["a", "b", "c"], np.array([1.0, 0.0]))
+
+    assert cache.get("  team   growth ", 2) == ["a", "b"]
+    assert cache.get("team growth", 5) is None
+    assert cache.get_similar(np.array([[0.99, 0.14], [0.0, 1.0]]), 1) == [["a"], None]
+
+    cache.put("security", 1, ["d"])
+    cache.put("cloud", 1, ["e"])
+    assert cache.get("team growth", 1) is None
+
+    stats = cache.get_stats()
+    assert (stats.exact_hits, stats.semantic_hits, stats.entries) == (1, 1, 2)
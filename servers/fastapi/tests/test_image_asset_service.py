@@ -0,0 +1,114 @@
+import asyncio
+import os
+
+from PIL import Image, ImageDraw
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+
+from models.sql.image_asset import ImageAsset
+from services.image_asset_service import IMAGE_ASSET_SERVICE
+from utils.image_utils import get_hash_distance, get_perceptual_hash
+
+
+def draw_image(path: str, size, quality: int = 95):
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((0, 0, size[0] // 2, size[1] // 2), fill="blue")
+    draw.rectangle((size[0] // 2, size[1] // 2, size[0], size[1]), fill="red")
+    image.save(path, quality=quality)
+
+
+def test_resized_copies_have_close_perceptual_hashes(tmp_path):
+    draw_image(str(tmp_path / "a.jpg"), (800, 600))
+    draw_image(str(tmp_path / "b.jpg"), (400, 300), quality=60)
+
+    with Image.open(tmp_path / "a.jpg") as a, Image.open(tmp_path / "b.jpg") as b:
+        hash_a = get_perceptual_hash(a)
+        hash_b = get_perceptual_hash(b)
+        hash_c = get_perceptual_hash(a.transpose(Image.Transpose.FLIP_LEFT_RIGHT))
+
+    assert len(hash_a) == 16
+    assert get_hash_distance(hash_a, hash_b) <= 4
+    assert get_hash_distance(hash_a, hash_c) > 10
+
+
+def test_same_image_is_stored_once_and_similar_ones_are_found(tmp_path):
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                lambda sync_conn: SQLModel.metadata.create_all(
+                    sync_conn, tables=[ImageAsset.__table__]
+                )
+            )
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+        draw_image(str(tmp_path / "first.jpg"), (800, 600))
+        async with session_maker() as sql_session:
+            first = await IMAGE_ASSET_SERVICE.deduplicate(
+                sql_session, ImageAsset(path=str(tmp_path / "first.jpg"))
+            )
+            sql_session.add(first)
+            await sql_session.commit()
+
+            draw_image(str(tmp_path / "again.jpg"), (800, 600))
+            again = await IMAGE_ASSET_SERVICE.deduplicate(
+                sql_session, ImageAsset(path=str(tmp_path / "again.jpg"))
+            )
+            assert again.id == first.id
+            assert not os.path.exists(tmp_path / "again.jpg")
+
+            draw_image(str(tmp_path / "small.jpg"), (400, 300), quality=60)
+            small = await IMAGE_ASSET_SERVICE.deduplicate(
+                sql_session, ImageAsset(path=str(tmp_path / "small.jpg"))
+            )
+            assert small.id != first.id
+            sql_session.add(small)
+            await sql_session.commit()
+
+            similar = await IMAGE_ASSET_SERVICE.find_similar(sql_session, first)
+            assert [each.id for each in similar] == [small.id]
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_unhashed_assets_are_hashed_once_at_startup(tmp_path):
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                lambda sync_conn: SQLModel.metadata.create_all(
+                    sync_conn, tables=[ImageAsset.__table__]
+                )
+            )
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+        draw_image(str(tmp_path / "old.jpg"), (800, 600))
+        async with session_maker() as sql_session:
+            old = ImageAsset(path=str(tmp_path / "old.jpg"))
+            sql_session.add(old)
+            await sql_session.commit()
+
+            # Looking for similar images does not hash or save anything
+            assert await IMAGE_ASSET_SERVICE.find_similar(sql_session, old) == []
+            assert old.perceptual_hash is None
+
+            await IMAGE_ASSET_SERVICE.backfill_hashes(sql_session)
+        async with session_maker() as sql_session:
+            stored = await sql_session.get(ImageAsset, old.id)
+            assert stored.content_hash and stored.perceptual_hash
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_assets_of_one_deck_are_saved_once_per_content():
+    first = ImageAsset(path="/images/a.jpg", content_hash="a")
+    again = ImageAsset(path="/images/a.jpg", content_hash="a")
+    other = ImageAsset(path="/images/b.jpg", content_hash="b")
+
+    assert IMAGE_ASSET_SERVICE.get_unique([first, again, other, first]) == [
+        first,
+        other,
+    ]
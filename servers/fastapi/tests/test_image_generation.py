@@ -1,7 +1,7 @@
 import pytest
 import asyncio
 import os
-from unittest.mock import Mock, patch, AsyncMock
+from unittest.mock import MagicMock, Mock, patch, AsyncMock
 import httpx
 from fastapi.testclient import TestClient
 from fastapi import FastAPI
@@ -134,15 +134,62 @@ class TestImageGenerationService:
                                 })
                                 
                                 mock_session = AsyncMock()
-                                mock_session.get = AsyncMock(return_value=mock_response)
+                                mock_session.get = MagicMock()
+                                mock_session.get.return_value.__aenter__ = AsyncMock(return_value=mock_response)
+                                mock_session.get.return_value.__aexit__ = AsyncMock(return_value=None)
                                 mock_session.__aenter__ = AsyncMock(return_value=mock_session)
                                 mock_session.__aexit__ = AsyncMock(return_value=None)
                                 
                                 with patch('aiohttp.ClientSession', return_value=mock_session):
-                                    result = await service.generate_image(sample_image_prompt)
-                                    assert result == "https://example.com/image.jpg"
+                                    with patch('services.image_generation_service.IMAGE_MIRROR_SERVICE.enabled', False):
+                                        result = await service.generate_image(sample_image_prompt)
+                                        assert result == "https://example.com/image.jpg"
         
         asyncio.run(run_test())
+
+    def test_generate_image_mirrors_stock_image(self, mock_images_directory, sample_image_prompt):
+        """
+        Test that stock images are copied into the images directory
+        - Mocks the stock search and the mirror download
+        - Ensures that an ImageAsset pointing to the local copy is returned
+        """
+        async def run_test():
+            with patch('services.image_generation_service.is_pixels_selected', return_value=True):
+                with patch('services.image_generation_service.is_pixabay_selected', return_value=False):
+                    service = ImageGenerationService(mock_images_directory)
+                    local_path = os.path.join(mock_images_directory, "mirrored.jpg")
+                    with open(local_path, "wb") as f:
+                        f.write(b"image")
+
+                    service.image_gen_func = AsyncMock(return_value="https://example.com/stock.jpg")
+                    with patch('services.image_generation_service.IMAGE_MIRROR_SERVICE.enabled', True):
+                        with patch('services.image_generation_service.IMAGE_MIRROR_SERVICE.mirror', AsyncMock(return_value=local_path)):
+                            result = await service.generate_image(sample_image_prompt)
+
+                    assert isinstance(result, ImageAsset)
+                    assert result.path == local_path
+                    assert result.extras["source_url"] == "https://example.com/stock.jpg"
+
+        asyncio.run(run_test())
+
+    def test_generate_image_keeps_stock_url_when_mirroring_fails(self, mock_images_directory, sample_image_prompt):
+        """
+        Test that a failed copy of a stock image falls back to its remote url
+        - Makes the mirror download raise
+        - Ensures that the stock url is returned instead of the placeholder
+        """
+        async def run_test():
+            with patch('services.image_generation_service.is_pixels_selected', return_value=True):
+                with patch('services.image_generation_service.is_pixabay_selected', return_value=False):
+                    service = ImageGenerationService(mock_images_directory)
+                    service.image_gen_func = AsyncMock(return_value="https://example.com/stock.jpg")
+                    with patch('services.image_generation_service.IMAGE_MIRROR_SERVICE.enabled', True):
+                        with patch('services.image_generation_service.IMAGE_MIRROR_SERVICE.mirror', AsyncMock(side_effect=OSError("Disk full"))):
+                            result = await service.generate_image(sample_image_prompt)
+
+                    assert result == "https://example.com/stock.jpg"
+
+        asyncio.run(run_test())
     
     def test_generate_image_with_dalle3_success(self, mock_images_directory, sample_image_prompt):
         """
@@ -246,7 +293,9 @@ class TestImageGenerationService:
                 })
                 
                 mock_session = AsyncMock()
-                mock_session.get = AsyncMock(return_value=mock_response)
+                mock_session.get = MagicMock()
+                mock_session.get.return_value.__aenter__ = AsyncMock(return_value=mock_response)
+                mock_session.get.return_value.__aexit__ = AsyncMock(return_value=None)
                 mock_session.__aenter__ = AsyncMock(return_value=mock_session)
                 mock_session.__aexit__ = AsyncMock(return_value=None)
                 
@@ -277,7 +326,9 @@ class TestImageGenerationService:
                 })
                 
                 mock_session = AsyncMock()
-                mock_session.get = AsyncMock(return_value=mock_response)
+                mock_session.get = MagicMock()
+                mock_session.get.return_value.__aenter__ = AsyncMock(return_value=mock_response)
+                mock_session.get.return_value.__aexit__ = AsyncMock(return_value=None)
                 mock_session.__aenter__ = AsyncMock(return_value=mock_session)
                 mock_session.__aexit__ = AsyncMock(return_value=None)
                 
@@ -0,0 +1,130 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from enums.circuit_state import CircuitState
+from enums.image_provider import ImageProvider
+from services.image_generation_queue_service import (
+    CircuitOpenError,
+    ImageProviderQueue,
+)
+from services.stock_image_service import RateLimitError
+
+
+def get_queue(**kwargs) -> ImageProviderQueue:
+    settings = {
+        "max_in_flight": 2,
+        "timeout": 0.05,
+        "retries": 1,
+        "failure_threshold": 2,
+        "cooldown": 60,
+    }
+    settings.update(kwargs)
+    return ImageProviderQueue(ImageProvider.DALLE3, **settings)
+
+
+@patch("services.image_generation_queue_service.IMAGE_GENERATION_RETRY_BACKOFF", 0)
+def test_failures_are_retried_and_open_the_circuit():
+    queue = get_queue()
+    calls = []
+
+    async def hang(prompt):
+        calls.append(prompt)
+        await asyncio.sleep(1)
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(Exception, match="did not respond"):
+                await queue.run(hang, "prompt")
+        with pytest.raises(CircuitOpenError):
+            await queue.run(hang, "prompt")
+
+    asyncio.run(run())
+
+    stats = queue.get_stats()
+    assert len(calls) == 4
+    assert stats.state == CircuitState.OPEN
+    assert stats.timeouts == 4
+    assert stats.retries == 2
+    assert stats.failed == 2
+    assert stats.short_circuited == 1
+
+
+def test_successful_trial_closes_the_circuit():
+    queue = get_queue(retries=0, failure_threshold=1, cooldown=0)
+    in_flight = []
+
+    async def fail(prompt):
+        raise Exception("Provider is down")
+
+    async def generate(prompt):
+        in_flight.append(queue.in_flight)
+        await asyncio.sleep(0.01)
+        return prompt
+
+    async def run():
+        with pytest.raises(Exception, match="Provider is down"):
+            await queue.run(fail, "prompt")
+        assert queue.state == CircuitState.HALF_OPEN
+
+        # Only the trial gets through until it has succeeded
+        results = await asyncio.gather(
+            queue.run(generate, "a"),
+            queue.run(generate, "b"),
+            return_exceptions=True,
+        )
+        assert results[0] == "a"
+        assert isinstance(results[1], CircuitOpenError)
+        assert queue.state == CircuitState.CLOSED
+
+        assert await asyncio.gather(
+            *[queue.run(generate, each) for each in "cdef"]
+        ) == list("cdef")
+
+    asyncio.run(run())
+    assert max(in_flight) == 2
+    assert queue.get_stats().average_latency > 0
+
+
+def test_rate_limited_requests_do_not_open_the_circuit():
+    queue = get_queue(failure_threshold=1)
+    calls = []
+
+    async def refuse(prompt):
+        calls.append(prompt)
+        raise RateLimitError("Rate limit reached")
+
+    async def run():
+        for _ in range(3):
+            with pytest.raises(RateLimitError):
+                await queue.run(refuse, "prompt")
+
+    asyncio.run(run())
+
+    stats = queue.get_stats()
+    assert len(calls) == 3
+    assert stats.state == CircuitState.CLOSED
+    assert (stats.failed, stats.retries, stats.rate_limited) == (0, 0, 3)
+
+
+def test_timed_out_request_holds_its_slot_until_it_stops():
+    queue = get_queue(max_in_flight=1, retries=0, failure_threshold=10)
+    events = []
+
+    async def slow(prompt):
+        events.append(f"start {prompt}")
+        try:
+            await asyncio.sleep(1)
+        finally:
+            # Cleaning up after the cancel takes a while too
+            await asyncio.sleep(0.02)
+            events.append(f"stop {prompt}")
+
+    async def run():
+        await asyncio.gather(
+            queue.run(slow, "a"), queue.run(slow, "b"), return_exceptions=True
+        )
+
+    asyncio.run(run())
+    assert events == ["start a", "stop a", "start b", "stop b"]
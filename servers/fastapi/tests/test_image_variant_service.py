@@ -0,0 +1,91 @@
+import asyncio
+import os
+from unittest.mock import patch
+from urllib.parse import quote
+
+from PIL import Image, features
+
+from services.image_variant_service import (
+    IMAGE_VARIANT_SERVICE,
+    ImageVariantService,
+    create_image_variants,
+    get_variant_url,
+    get_variants_directory,
+)
+
+
+def test_variants_are_created_and_picked_by_width(tmp_path):
+    image_path = str(tmp_path / "photo.png")
+    Image.new("RGB", (1000, 500), "red").save(image_path)
+
+    variant_paths = create_image_variants(image_path, [320, 640, 1280], ["webp"])
+
+    variants_directory = get_variants_directory(image_path)
+    assert sorted(os.path.basename(each) for each in variant_paths) == [
+        "1000.webp",
+        "320.webp",
+        "640.webp",
+    ]
+    with Image.open(os.path.join(variants_directory, "320.webp")) as variant:
+        assert variant.size == (320, 160)
+
+    def best(width, accept="image/webp,*/*"):
+        return os.path.basename(
+            IMAGE_VARIANT_SERVICE.get_best_variant(image_path, width, accept)
+        )
+
+    assert best(300) == "320.webp"
+    assert best(700) == "1000.webp"
+    assert best(5000) == "1000.webp"
+    assert IMAGE_VARIANT_SERVICE.get_best_variant(image_path, 300, "image/png") is None
+
+
+def test_existing_variants_are_not_created_again(tmp_path):
+    image_path = str(tmp_path / "photo.png")
+    Image.new("RGB", (400, 200), "red").save(image_path)
+    create_image_variants(image_path, [320], ["webp"])
+
+    async def run():
+        with patch.object(IMAGE_VARIANT_SERVICE, "create_variants") as create:
+            IMAGE_VARIANT_SERVICE.schedule(image_path)
+            await asyncio.sleep(0)
+        return create.call_count
+
+    assert asyncio.run(run()) == 0
+
+
+def test_only_stored_images_get_variant_urls(tmp_path):
+    image_path = str(tmp_path / "a.png")
+    with patch(
+        "services.image_variant_service.get_images_directory",
+        return_value=str(tmp_path),
+    ):
+        assert get_variant_url(image_path, 320) == (
+            f"/api/v1/ppt/images/variant?path={quote(image_path, safe='')}&width=320"
+        )
+        assert get_variant_url("/static/images/placeholder.jpg", 320) == (
+            "/static/images/placeholder.jpg"
+        )
+        assert get_variant_url("https://example.com/a.jpg", 320) == (
+            "https://example.com/a.jpg"
+        )
+
+
+def test_create_variants_replaces_a_broken_pool(tmp_path):
+    image_path = str(tmp_path / "photo.png")
+    Image.new("RGB", (1000, 500), "red").save(image_path)
+
+    service = ImageVariantService()
+    try:
+        # A worker dying breaks the whole pool
+        crash = service.get_executor().submit(os._exit, 1)
+        try:
+            crash.result()
+        except Exception:
+            pass
+        variant_paths = asyncio.run(service.create_variants(image_path))
+    finally:
+        service.close()
+
+    assert variant_paths
+    assert all(os.path.exists(each) for each in variant_paths)
@@ -0,0 +1,43 @@
+import os
+
+from services.parsed_document_cache_service import ParsedDocumentCacheService
+
+
+def test_parsed_document_cache_round_trip_and_eviction(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_DATA_DIRECTORY", str(tmp_path / "app_data"))
+    monkeypatch.setenv("DOCUMENT_CACHE_SIZE_MB", "1")
+    cache = ParsedDocumentCacheService()
+
+    report = tmp_path / "report.pdf"
+    report.write_bytes(b"%PDF report")
+    file_hash = cache.get_file_hash(str(report))
+
+    assert cache.get_markdown(file_hash, "docling=1") is None
+    cache.save_markdown(file_hash, "docling=1", "# Report")
+    assert cache.get_markdown(file_hash, "docling=1") == "# Report"
+    # Output of another parser version is never reused
+    assert cache.get_markdown(file_hash, "docling=2") is None
+
+    pages_dir = tmp_path / "pages"
+    pages_dir.mkdir()
+    page_paths = []
+    for page_number in (1, 2, 10):
+        page_path = pages_dir / f"page_{page_number}.png"
+        page_path.write_bytes(b"png")
+        page_paths.append(str(page_path))
+    cache.save_page_images(file_hash, "images", page_paths)
+
+    restore_dir = tmp_path / "restore"
+    restore_dir.mkdir()
+    restored = cache.get_page_images(file_hash, "images", str(restore_dir))
+    assert [os.path.basename(each) for each in restored] == [
+        "page_1.png",
+        "page_2.png",
+        "page_10.png",
+    ]
+
+    # A large newer entry pushes the least recently used one out
+    os.utime(os.path.join(cache.cache_directory, file_hash), (0, 0))
+    cache.save_markdown("other", "docling=1", "x" * (1024 * 1024 - 10))
+    assert cache.get_markdown(file_hash, "docling=1") is None
+    assert cache.get_markdown("other", "docling=1") is not None
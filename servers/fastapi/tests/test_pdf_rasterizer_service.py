@@ -0,0 +1,81 @@
+import asyncio
+import os
+
+from PIL import Image
+
+from services.pdf_rasterizer_service import PdfRasterizerService
+
+
+def create_pdf(path: str, page_count: int):
+    pages = [
+        Image.new("RGB", (200, 100), (index * 40, 80, 160))
+        for index in range(page_count)
+    ]
+    pages[0].save(path, save_all=True, append_images=pages[1:], resolution=72)
+
+
+def test_render_pages_across_workers_in_page_order(tmp_path):
+    pdf_path = str(tmp_path / "deck.pdf")
+    create_pdf(pdf_path, 5)
+
+    rasterizer = PdfRasterizerService()
+    rasterizer.pool_size = 2
+    try:
+        image_paths = asyncio.run(
+            rasterizer.render_pages(
+                pdf_path, str(tmp_path), dpi=36, image_format="webp", prefix="slide"
+            )
+        )
+    finally:
+        rasterizer.close()
+
+    assert [os.path.basename(each) for each in image_paths] == [
+        f"slide_{page_number}.webp" for page_number in range(1, 6)
+    ]
+    with Image.open(image_paths[0]) as image:
+        assert image.format == "WEBP"
+        assert image.size == (100, 50)
+
+
+def test_get_page_image_renders_once(tmp_path):
+    pdf_path = str(tmp_path / "deck.pdf")
+    create_pdf(pdf_path, 3)
+
+    rasterizer = PdfRasterizerService()
+    try:
+
+        async def get_images():
+            return await asyncio.gather(
+                *[rasterizer.get_page_image(pdf_path, str(tmp_path), 2) for _ in range(3)]
+            )
+
+        image_paths = asyncio.run(get_images())
+    finally:
+        rasterizer.close()
+
+    assert len(set(image_paths)) == 1
+    assert os.path.exists(image_paths[0])
+    assert not os.path.exists(os.path.join(tmp_path, "page_1.png"))
+
+
+def test_render_pages_replaces_a_broken_pool(tmp_path):
+    pdf_path = str(tmp_path / "deck.pdf")
+    create_pdf(pdf_path, 2)
+
+    rasterizer = PdfRasterizerService()
+    rasterizer.pool_size = 1
+    try:
+        # A worker dying breaks the whole pool
+        crash = rasterizer.get_executor().submit(os._exit, 1)
+        try:
+            crash.result()
+        except Exception:
+            pass
+        image_paths = asyncio.run(
+            rasterizer.render_pages(pdf_path, str(tmp_path), dpi=36, prefix="slide")
+        )
+    finally:
+        rasterizer.close()
+
+    assert len(image_paths) == 2
+    assert all(os.path.exists(image_path) for image_path in image_paths)
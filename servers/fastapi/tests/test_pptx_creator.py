@@ -38,3 +38,86 @@ def test_pptx_creator():
     pptx_creator = PptxPresentationCreator(pptx_model, temp_dir)
     asyncio.run(pptx_creator.create_ppt())
     pptx_creator.save("debug/test.pptx")
+
+
+def test_pptx_creator_dedupes_and_right_sizes_pictures(tmp_path):
+    from io import BytesIO
+    from PIL import Image
+    from pptx import Presentation
+    from models.pptx_models import PptxPictureBoxModel, PptxPictureModel
+
+    image_path = str(tmp_path / "logo.png")
+    Image.new("RGB", (2000, 2000), (200, 30, 30)).save(image_path)
+
+    def picture_slide():
+        return PptxSlideModel(
+            shapes=[
+                PptxPictureBoxModel(
+                    position=PptxPositionModel(left=0, top=0, width=72, height=72),
+                    picture=PptxPictureModel(is_network=False, path=image_path),
+                )
+            ]
+        )
+
+    model = PptxPresentationModel(slides=[picture_slide() for _ in range(3)])
+    pptx_creator = PptxPresentationCreator(model, str(tmp_path), image_dpi=144)
+    asyncio.run(pptx_creator.create_ppt())
+
+    output_path = str(tmp_path / "deck.pptx")
+    pptx_creator.save(output_path)
+
+    image_parts = [
+        part
+        for part in Presentation(output_path).part.package.iter_parts()
+        if part.partname.startswith("/ppt/media/")
+    ]
+    assert len(image_parts) == 1
+    assert image_parts[0].content_type == "image/jpeg"
+    assert Image.open(BytesIO(image_parts[0].blob)).size == (144, 144)
+
+
+def test_pptx_creator_reuses_cached_slides(tmp_path, monkeypatch):
+    from pptx import Presentation
+    from models.pptx_models import PptxPictureBoxModel, PptxPictureModel
+    from PIL import Image
+
+    monkeypatch.setenv("APP_DATA_DIRECTORY", str(tmp_path / "app_data"))
+    image_path = str(tmp_path / "photo.png")
+    Image.new("RGB", (300, 200), (20, 120, 200)).save(image_path)
+
+    def create_deck(note: str):
+        model = PptxPresentationModel(
+            slides=[
+                PptxSlideModel(
+                    note=note,
+                    background=PptxFillModel(color="FFEEDD"),
+                    shapes=[
+                        PptxPictureBoxModel(
+                            position=PptxPositionModel(
+                                left=10, top=10, width=300, height=200
+                            ),
+                            picture=PptxPictureModel(
+                                is_network=False, path=image_path
+                            ),
+                        )
+                    ],
+                ),
+            ]
+        )
+        pptx_creator = PptxPresentationCreator(model, str(tmp_path))
+        asyncio.run(pptx_creator.create_ppt())
+        output_path = str(tmp_path / f"{note}.pptx")
+        pptx_creator.save(output_path)
+        return Presentation(output_path), pptx_creator
+
+    first, _ = create_deck("first")
+    second, pptx_creator = create_deck("second")
+
+    # The second export is restored from the cache, so no picture is rendered
+    assert not pptx_creator._picture_blob_cache
+
+    first_slide, second_slide = first.slides[0], second.slides[0]
+    assert len(second_slide.shapes) == len(first_slide.shapes) == 1
+    assert second_slide.shapes[0].image.blob == first_slide.shapes[0].image.blob
+    assert second_slide.background.fill.fore_color.rgb == (0xFF, 0xEE, 0xDD)
+    assert second_slide.notes_slide.notes_text_frame.text == "second"
@@ -0,0 +1,39 @@
+import os
+
+from PIL import Image
+from pptx import Presentation
+from pptx.util import Inches
+import pytest
+
+from services.pptx_slide_cache_service import PptxSlideCacheService
+
+
+def test_restore_without_pruned_media_leaves_the_slide_as_is(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_DATA_DIRECTORY", str(tmp_path / "app_data"))
+    image_paths = []
+    for color in ("red", "blue"):
+        image_paths.append(str(tmp_path / f"{color}.png"))
+        Image.new("RGB", (40, 20), color).save(image_paths[-1])
+
+    presentation = Presentation()
+    layout = presentation.slide_layouts[6]
+    rendered = presentation.slides.add_slide(layout)
+    for image_path in image_paths:
+        rendered.shapes.add_picture(image_path, Inches(1), Inches(1))
+
+    cache = PptxSlideCacheService()
+    cache.save_slide("key", rendered)
+    entry = cache.get_entry("key")
+
+    restored = presentation.slides.add_slide(layout)
+    cache.restore_slide(entry, restored)
+    assert len(restored._element.cSld.spTree.xpath("./p:pic")) == 2
+
+    # Pruned after the entry was read
+    os.remove(os.path.join(cache.media_directory, entry.media[-1].blob_name))
+    blank = presentation.slides.add_slide(layout)
+    rels_count = len(blank.part.rels)
+    with pytest.raises(OSError):
+        cache.restore_slide(entry, blank)
+    assert blank._element.cSld.spTree.xpath("./p:pic") == []
+    assert len(blank.part.rels) == rels_count
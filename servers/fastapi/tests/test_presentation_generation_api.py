@@ -90,24 +90,19 @@ def patch_presentation_api(monkeypatch, mock_get_layout):
     # Patch all dependencies used in the API
     patches = [
         patch('api.v1.ppt.endpoints.presentation.get_layout_by_name', new=AsyncMock(side_effect=mock_get_layout)),
-        patch('api.v1.ppt.endpoints.presentation.TEMP_FILE_SERVICE.create_temp_dir', return_value='/tmp/mockdir'),
-        patch('api.v1.ppt.endpoints.presentation.DocumentsLoader'),
+        patch('utils.export_utils.TEMP_FILE_SERVICE.create_temp_dir', return_value='/tmp/mockdir'),
+        patch('api.v1.ppt.endpoints.presentation.load_documents_text', new_callable=AsyncMock, return_value=[]),
         patch('api.v1.ppt.endpoints.presentation.generate_document_summary', new_callable=AsyncMock, return_value="mock_summary"),
         patch('api.v1.ppt.endpoints.presentation.generate_ppt_outline', side_effect=mock_generate_ppt_outline),
         patch('api.v1.ppt.endpoints.presentation.get_sql_session'),
         patch('api.v1.ppt.endpoints.presentation.get_slide_content_from_type_and_outline', new_callable=AsyncMock, return_value={"mock": "slide_content"}),
-        patch('api.v1.ppt.endpoints.presentation.process_slide_and_fetch_assets', new_callable=AsyncMock),
+        patch('api.v1.ppt.endpoints.presentation.DeckAssetPlanner.fetch_assets', new_callable=AsyncMock, return_value=[]),
         patch('api.v1.ppt.endpoints.presentation.get_exports_directory', return_value='/tmp/exports'),
-        patch('api.v1.ppt.endpoints.presentation.PptxPresentationCreator'),
+        patch('utils.export_utils.PptxPresentationCreator'),
         patch('api.v1.ppt.endpoints.presentation.aiohttp.ClientSession', return_value=MockAiohttpSession()),
     ]
     mocks = [p.start() for p in patches]
 
-    # Setup DocumentsLoader mock
-    docs_loader = mocks[2]
-    docs_loader.return_value.load_documents = AsyncMock()
-    docs_loader.return_value.documents = []
-
     # Setup PptxPresentationCreator mock for pptx test
     pptx_creator = mocks[9]
     pptx_creator.return_value.create_ppt = AsyncMock()
@@ -0,0 +1,42 @@
+from services.score_based_chunker import ScoreBasedChunker
+from utils.token_utils import estimate_token_count
+
+
+def test_chunks_follow_heading_offsets():
+    text = "intro\n# Title\nfirst\n## Part\nsecond\n# Title\nthird"
+    chunker = ScoreBasedChunker()
+    headings = chunker.extract_headings(text)
+    chunks = chunker.get_chunks_from_headings(
+        text, headings, chunker.score_headings(headings), top_k=10
+    )
+
+    assert [(each.heading, each.content) for each in chunks] == [
+        ("# Title", "first"),
+        ("## Part", "second"),
+        ("# Title", "third"),
+    ]
+
+
+def test_token_budget_keeps_best_sections_in_document_order():
+    sections = [f"# Section {i}\n" + ("word " * 200) for i in range(2000)]
+    text = "\n".join(sections)
+    chunker = ScoreBasedChunker()
+
+    chunks = chunker.get_chunks_within_token_budget(text, max_tokens=3000)
+
+    used_tokens = sum(
+        estimate_token_count(each.heading) + estimate_token_count(each.content)
+        for each in chunks
+    )
+    assert chunks and used_tokens <= 3000
+    assert [each.heading_index for each in chunks] == sorted(
+        each.heading_index for each in chunks
+    )
+    # The first heading carries a bonus, so it is always kept
+    assert chunks[0].heading == "# Section 0"
+
+
+def test_token_budget_truncates_text_without_headings():
+    chunks = ScoreBasedChunker().get_chunks_within_token_budget("a" * 1000, 10)
+    assert len(chunks) == 1
+    assert estimate_token_count(chunks[0].content) == 10
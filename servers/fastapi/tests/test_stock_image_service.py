@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from enums.image_provider import ImageProvider
+from services.stock_image_service import RateLimiter, RateLimitError, StockImageService
+
+
+def test_search_results_are_cached_and_shared():
+    service = StockImageService()
+    calls = []
+
+    async def search(query):
+        calls.append(query)
+        await asyncio.sleep(0.01)
+        return [f"https://example.com/{query}/{i}.jpg" for i in range(3)]
+
+    service.providers[ImageProvider.PEXELS].search = search
+
+    async def run():
+        first = await asyncio.gather(
+            service.search(ImageProvider.PEXELS, "Team  Meeting"),
+            service.search(ImageProvider.PEXELS, "team meeting"),
+        )
+        second = await service.search(ImageProvider.PEXELS, "TEAM meeting")
+        return first, second
+
+    (first, duplicate), second = asyncio.run(run())
+
+    assert calls == ["team meeting"]
+    assert first == duplicate == second
+
+
+def test_cancelled_caller_does_not_cancel_shared_search():
+    service = StockImageService()
+    calls = []
+
+    async def search(query):
+        calls.append(query)
+        await asyncio.sleep(0.05)
+        return ["https://example.com/a.jpg"]
+
+    service.providers[ImageProvider.PIXABAY].search = search
+
+    async def run():
+        first = asyncio.create_task(service.search(ImageProvider.PIXABAY, "cloud"))
+        second = asyncio.create_task(service.search(ImageProvider.PIXABAY, "cloud"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == ["https://example.com/a.jpg"]
+    assert calls == ["cloud"]
+
+
+def test_rate_limiter_gives_up_after_max_wait():
+    limiter = RateLimiter(max_requests=2, window_seconds=60)
+
+    async def run():
+        await limiter.acquire(max_wait=1)
+        await limiter.acquire(max_wait=1)
+        await limiter.acquire(max_wait=1)
+
+    with pytest.raises(RateLimitError, match="Rate limit reached"):
+        asyncio.run(run())
@@ -0,0 +1,47 @@
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from utils.upload_utils import save_upload_file
+
+
+def test_save_upload_file_streams_and_hashes(tmp_path):
+    content = os.urandom(3 * 1024 * 1024 + 17)
+    upload = UploadFile(io.BytesIO(content), filename="data.bin")
+    save_path = str(tmp_path / "data.bin")
+
+    saved = asyncio.run(save_upload_file(upload, save_path))
+
+    assert saved.size == len(content)
+    assert saved.sha256 == hashlib.sha256(content).hexdigest()
+    with open(save_path, "rb") as f:
+        assert f.read() == content
+
+
+def test_save_upload_file_rejects_oversized_upload(tmp_path):
+    upload = UploadFile(io.BytesIO(os.urandom(2 * 1024 * 1024 + 1)), filename="big.bin")
+    save_path = str(tmp_path / "big.bin")
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(save_upload_file(upload, save_path, max_size_mb=2))
+
+    assert error.value.status_code == 400
+    assert not os.path.exists(save_path)
+
+
+def test_failed_upload_keeps_the_existing_file(tmp_path):
+    save_path = str(tmp_path / "data.bin")
+    with open(save_path, "wb") as f:
+        f.write(b"original")
+    upload = UploadFile(io.BytesIO(os.urandom(2 * 1024 * 1024 + 1)), filename="data.bin")
+
+    with pytest.raises(HTTPException):
+        asyncio.run(save_upload_file(upload, save_path, max_size_mb=2))
+
+    with open(save_path, "rb") as f:
+        assert f.read() == b"original"
+    assert os.listdir(tmp_path) == ["data.bin"]
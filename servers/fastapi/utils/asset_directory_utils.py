@@ -17,3 +17,16 @@ def get_uploads_directory():
     uploads_directory = os.path.join(get_app_data_directory_env(), "uploads")
     os.makedirs(uploads_directory, exist_ok=True)
     return uploads_directory
+
+
+def get_cache_directory(name: str):
+    # Not under the temp directory, which is emptied on every start
+    app_data_directory = get_app_data_directory_env()
+    if app_data_directory:
+        cache_directory = os.path.join(app_data_directory, "cache", name)
+    else:
+        cache_directory = os.path.join(
+            os.path.expanduser("~"), ".cache", "presenton", name
+        )
+    os.makedirs(cache_directory, exist_ok=True)
+    return cache_directory
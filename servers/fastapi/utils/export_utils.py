@@ -1,17 +1,89 @@
-import json
+from io import BytesIO
 import os
 import aiohttp
 from typing import Literal
+from urllib.parse import quote
 import uuid
 from fastapi import HTTPException
+from fastapi.responses import FileResponse, Response
 from pathvalidate import sanitize_filename
+from starlette.background import BackgroundTask
 
+from constants.documents import PDF_MIME_TYPES, POWERPOINT_TYPES
 from models.pptx_models import PptxPresentationModel
 from models.presentation_and_path import PresentationAndPath
 from services.pptx_presentation_creator import PptxPresentationCreator
 from services.temp_file_service import TEMP_FILE_SERVICE
 from utils.asset_directory_utils import get_exports_directory
-import uuid
+
+
+def get_content_disposition(filename: str) -> str:
+    # RFC 6266 - ASCII fallback plus UTF-8 name for non latin titles
+    filename = sanitize_filename(filename) or "presentation"
+    stem, ext = os.path.splitext(filename)
+    # Quotes, backslashes and control characters would break the header
+    ascii_stem = "".join(
+        each for each in stem if " " <= each <= "~" and each not in '"\\'
+    ).strip()
+    ascii_stem = ascii_stem or "presentation"
+    return (
+        f'attachment; filename="{ascii_stem}{ext}"; '
+        f"filename*=UTF-8''{quote(filename)}"
+    )
+
+
+async def get_pptx_model(presentation_id: uuid.UUID) -> PptxPresentationModel:
+    # Get the converted PPTX model from the Next.js service
+    async with aiohttp.ClientSession() as session:
+        async with session.get(
+            f"http://localhost:3000/api/presentation_to_pptx_model?id={presentation_id}"
+        ) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                print(f"Failed to get PPTX model: {error_text}")
+                raise HTTPException(
+                    status_code=500,
+                    detail="Failed to convert presentation to PPTX model",
+                )
+            pptx_model_data = await response.json()
+
+    return PptxPresentationModel(**pptx_model_data)
+
+
+async def create_pptx_bytes(pptx_model: PptxPresentationModel) -> bytes:
+    """Builds the PPTX in memory, removing the working temp dir afterwards."""
+    temp_dir = TEMP_FILE_SERVICE.create_temp_dir()
+    try:
+        pptx_creator = PptxPresentationCreator(pptx_model, temp_dir)
+        await pptx_creator.create_ppt()
+
+        pptx_stream = BytesIO()
+        pptx_creator.save(pptx_stream)
+        return pptx_stream.getvalue()
+    finally:
+        TEMP_FILE_SERVICE.cleanup_temp_dir(temp_dir)
+
+
+def get_pptx_response(pptx_bytes: bytes, title: str) -> Response:
+    return Response(
+        content=pptx_bytes,
+        media_type=POWERPOINT_TYPES[0],
+        headers={"Content-Disposition": get_content_disposition(f"{title}.pptx")},
+    )
+
+
+async def export_pdf(presentation_id: uuid.UUID, title: str) -> str:
+    async with aiohttp.ClientSession() as session:
+        async with session.post(
+            "http://localhost:3000/api/export-as-pdf",
+            json={
+                "id": str(presentation_id),
+                "title": title,
+            },
+        ) as response:
+            response_json = await response.json()
+
+    return response_json["path"]
 
 
 async def export_presentation(
@@ -19,49 +91,52 @@ async def export_presentation(
 ) -> PresentationAndPath:
     if export_as == "pptx":
 
-        # Get the converted PPTX model from the Next.js service
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"http://localhost:3000/api/presentation_to_pptx_model?id={presentation_id}"
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    print(f"Failed to get PPTX model: {error_text}")
-                    raise HTTPException(
-                        status_code=500,
-                        detail="Failed to convert presentation to PPTX model",
-                    )
-                pptx_model_data = await response.json()
-
         # Create PPTX file using the converted model
-        pptx_model = PptxPresentationModel(**pptx_model_data)
-        temp_dir = TEMP_FILE_SERVICE.create_temp_dir()
-        pptx_creator = PptxPresentationCreator(pptx_model, temp_dir)
-        await pptx_creator.create_ppt()
+        pptx_model = await get_pptx_model(presentation_id)
+        pptx_bytes = await create_pptx_bytes(pptx_model)
 
         export_directory = get_exports_directory()
         pptx_path = os.path.join(
             export_directory,
             f"{sanitize_filename(title or str(uuid.uuid4()))}.pptx",
         )
-        pptx_creator.save(pptx_path)
+        with open(pptx_path, "wb") as f:
+            f.write(pptx_bytes)
 
         return PresentationAndPath(
             presentation_id=presentation_id,
             path=pptx_path,
         )
     else:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "http://localhost:3000/api/export-as-pdf",
-                json={
-                    "id": str(presentation_id),
-                    "title": sanitize_filename(title or str(uuid.uuid4())),
-                },
-            ) as response:
-                response_json = await response.json()
+        pdf_path = await export_pdf(
+            presentation_id, sanitize_filename(title or str(uuid.uuid4()))
+        )
 
         return PresentationAndPath(
             presentation_id=presentation_id,
-            path=response_json["path"],
+            path=pdf_path,
         )
+
+
+async def export_presentation_as_response(
+    presentation_id: uuid.UUID, title: str, export_as: Literal["pptx", "pdf"]
+) -> Response:
+    """
+    Exports the presentation straight into the response body.
+    Nothing is left in the exports directory once the response is sent.
+    """
+    title = sanitize_filename(title or str(uuid.uuid4()))
+
+    if export_as == "pptx":
+        pptx_model = await get_pptx_model(presentation_id)
+        return get_pptx_response(await create_pptx_bytes(pptx_model), title)
+
+    # A name of its own, so concurrent exports of decks with the same title
+    # and files returned by export_presentation are never removed here
+    pdf_path = await export_pdf(presentation_id, f"{title}-{uuid.uuid4()}")
+    return FileResponse(
+        pdf_path,
+        media_type=PDF_MIME_TYPES[0],
+        headers={"Content-Disposition": get_content_disposition(f"{title}.pdf")},
+        background=BackgroundTask(TEMP_FILE_SERVICE.cleanup_temp_file, pdf_path),
+    )
@@ -95,3 +95,163 @@ def get_extended_reasoning_env():
 
 def get_web_grounding_env():
     return os.getenv("WEB_GROUNDING")
+
+
+def get_pptx_image_dpi_env():
+    return os.getenv("PPTX_IMAGE_DPI")
+
+
+def get_pptx_jpeg_quality_env():
+    return os.getenv("PPTX_JPEG_QUALITY")
+
+
+def get_download_max_connections_env():
+    return os.getenv("DOWNLOAD_MAX_CONNECTIONS")
+
+
+def get_download_max_connections_per_host_env():
+    return os.getenv("DOWNLOAD_MAX_CONNECTIONS_PER_HOST")
+
+
+def get_download_timeout_env():
+    return os.getenv("DOWNLOAD_TIMEOUT")
+
+
+def get_download_retries_env():
+    return os.getenv("DOWNLOAD_RETRIES")
+
+
+def get_asset_cache_ttl_env():
+    return os.getenv("ASSET_CACHE_TTL")
+
+
+def get_asset_cache_size_mb_env():
+    return os.getenv("ASSET_CACHE_SIZE_MB")
+
+
+def get_libreoffice_pool_size_env():
+    return os.getenv("LIBREOFFICE_POOL_SIZE")
+
+
+def get_libreoffice_worker_max_jobs_env():
+    return os.getenv("LIBREOFFICE_WORKER_MAX_JOBS")
+
+
+def get_libreoffice_job_timeout_env():
+    return os.getenv("LIBREOFFICE_JOB_TIMEOUT")
+
+
+def get_libreoffice_python_env():
+    return os.getenv("LIBREOFFICE_PYTHON")
+
+
+def get_pptx_slide_cache_size_env():
+    return os.getenv("PPTX_SLIDE_CACHE_SIZE")
+
+
+def get_docling_pool_size_env():
+    return os.getenv("DOCLING_POOL_SIZE")
+
+
+def get_docling_timeout_env():
+    return os.getenv("DOCLING_TIMEOUT")
+
+
+def get_documents_load_concurrency_env():
+    return os.getenv("DOCUMENTS_LOAD_CONCURRENCY")
+
+
+def get_document_cache_size_mb_env():
+    return os.getenv("DOCUMENT_CACHE_SIZE_MB")
+
+
+def get_pdf_raster_pool_size_env():
+    return os.getenv("PDF_RASTER_POOL_SIZE")
+
+
+def get_pdf_raster_dpi_env():
+    return os.getenv("PDF_RASTER_DPI")
+
+
+def get_pdf_raster_format_env():
+    return os.getenv("PDF_RASTER_FORMAT")
+
+
+def get_document_context_max_tokens_env():
+    return os.getenv("DOCUMENT_CONTEXT_MAX_TOKENS")
+
+
+def get_slide_context_max_tokens_env():
+    return os.getenv("SLIDE_CONTEXT_MAX_TOKENS")
+
+
+def get_summary_concurrency_env():
+    return os.getenv("SUMMARY_CONCURRENCY")
+
+
+def get_summary_cache_size_mb_env():
+    return os.getenv("SUMMARY_CACHE_SIZE_MB")
+
+
+def get_document_summarization_env():
+    return os.getenv("DOCUMENT_SUMMARIZATION")
+
+
+def get_icon_search_backend_env():
+    return os.getenv("ICON_SEARCH_BACKEND")
+
+
+def get_icon_search_cache_size_env():
+    return os.getenv("ICON_SEARCH_CACHE_SIZE")
+
+
+def get_icon_semantic_cache_threshold_env():
+    return os.getenv("ICON_SEMANTIC_CACHE_THRESHOLD")
+
+
+def get_stock_image_cache_ttl_env():
+    return os.getenv("STOCK_IMAGE_CACHE_TTL")
+
+
+def get_asset_generation_concurrency_env():
+    return os.getenv("ASSET_GENERATION_CONCURRENCY")
+
+
+def get_image_prefetch_env():
+    return os.getenv("IMAGE_PREFETCH")
+
+
+def get_mirror_stock_images_env():
+    return os.getenv("MIRROR_STOCK_IMAGES")
+
+
+def get_image_mirror_concurrency_env():
+    return os.getenv("IMAGE_MIRROR_CONCURRENCY")
+
+
+def get_image_variant_pool_size_env():
+    return os.getenv("IMAGE_VARIANT_POOL_SIZE")
+
+
+def get_image_generation_max_in_flight_env():
+    return os.getenv("IMAGE_GENERATION_MAX_IN_FLIGHT")
+
+
+def get_image_generation_timeout_env():
+    return os.getenv("IMAGE_GENERATION_TIMEOUT")
+
+
+def get_image_generation_retries_env():
+    return os.getenv("IMAGE_GENERATION_RETRIES")
+
+
+def get_image_generation_circuit_failures_env():
+    return os.getenv("IMAGE_GENERATION_CIRCUIT_FAILURES")
+
+
+def get_image_generation_circuit_cooldown_env():
+    return os.getenv("IMAGE_GENERATION_CIRCUIT_COOLDOWN")
+
+
+def get_image_stock_fallback_env():
+    return os.getenv("IMAGE_STOCK_FALLBACK")
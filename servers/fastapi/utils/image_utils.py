@@ -1,4 +1,6 @@
-from typing import List
+import hashlib
+from io import BytesIO
+from typing import List, Tuple
 
 from PIL import Image, ImageDraw
 
@@ -256,3 +258,71 @@ def fit_image(
         return image.resize((width, height), Image.LANCZOS)
 
     return image
+
+
+def has_transparency(image: Image.Image) -> bool:
+    if image.mode == "P":
+        return "transparency" in image.info
+    if image.mode not in ("RGBA", "LA", "PA"):
+        return False
+    min_alpha, _ = image.getchannel("A").getextrema()
+    return min_alpha < 255
+
+
+def downsample_image(image: Image.Image, width: int, height: int) -> Image.Image:
+    # Only shrinks, never upscales. Pictures are stretched to their box anyway,
+    # so each axis can be capped independently.
+    img_width, img_height = image.size
+    new_width = max(1, min(img_width, width))
+    new_height = max(1, min(img_height, height))
+    if (new_width, new_height) == (img_width, img_height):
+        return image
+    return image.resize((new_width, new_height), Image.LANCZOS)
+
+
+def encode_image(image: Image.Image, jpeg_quality: int = 85) -> Tuple[bytes, str]:
+    """
+    Encodes image as PNG if it has visible transparency, otherwise as JPEG.
+    Returns encoded bytes and the file extension used.
+    """
+    buffer = BytesIO()
+    if has_transparency(image):
+        if image.mode not in ("RGBA", "LA"):
+            image = image.convert("RGBA")
+        image.save(buffer, format="PNG", optimize=True)
+        return buffer.getvalue(), "png"
+
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.save(buffer, format="JPEG", quality=jpeg_quality, optimize=True)
+    return buffer.getvalue(), "jpg"
+
+
+def get_file_sha256(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def get_perceptual_hash(image: Image.Image, hash_size: int = 8) -> str:
+    """
+    Returns the difference hash of image as hex. Every bit tells whether a
+    pixel of the shrunk grayscale image is brighter than its right neighbour,
+    so resized or recompressed copies of an image get (nearly) the same hash.
+    """
+    pixels = (
+        image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS).tobytes()
+    )
+    value = 0
+    for row in range(hash_size):
+        for column in range(hash_size):
+            index = row * (hash_size + 1) + column
+            value = (value << 1) | int(pixels[index] > pixels[index + 1])
+    return f"{value:0{hash_size * hash_size // 4}x}"
+
+
+def get_hash_distance(hash_a: str, hash_b: str) -> int:
+    """Number of bits two perceptual hashes differ in."""
+    return (int(hash_a, 16) ^ int(hash_b, 16)).bit_count()
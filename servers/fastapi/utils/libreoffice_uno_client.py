@@ -0,0 +1,56 @@
+"""
+Converts a document through a running LibreOffice instance over UNO.
+
+This file is executed as a script by an interpreter that ships the `uno`
+module (LibreOffice's bundled python or the system python3), not imported
+by the API server:
+
+    python libreoffice_uno_client.py <port> <input_path> <output_path> <filter>
+"""
+
+import sys
+
+
+def main():
+    import uno
+    from com.sun.star.beans import PropertyValue
+
+    def get_property(name, value):
+        property_value = PropertyValue()
+        property_value.Name = name
+        property_value.Value = value
+        return property_value
+
+    port, input_path, output_path, filter_name = sys.argv[1:5]
+
+    local_context = uno.getComponentContext()
+    resolver = local_context.ServiceManager.createInstanceWithContext(
+        "com.sun.star.bridge.UnoUrlResolver", local_context
+    )
+    context = resolver.resolve(
+        f"uno:socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext"
+    )
+    desktop = context.ServiceManager.createInstanceWithContext(
+        "com.sun.star.frame.Desktop", context
+    )
+
+    document = desktop.loadComponentFromURL(
+        uno.systemPathToFileUrl(input_path),
+        "_blank",
+        0,
+        (get_property("Hidden", True),),
+    )
+    if document is None:
+        raise Exception(f"LibreOffice could not open {input_path}")
+
+    try:
+        document.storeToURL(
+            uno.systemPathToFileUrl(output_path),
+            (get_property("FilterName", filter_name),),
+        )
+    finally:
+        document.close(True)
+
+
+if __name__ == "__main__":
+    main()
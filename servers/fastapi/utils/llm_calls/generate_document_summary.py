@@ -0,0 +1,56 @@
+from typing import Optional
+
+from models.llm_message import LLMSystemMessage, LLMUserMessage
+from services.llm_client import LLMClient
+from utils.llm_client_error_handler import handle_llm_client_exceptions
+from utils.llm_provider import get_model
+
+
+def get_system_prompt(max_words: int, is_combining: bool):
+    return f"""
+        {"Combine the provided summaries of consecutive parts of one document into a single summary." if is_combining else "Summarize the provided part of a document."}
+
+        # Notes
+        - Keep the original order of topics.
+        - Keep headings as markdown headings where they help structure the summary.
+        - Keep numbers, names, dates and other facts exactly as written.
+        - Do not add information that is not in the input.
+        - Write in the language of the input.
+        - Use at most {max_words} words.
+        - Output only the summary in markdown.
+    """
+
+
+def get_messages(text: str, max_words: int, is_combining: bool):
+    return [
+        LLMSystemMessage(
+            content=get_system_prompt(max_words, is_combining),
+        ),
+        LLMUserMessage(
+            content=text,
+        ),
+    ]
+
+
+async def generate_document_summary(
+    text: str,
+    max_tokens: int,
+    is_combining: bool = False,
+    model: Optional[str] = None,
+) -> str:
+    client = LLMClient()
+    model = model or get_model()
+
+    try:
+        return await client.generate(
+            model=model,
+            messages=get_messages(
+                text,
+                # Words are roughly three quarters of a token
+                max(50, max_tokens * 3 // 4),
+                is_combining,
+            ),
+            max_tokens=max_tokens * 2,
+        )
+    except Exception as e:
+        raise handle_llm_client_exceptions(e)
@@ -41,6 +41,7 @@ def get_system_prompt(
         - Never ever go over the max character limit. Limit your narration to make sure you never go over the max character limit.
         - Number of items should not be more than max number of items specified in slide schema. If you have to put multiple points then merge them to obey max numebr of items.
         - Generate content as per the given tone.
+        - If Source Material is provided, prefer its facts and figures over general knowledge.
         - Be very careful with number of words to generate for given field. As generating more than max characters will overflow in the design. So, analyze early and never generate more characters than allowed.
         - Do not add emoji in the content.
         - Metrics should be in abbreviated form with least possible characters. Do not add long sequence of words for metrics.
@@ -64,7 +65,9 @@ def get_system_prompt(
     """
 
 
-def get_user_prompt(outline: str, language: str):
+def get_user_prompt(
+    outline: str, language: str, additional_context: Optional[str] = None
+):
     return f"""
         ## Current Date and Time
         {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
@@ -77,6 +80,9 @@ def get_user_prompt(outline: str, language: str):
 
         ## Slide Outline
         {outline}
+
+        {"## Source Material" if additional_context else ""}
+        {additional_context or ""}
     """
 
 
@@ -86,6 +92,7 @@ def get_messages(
     tone: Optional[str] = None,
     verbosity: Optional[str] = None,
     instructions: Optional[str] = None,
+    additional_context: Optional[str] = None,
 ):
 
     return [
@@ -93,7 +100,7 @@ def get_messages(
             content=get_system_prompt(tone, verbosity, instructions),
         ),
         LLMUserMessage(
-            content=get_user_prompt(outline, language),
+            content=get_user_prompt(outline, language, additional_context),
         ),
     ]
 
@@ -105,6 +112,7 @@ async def get_slide_content_from_type_and_outline(
     tone: Optional[str] = None,
     verbosity: Optional[str] = None,
     instructions: Optional[str] = None,
+    additional_context: Optional[str] = None,
 ):
     client = LLMClient()
     model = get_model()
@@ -134,6 +142,7 @@ async def get_slide_content_from_type_and_outline(
                 tone,
                 verbosity,
                 instructions,
+                additional_context,
             ),
             response_format=response_schema,
             strict=False,
@@ -1,62 +1,17 @@
 import asyncio
+import copy
 from typing import List, Tuple
+from constants.assets import IMAGE_PREVIEW_WIDTH
 from models.image_prompt import ImagePrompt
 from models.sql.image_asset import ImageAsset
 from models.sql.slide import SlideModel
 from services.icon_finder_service import ICON_FINDER_SERVICE
 from services.image_generation_service import ImageGenerationService
+from services.image_variant_service import get_variant_url
 from utils.asset_directory_utils import get_images_directory
 from utils.dict_utils import get_dict_at_path, get_dict_paths_with_key, set_dict_at_path
 
 
-async def process_slide_and_fetch_assets(
-    image_generation_service: ImageGenerationService,
-    slide: SlideModel,
-) -> List[ImageAsset]:
-
-    async_tasks = []
-
-    image_paths = get_dict_paths_with_key(slide.content, "__image_prompt__")
-    icon_paths = get_dict_paths_with_key(slide.content, "__icon_query__")
-
-    for image_path in image_paths:
-        __image_prompt__parent = get_dict_at_path(slide.content, image_path)
-        async_tasks.append(
-            image_generation_service.generate_image(
-                ImagePrompt(
-                    prompt=__image_prompt__parent["__image_prompt__"],
-                )
-            )
-        )
-
-    for icon_path in icon_paths:
-        __icon_query__parent = get_dict_at_path(slide.content, icon_path)
-        async_tasks.append(
-            ICON_FINDER_SERVICE.search_icons(__icon_query__parent["__icon_query__"])
-        )
-
-    results = await asyncio.gather(*async_tasks)
-    results.reverse()
-
-    return_assets = []
-    for image_path in image_paths:
-        image_dict = get_dict_at_path(slide.content, image_path)
-        result = results.pop()
-        if isinstance(result, ImageAsset):
-            return_assets.append(result)
-            image_dict["__image_url__"] = result.path
-        else:
-            image_dict["__image_url__"] = result
-        set_dict_at_path(slide.content, image_path, image_dict)
-
-    for icon_path in icon_paths:
-        icon_dict = get_dict_at_path(slide.content, icon_path)
-        icon_dict["__icon_url__"] = results.pop()[0]
-        set_dict_at_path(slide.content, icon_path, icon_dict)
-
-    return return_assets
-
-
 async def process_old_and_new_slides_and_fetch_assets(
     image_generation_service: ImageGenerationService,
     old_slide_content: dict,
@@ -100,9 +55,9 @@ async def process_old_and_new_slides_and_fetch_assets(
     async_image_fetch_tasks = []
     new_images_fetch_status = []
 
-    # Creates async tasks for fetching new icons
-    async_icon_fetch_tasks = []
-    new_icons_fetch_status = []
+    # Collects new icon queries to search in one batch
+    icon_queries_to_fetch = []
+    icon_dicts_to_fetch = []
 
     # Creates async tasks for fetching new images
     # Use old image url if prompt is same
@@ -124,7 +79,7 @@ async def process_old_and_new_slides_and_fetch_assets(
         )
         new_images_fetch_status.append(True)
 
-    # Creates async tasks for fetching new icons
+    # Collects new icons to search for
     # Use old icon url if query is same
     for new_icon in new_icon_dicts:
         if new_icon["__icon_query__"] in old_icon_queries:
@@ -132,16 +87,15 @@ async def process_old_and_new_slides_and_fetch_assets(
                 old_icon_queries.index(new_icon["__icon_query__"])
             ]["__icon_url__"]
             new_icon["__icon_url__"] = old_icon_url
-            new_icons_fetch_status.append(False)
             continue
 
-        async_icon_fetch_tasks.append(
-            ICON_FINDER_SERVICE.search_icons(new_icon["__icon_query__"])
-        )
-        new_icons_fetch_status.append(True)
+        icon_queries_to_fetch.append(new_icon["__icon_query__"])
+        icon_dicts_to_fetch.append(new_icon)
 
-    new_images = await asyncio.gather(*async_image_fetch_tasks)
-    new_icons = await asyncio.gather(*async_icon_fetch_tasks)
+    new_images, new_icons = await asyncio.gather(
+        asyncio.gather(*async_image_fetch_tasks),
+        ICON_FINDER_SERVICE.search_icons_batch(icon_queries_to_fetch),
+    )
 
     # list of new assets
     new_assets = []
@@ -157,9 +111,8 @@ async def process_old_and_new_slides_and_fetch_assets(
                 image_url = fetched_image
             new_image_dicts[i]["__image_url__"] = image_url
 
-    for i, new_icon in enumerate(new_icons):
-        if new_icons_fetch_status[i]:
-            new_icon_dicts[i]["__icon_url__"] = new_icons[i][0]
+    for icon_dict, new_icon in zip(icon_dicts_to_fetch, new_icons):
+        icon_dict["__icon_url__"] = new_icon[0]
 
     for i, new_image_dict in enumerate(new_image_dicts):
         set_dict_at_path(new_slide_content, new_image_dict_paths[i], new_image_dict)
@@ -184,3 +137,18 @@ def process_slide_add_placeholder_assets(slide: SlideModel):
         icon_dict = get_dict_at_path(slide.content, icon_path)
         icon_dict["__icon_url__"] = "/static/icons/placeholder.svg"
         set_dict_at_path(slide.content, icon_path, icon_dict)
+
+
+def get_slide_with_image_previews(slide: SlideModel) -> SlideModel:
+    """
+    Returns a copy of slide whose stored images point at their small
+    variants, for the thumbnails of the slide.
+    """
+    preview = SlideModel(**copy.deepcopy(slide.model_dump()))
+    for image_path in get_dict_paths_with_key(preview.content, "__image_url__"):
+        image_dict = get_dict_at_path(preview.content, image_path)
+        if isinstance(image_dict["__image_url__"], str):
+            image_dict["__image_url__"] = get_variant_url(
+                image_dict["__image_url__"], IMAGE_PREVIEW_WIDTH
+            )
+    return preview
@@ -0,0 +1,56 @@
+import asyncio
+import os
+import shutil
+from typing import List
+import uuid
+
+from services.pdf_rasterizer_service import PDF_RASTERIZER_SERVICE
+from utils.asset_directory_utils import get_images_directory
+
+SLIDE_SCREENSHOT_PREFIX = "slide"
+SLIDE_SCREENSHOTS_SOURCE_PDF = "source.pdf"
+PLACEHOLDER_SCREENSHOT_URL = "/static/images/placeholder.jpg"
+
+
+def get_slide_screenshots_directory(presentation_id: uuid.UUID) -> str:
+    return os.path.join(get_images_directory(), str(presentation_id))
+
+
+async def create_slide_screenshots(pdf_path: str, lazy: bool = False) -> List[str]:
+    """
+    Creates screenshots for every page of pdf_path and returns their URLs.
+
+    In lazy mode only the PDF is kept and the URLs point to an endpoint that
+    renders each page the first time it is requested.
+    """
+    presentation_id = uuid.uuid4()
+    screenshots_dir = get_slide_screenshots_directory(presentation_id)
+    os.makedirs(screenshots_dir, exist_ok=True)
+
+    if lazy:
+        await asyncio.to_thread(
+            shutil.copyfile,
+            pdf_path,
+            os.path.join(screenshots_dir, SLIDE_SCREENSHOTS_SOURCE_PDF),
+        )
+        page_count = await PDF_RASTERIZER_SERVICE.get_page_count(pdf_path)
+        return [
+            f"/api/v1/ppt/pdf-slides/{presentation_id}/screenshots/{page_number}"
+            for page_number in range(1, page_count + 1)
+        ]
+
+    screenshot_paths = await PDF_RASTERIZER_SERVICE.render_pages(
+        pdf_path, screenshots_dir, prefix=SLIDE_SCREENSHOT_PREFIX
+    )
+    print(f"Generated {len(screenshot_paths)} slide screenshots")
+
+    screenshot_urls = []
+    for screenshot_path in screenshot_paths:
+        if os.path.exists(screenshot_path) and os.path.getsize(screenshot_path) > 0:
+            screenshot_urls.append(
+                f"/app_data/images/{presentation_id}/{os.path.basename(screenshot_path)}"
+            )
+        else:
+            # Fallback if screenshot generation failed or file is empty placeholder
+            screenshot_urls.append(PLACEHOLDER_SCREENSHOT_URL)
+    return screenshot_urls
@@ -0,0 +1,9 @@
+from constants.llm import APPROX_CHARS_PER_TOKEN
+
+
+def estimate_token_count(text: str) -> int:
+    return (len(text) + APPROX_CHARS_PER_TOKEN - 1) // APPROX_CHARS_PER_TOKEN
+
+
+def truncate_to_token_count(text: str, max_tokens: int) -> str:
+    return text[: max(0, max_tokens) * APPROX_CHARS_PER_TOKEN]
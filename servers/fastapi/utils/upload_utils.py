@@ -0,0 +1,53 @@
+import asyncio
+import hashlib
+import os
+import uuid
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile
+
+from constants.documents import MAX_UPLOAD_SIZE_MB, UPLOAD_CHUNK_SIZE
+from models.saved_upload import SavedUpload
+
+
+async def save_upload_file(
+    file: UploadFile,
+    save_path: str,
+    max_size_mb: Optional[int] = MAX_UPLOAD_SIZE_MB,
+) -> SavedUpload:
+    """
+    Streams an upload to save_path chunk by chunk, hashing it on the way.
+    Stops as soon as the file grows past max_size_mb, so a file is never held
+    in memory whole. The upload goes to a temp file that only replaces
+    save_path once complete, so a failed upload leaves an existing file as is.
+    """
+    max_size = max_size_mb * 1024 * 1024 if max_size_mb else None
+    sha256 = hashlib.sha256()
+    size = 0
+
+    os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
+    temp_path = f"{save_path}.{uuid.uuid4()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if max_size and size > max_size:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"File '{file.filename}' exceeded max upload size of {max_size_mb} MB",
+                    )
+                sha256.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+        os.replace(temp_path, save_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return SavedUpload(
+        path=save_path,
+        filename=file.filename,
+        content_type=file.content_type,
+        size=size,
+        sha256=sha256.hexdigest(),
+    )